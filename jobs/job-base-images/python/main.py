@@ -1,15 +1,10 @@
 import sys
-from stalker_job_sdk import JobStatus, log_status, log_error, log_debug, _log_done
 
-log_debug('Job execution started.')
+if len(sys.argv) > 1 and sys.argv[1] == '--serve':
+  # Warm fork server, the jobs are read from the standard input
+  from stalker_job_sdk.runner import serve
+  serve()
 
-try:
-  command = sys.argv[1]
-  exec(command)
-
-except Exception as exception:
-  log_error(exception)
-  log_status(JobStatus.FAILED)
-
-_log_done()
-log_debug('Job execution ended.')
\ No newline at end of file
+else:
+  from stalker_job_sdk.runner import run_job
+  run_job(sys.argv[1] if len(sys.argv) > 1 else None)
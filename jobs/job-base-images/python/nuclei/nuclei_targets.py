@@ -0,0 +1,130 @@
+from nuclei_job_input import JobInput
+from stalker_job_sdk import build_url, is_valid_ip, is_valid_port, to_boolean
+
+_default_ports = {
+    "http": "80",
+    "https": "443"
+}
+
+
+def build_target(input: JobInput) -> str:
+    """Builds the nuclei target of a job input. Returns an empty string if it has neither a domain nor an IP."""
+    if (input.domain or input.target_ip) and input.port and input.path:
+        return build_url(input.target_ip, input.port, input.domain, input.endpoint if input.endpoint else input.path, input.ssl if input.ssl else False)
+
+    target = input.domain if input.domain else input.target_ip
+    if target and input.port:
+        target += f":{str(input.port)}"
+    return target or ''
+
+
+def parse_job_input(values: dict) -> JobInput:
+    """
+    Parses a target of the batch mode, given with the same names as the job parameters.
+    Raises a ValueError if it is invalid.
+    """
+    if not isinstance(values, dict):
+        raise ValueError(f"a target must be an object: {values}")
+
+    input = JobInput()
+    input.target_ip = values.get("targetIp") or None
+    input.port = int(values.get("port")) if values.get("port") else None
+    input.domain = values.get("domainName") or None
+    input.path = values.get("path") or None
+    ssl = values.get("ssl")
+    input.ssl = ssl if isinstance(ssl, bool) or ssl is None else to_boolean(str(ssl))
+    input.endpoint = values.get("endpoint") or None
+
+    if input.target_ip and not is_valid_ip(input.target_ip):
+        raise ValueError(f"targetIp parameter is invalid: {input.target_ip}")
+    if input.port is not None and not is_valid_port(input.port):
+        raise ValueError(f"port parameter is invalid: {str(input.port)}")
+    if not input.target_ip and not input.domain:
+        raise ValueError(f"a target requires a targetIp or a domainName: {values}")
+
+    return input
+
+
+def _split_location(value: str) -> 'tuple[str, str, str]':
+    """Splits a target, or a location of a nuclei result, into its host, its port and its path."""
+    value = value.strip()
+    scheme, separator, rest = value.partition("://")
+    if not separator:
+        scheme, rest = "", value
+
+    end = min([i for i in (rest.find(c) for c in "/?#") if i >= 0], default=len(rest))
+    authority, path = rest[:end].lower(), rest[end:]
+
+    host, port = authority, ""
+    if authority.startswith("["):
+        host, _, port = authority[1:].partition("]")
+        port = port[1:]
+    elif authority.count(":") == 1:
+        host, port = authority.split(":")
+
+    if not port:
+        port = _default_ports.get(scheme.lower(), "")
+    return host, port, path.rstrip("/")
+
+
+def _is_under(path: str, root: str) -> bool:
+    return path == root or (path.startswith(root) and path[len(root)] in "/?#")
+
+
+class TargetIndex:
+    """
+    Maps the results of a nuclei scan of many targets back to the job inputs of their targets.
+
+    A result belongs to the target at the longest path which its location, its url or its host is under, on the same
+    host and port. When none is found, it belongs to the targets on its host, or its IP. Job inputs with the same target
+    share its results.
+    """
+
+    def __init__(self, inputs: 'list[JobInput]'):
+        self.targets: 'list[str]' = []
+        self._inputs: 'dict[str, list[JobInput]]' = {}
+        self._by_location: 'dict[tuple[str, str], list[tuple[str, list[JobInput]]]]' = {}
+        self._by_host: 'dict[str, list[JobInput]]' = {}
+
+        for input in inputs:
+            target = build_target(input)
+            if not target:
+                continue
+            if target not in self._inputs:
+                self.targets.append(target)
+                self._inputs[target] = []
+                host, port, path = _split_location(target)
+                self._by_location.setdefault((host, port), []).append((path, self._inputs[target]))
+            self._inputs[target].append(input)
+
+            for host in (input.domain, input.target_ip):
+                if host:
+                    self._by_host.setdefault(host.lower(), []).append(input)
+
+    def find(self, result: dict) -> 'list[JobInput]':
+        """Finds the job inputs of the target of a nuclei result. Returns an empty list if none matches."""
+        if len(self.targets) == 1:
+            return self._inputs[self.targets[0]]
+
+        for field in ("matched-at", "url", "host"):
+            value = result.get(field)
+            if not value or not isinstance(value, str):
+                continue
+            host, port, path = _split_location(value)
+            roots = [root for root in self._by_location.get((host, port), []) if _is_under(path, root[0])]
+            if roots:
+                return max(roots, key=lambda root: len(root[0]))[1]
+
+        result_port = str(result.get("port") or "")
+        for field in ("host", "ip"):
+            value = result.get(field)
+            if not value or not isinstance(value, str):
+                continue
+            host, port, _ = _split_location(value)
+            port = port or result_port
+            # Inputs without a port target the host itself, whatever the port of the result
+            inputs = [input for input in self._by_host.get(host, []) if not port or not input.port or str(input.port) == port]
+            if inputs:
+                return inputs
+
+        return []
@@ -0,0 +1,95 @@
+import unittest
+
+from nuclei_targets import TargetIndex, build_target, parse_job_input
+
+
+class NucleiTargetsMethods(unittest.TestCase):
+    def setUp(self):
+        self.website = parse_job_input({ "targetIp": "10.0.0.1", "port": 443, "domainName": "example.com", "path": "/", "ssl": True })
+        self.app = parse_job_input({ "targetIp": "10.0.0.1", "port": 443, "domainName": "example.com", "path": "/app", "ssl": "true" })
+        self.http = parse_job_input({ "targetIp": "10.0.0.1", "port": 80, "domainName": "example.com", "path": "/", "ssl": False })
+        self.port = parse_job_input({ "targetIp": "10.0.0.2", "port": 22 })
+        self.domain = parse_job_input({ "domainName": "other.example.com" })
+        self.index = TargetIndex([self.website, self.app, self.http, self.port, self.domain])
+
+    def test_build_target(self):
+        # Arrange
+        # Act
+        targets = [build_target(input) for input in (self.website, self.app, self.http, self.port, self.domain)]
+
+        # Assert
+        self.assertEqual(targets, ["https://example.com/", "https://example.com/app", "http://example.com/", "10.0.0.2:22", "other.example.com"])
+
+    def test_parse_job_input_invalid(self):
+        # Arrange
+        invalid_targets = [{ "targetIp": "10.0.0.300", "port": 22 }, { "targetIp": "10.0.0.1", "port": 70000 }, { "port": 22 }, "10.0.0.1"]
+
+        # Act
+        # Assert
+        for target in invalid_targets:
+            with self.assertRaises(ValueError):
+                parse_job_input(target)
+
+    def test_find_longest_path(self):
+        # Arrange
+        results = [
+            { "host": "example.com", "matched-at": "https://example.com/app/login.php" },
+            { "host": "example.com", "matched-at": "https://example.com:443/application" },
+            { "host": "example.com", "matched-at": "http://example.com/app" },
+        ]
+
+        # Act
+        inputs = [self.index.find(result) for result in results]
+
+        # Assert
+        self.assertEqual(inputs, [[self.app], [self.website], [self.http]])
+
+    def test_find_host_and_port(self):
+        # Arrange
+        results = [
+            { "host": "10.0.0.2:22", "matched-at": "10.0.0.2:22" },
+            { "host": "other.example.com", "matched-at": "other.example.com" },
+            { "host": "other.example.com", "matched-at": "https://other.example.com:8443/" },
+        ]
+
+        # Act
+        inputs = [self.index.find(result) for result in results]
+
+        # Assert
+        self.assertEqual(inputs, [[self.port], [self.domain], [self.domain]])
+
+    def test_find_unknown_target(self):
+        # Arrange
+        result = { "host": "10.0.0.3:22", "matched-at": "10.0.0.3:22", "ip": "10.0.0.3" }
+
+        # Act
+        inputs = self.index.find(result)
+
+        # Assert
+        self.assertEqual(inputs, [])
+
+    def test_find_shared_target(self):
+        # Arrange
+        other_ip = parse_job_input({ "targetIp": "10.0.0.9", "port": 443, "domainName": "example.com", "path": "/", "ssl": True })
+        index = TargetIndex([self.website, other_ip, self.port])
+
+        # Act
+        inputs = index.find({ "host": "example.com", "matched-at": "https://example.com/" })
+
+        # Assert
+        self.assertEqual(index.targets, ["https://example.com/", "10.0.0.2:22"])
+        self.assertEqual(inputs, [self.website, other_ip])
+
+    def test_find_single_target(self):
+        # Arrange
+        index = TargetIndex([self.port])
+
+        # Act
+        inputs = index.find({ "host": "somewhere.else" })
+
+        # Assert
+        self.assertEqual(inputs, [self.port])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+import re
+from json import loads
+
+output_types = ('domain', 'host', 'port', 'website')
+
+_document_separator = re.compile(r'^---[ \t]*$', re.MULTILINE)
+_template_id = re.compile(r'^id:[ \t]*["\']?([^"\'\s#]+)', re.MULTILINE)
+
+
+def split_templates(content: str) -> 'list[str]':
+    """Splits a bundle of nuclei templates, written as yaml documents separated by "---" lines, into its templates."""
+    return [template for template in _document_separator.split(content or '') if template.strip()]
+
+
+def get_template_id(template: str) -> str:
+    """Gets the id of a nuclei template, the template-id of its results. Returns None if it has none."""
+    match = _template_id.search(template)
+    return match.group(1) if match else None
+
+
+def parse_template_outputs(value: str) -> 'dict[str, tuple[str, str]]':
+    """
+    Parses the outputs of the templates of a bundle, a json object of the stalkerOutputType and outputFindingName of
+    each template id. Raises a ValueError if it is invalid.
+    """
+    outputs = loads(value)
+    if not isinstance(outputs, dict):
+        raise ValueError('templateOutputs has to be a json object')
+
+    template_outputs: 'dict[str, tuple[str, str]]' = {}
+    for template_id, output in outputs.items():
+        if not isinstance(output, dict):
+            raise ValueError(f'the output of the template {template_id} has to be a json object')
+        output_type = output.get('stalkerOutputType')
+        finding_name = output.get('outputFindingName')
+        if output_type not in output_types:
+            raise ValueError(f'the stalkerOutputType of the template {template_id} has to be either domain, host, port or website')
+        if not finding_name:
+            raise ValueError(f'the outputFindingName of the template {template_id} is required')
+        template_outputs[template_id] = (output_type, finding_name)
+
+    return template_outputs
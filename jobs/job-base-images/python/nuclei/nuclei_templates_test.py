@@ -0,0 +1,73 @@
+import unittest
+
+from nuclei_templates import (get_template_id, parse_template_outputs,
+                              split_templates)
+
+BUNDLE = """id: first-template
+
+info:
+  name: First template
+  description: |
+    Not a separator
+    ---
+
+---
+# A comment before the id
+id: "second-template"
+info:
+  name: Second template
+---
+"""
+
+
+class NucleiTemplatesMethods(unittest.TestCase):
+    def test_split_templates(self):
+        # Arrange
+        # Act
+        templates = split_templates(BUNDLE)
+
+        # Assert
+        self.assertEqual(len(templates), 2)
+        self.assertIn("Not a separator\n    ---", templates[0])
+        self.assertEqual(split_templates("id: single\n"), ["id: single\n"])
+
+    def test_get_template_id(self):
+        # Arrange
+        templates = split_templates(BUNDLE)
+
+        # Act
+        template_ids = [get_template_id(template) for template in templates]
+
+        # Assert
+        self.assertEqual(template_ids, ["first-template", "second-template"])
+        self.assertIsNone(get_template_id("info:\n  id: nested\n"))
+
+    def test_parse_template_outputs(self):
+        # Arrange
+        value = '{"first-template": {"stalkerOutputType": "website", "outputFindingName": "FirstFinding"}}'
+
+        # Act
+        outputs = parse_template_outputs(value)
+
+        # Assert
+        self.assertEqual(outputs, {"first-template": ("website", "FirstFinding")})
+
+    def test_parse_template_outputs_invalid(self):
+        # Arrange
+        invalid_values = [
+            '["first-template"]',
+            '{"first-template": "website"}',
+            '{"first-template": {"stalkerOutputType": "url", "outputFindingName": "FirstFinding"}}',
+            '{"first-template": {"stalkerOutputType": "website"}}',
+            'not json',
+        ]
+
+        # Act
+        # Assert
+        for value in invalid_values:
+            with self.assertRaises(ValueError):
+                parse_template_outputs(value)
+
+
+if __name__ == '__main__':
+    unittest.main()
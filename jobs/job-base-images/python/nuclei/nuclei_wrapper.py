@@ -1,16 +1,29 @@
 
 import os
+from collections import deque
 from json import loads
-from subprocess import CompletedProcess, run
+from subprocess import PIPE, Popen
+from threading import Thread
 from types import ModuleType
 
 from nuclei_finding import NucleiFinding
 from nuclei_job_input import JobInput
+from nuclei_targets import TargetIndex, parse_job_input
+from nuclei_templates import (get_template_id, parse_template_outputs,
+                              split_templates)
 from stalker_job_sdk import (DomainFinding, Field, IpFinding, JobStatus,
-                             PortFinding, TextField, WebsiteFinding, build_url,
+                             PortFinding, TextField, WebsiteFinding,
                              is_valid_ip, is_valid_port, log_debug, log_error,
                              log_finding, log_info, log_status, log_warning,
                              to_boolean, _log_done)
+from stalker_job_sdk.limits import get_resource_limits, tune_concurrency
+
+# Hosts scanned in parallel by each template, nuclei's default
+DEFAULT_BULK_SIZE = 25
+# Templates run in parallel for each CPU when the concurrency is derived from the pod's limits
+TEMPLATES_PER_CPU = 25
+# Memory used by a request in flight
+MEMORY_PER_REQUEST = 512 * 1024
 
 
 def handle_port_finding(finding: NucleiFinding, all_fields: 'list[Field]', output_finding_name: str):
@@ -120,6 +133,42 @@ def handle_finding(finding: NucleiFinding, stalker_output_type: str, output_find
     else:
         handle_finding_switch(finding, fields, stalker_output_type, output_finding_name)
 
+class NucleiProcess:
+    """
+    Runs nuclei, iterating over the lines of its standard output as it writes them.
+
+    Its standard error is drained while it runs, so that nuclei never blocks on a full pipe, and only its last lines are
+    kept, to be logged once it exited.
+    """
+
+    def __init__(self, args: 'list[str]', stderr_lines: int = 100):
+        self.args = args
+        self.returncode: int = None
+        self._stderr: 'deque[str]' = deque(maxlen=stderr_lines)
+
+    @property
+    def stderr(self) -> str:
+        return "".join(self._stderr)
+
+    def __iter__(self):
+        process = Popen(['nuclei', *self.args], stdout=PIPE, stderr=PIPE, text=True, bufsize=1)
+        drain = Thread(target=self._stderr.extend, args=(process.stderr,), daemon=True)
+        drain.start()
+
+        completed = False
+        try:
+            yield from process.stdout
+            completed = True
+        finally:
+            # Stopping early, or failing, must not leave nuclei running
+            if not completed and process.poll() is None:
+                process.terminate()
+            process.stdout.close()
+            self.returncode = process.wait()
+            drain.join()
+            process.stderr.close()
+
+
 def get_valid_args():
     """Gets the arguments from environment variables"""
     target_ip: str = os.environ.get("targetIp")
@@ -151,6 +200,36 @@ def get_valid_args():
     return input
 
 
+def get_valid_batch_args(targets: str) -> 'list[JobInput]':
+    """Gets the targets of the batch mode, a json array of objects with the same names as the job parameters"""
+    try:
+        values = loads(targets)
+    except ValueError as err:
+        log_error(f"targets parameter is not valid json: {err}")
+        log_status(JobStatus.FAILED)
+        exit()
+
+    if not isinstance(values, list):
+        log_error("targets parameter has to be a json array")
+        log_status(JobStatus.FAILED)
+        exit()
+
+    inputs: 'list[JobInput]' = []
+    for value in values:
+        try:
+            inputs.append(parse_job_input(value))
+        except (ValueError, TypeError) as err:
+            # An invalid target is skipped, the other targets are still scanned
+            log_warning(f"Skipping invalid target: {err}")
+
+    if not inputs:
+        log_error("targets parameter does not contain any valid target")
+        log_status(JobStatus.FAILED)
+        exit()
+
+    return inputs
+
+
 def main():
     # Provided through the UI
     template_content = os.environ.get('RK_NUCLEI_YAML_TEMPLATE')
@@ -158,28 +237,49 @@ def main():
 
     stalker_output_type_str = 'stalkerOutputType'
     output_finding_name_str = 'outputFindingName'
-
-    input = get_valid_args()
-
-    target = ''
-
-    if (input.domain or input.target_ip) and input.port and input.path:
-        target = build_url(input.target_ip, input.port, input.domain, input.endpoint if input.endpoint else input.path, input.ssl if input.ssl else False)
+    targets_str = 'targets'
+    template_outputs_str = 'templateOutputs'
+
+    # Optional, the concurrency is derived from the pod's CPU, memory and open files limits when omitted
+    concurrency = int(os.environ.get('concurrency') or 0)
+    bulk_size = int(os.environ.get('bulkSize') or 0)
+    rate_limit = int(os.environ.get('rateLimit') or 0)
+
+    # Batch mode, many targets scanned by a single nuclei process, which loads the template once
+    targets = os.environ.get(targets_str)
+    inputs = get_valid_batch_args(targets) if targets else [get_valid_args()]
+    target_index = TargetIndex(inputs)
+
+    for input in inputs:
+        log_debug(f"targetIp: {input.target_ip}, port: {str(input.port)}, domainName: {str(input.domain)}, path: {input.path}, ssl: {str(input.ssl)}, endpoint: {input.endpoint}")
+    if len(target_index.targets) == 1:
+        log_info(f"Target: {target_index.targets[0]}")
     else:
-        target = input.domain if input.domain else input.target_ip
-        if input.port:
-            target += f":{str(input.port)}"
-
-    log_debug(f"targetIp: {input.target_ip}, port: {str(input.port)}, domainName: {str(input.domain)}, path: {input.path}, ssl: {str(input.ssl)}, endpoint: {input.endpoint}")
-    log_info(f"Target: {target}")
+        log_info(f"Targets: {len(target_index.targets)}")
     
     # Mandatory job parameters if no NUCLEI_FINDING_HANDLER provided
     expected_output_type = os.environ.get(stalker_output_type_str)
     output_finding_name = os.environ.get(output_finding_name_str)
 
+    # Bundle of templates, run at once by nuclei, with the outputs of their findings by template id
+    templates = split_templates(template_content)
+    template_ids = [get_template_id(template) for template in templates]
+    template_outputs: 'dict[str, tuple[str, str]]' = {}
+    if os.environ.get(template_outputs_str):
+        try:
+            template_outputs = parse_template_outputs(os.environ.get(template_outputs_str))
+        except ValueError as err:
+            log_error(f'{template_outputs_str} parameter is invalid: {err}')
+            log_status(JobStatus.FAILED)
+            exit()
+
+    # The findings of the templates without their own output use the one of the job
+    uses_job_output = any(template_id not in template_outputs for template_id in template_ids)
+
     template_folder = "/nuclei/template/" 
     template_file = template_folder + 'template.yaml'
-    output_file = '/nuclei/output/output.jsonl'
+    bundle_folder = template_folder + 'bundle/'
+    targets_file = template_folder + 'targets.txt'
 
     custom_parser = None
     if custom_parser_code:
@@ -194,97 +294,138 @@ def main():
             custom_parser_code = None
             custom_parser = None
 
-    if not target:
-        log_error(f'Unable to build target from: {{ targetIp: {input.target_ip}, domainName: {input.domain}, port: {str(input.port)}, ssl: {input.ssl}, path: {input.path} }}')
+    if not target_index.targets:
+        log_error(f'Unable to build target from: {{ targetIp: {inputs[0].target_ip}, domainName: {inputs[0].domain}, port: {str(inputs[0].port)}, ssl: {inputs[0].ssl}, path: {inputs[0].path} }}')
         log_status(JobStatus.FAILED)
         exit()
 
-    if not custom_parser_code and not output_finding_name:
+    if not custom_parser_code and uses_job_output and not output_finding_name:
         log_error(f'{output_finding_name_str} is required when no custom finding handler is provided')
         log_status(JobStatus.FAILED)
         exit()
     
-    if not custom_parser_code and not expected_output_type:
+    if not custom_parser_code and uses_job_output and not expected_output_type:
         log_error(f'{stalker_output_type_str} is required when no custom finding handler is provided')
         log_status(JobStatus.FAILED)
         exit()
 
-    if not custom_parser_code and expected_output_type != 'domain' and expected_output_type != 'host' and expected_output_type != 'port' and expected_output_type != 'website':
+    if not custom_parser_code and uses_job_output and expected_output_type != 'domain' and expected_output_type != 'host' and expected_output_type != 'port' and expected_output_type != 'website':
         log_error(f'{stalker_output_type_str} has to be either domain, host, port or website')
         log_status(JobStatus.FAILED)
         exit()
 
-    with open(template_file, 'w') as f:
-        f.writelines(template_content)
+    if len(templates) <= 1:
+        with open(template_file, 'w') as f:
+            f.writelines(template_content)
+        template_args = ['-t', template_file]
+    else:
+        os.makedirs(bundle_folder, exist_ok=True)
+        for i, template in enumerate(templates):
+            with open(f'{bundle_folder}template-{i}.yaml', 'w') as f:
+                f.writelines(template)
+        template_args = ['-t', bundle_folder]
+        log_info(f"Templates: {len(templates)}")
+
+    if len(target_index.targets) == 1:
+        target_args = ['-target', target_index.targets[0]]
+    else:
+        with open(targets_file, 'w') as f:
+            f.writelines(f"{target}\n" for target in target_index.targets)
+        target_args = ['-list', targets_file]
+
+    # Each of the templates run in parallel keeps up to bulk size requests in flight, each one with its socket
+    bulk_size = bulk_size if bulk_size > 0 else DEFAULT_BULK_SIZE
+    if concurrency <= 0:
+        concurrency = tune_concurrency(TEMPLATES_PER_CPU, 1000, files_per_task=bulk_size, memory_per_task=bulk_size * MEMORY_PER_REQUEST)
+        log_info(f"Concurrency: {concurrency} ({get_resource_limits().describe()})")
+    concurrency_args = ['-c', str(concurrency), '-bs', str(bulk_size)]
+    if rate_limit > 0:
+        concurrency_args += ['-rl', str(rate_limit)]
 
     log_info("Starting Nuclei process. It may take several minutes.")
 
-    #   -jle, -jsonl-export string    file to export results in JSONL(ine) format
+    #   -l, -list string              path to file containing a list of target URLs/hosts to scan (one per line)
+    #   -c, -concurrency int          maximum number of templates to be executed in parallel
+    #   -bs, -bulk-size int           maximum number of hosts to be analyzed in parallel per template
+    #   -rl, -rate-limit int          maximum number of requests to send per second
+    #   -j, -jsonl                    write output in JSONL(ines) format
     #   -duc, -disable-update-check   disable automatic nuclei/templates update check
     #   -ot, -omit-template           omit encoded template in the JSON, JSONL output
     #   -or, -omit-raw                omit request/response pairs in the JSON, JSONL, and Markdown outputs (for findings only)
     #   -silent                       display findings only
     #   -nc, -no-color                disable output content coloring (ANSI escape codes)
-    nuclei_process: CompletedProcess = run(
+    nuclei_process = NucleiProcess(
         [
-            'nuclei',
-            '-target', target, 
-            '-jle', output_file, 
-            '-t', template_file, 
+            *target_args,
+            '-jsonl',
+            *template_args,
+            *concurrency_args,
             '-duc',
             '-ot',
             '-or',
             '-silent',
             '-no-color'
-        ],
-        text=True, capture_output=True
+        ]
     )
 
+    custom_parser_findings: list = []
+    results_count = 0
+
+    # The results are read from nuclei's standard output while it runs, the findings are published as they are found
+    for line in nuclei_process:
+        if not line.strip():
+            continue
+        results_count += 1
 
-    if nuclei_process.stderr and len(str(nuclei_process.stderr)) > 0:
-        log_error(str(nuclei_process.stderr))
+        try:
+            json_data = loads(line)
+            if not isinstance(json_data, dict):
+                raise ValueError("a result has to be a json object")
+        except Exception as err:
+            log_warning("Error while parsing json output, skipping line:")
+            log_warning(line)
+            log_warning(err)
+            continue
+
+        # In batch mode, the result is published for the inputs of the target which it was found on
+        result_inputs = target_index.find(json_data)
+        if not result_inputs:
+            log_warning("Unable to match the result to a target, skipping line:")
+            log_warning(line)
+            continue
+
+        # In a bundle, the findings are routed to the output of the template which found them
+        output_type, finding_name = template_outputs.get(json_data.get('template-id'), (expected_output_type, output_finding_name))
+
+        for input in result_inputs:
+            try:
+                if custom_parser:
+                    custom_parser_findings.append(custom_parser.parse_finding(loads(line), original_string=line, input=input))
+                    continue
+                finding = NucleiFinding(json_data, original_string=line, input=input)
+            except Exception as err:
+                if custom_parser:
+                    log_warning("Error while parsing json output with custom parser, skipping line:")
+                else:
+                    log_warning("Error while parsing json output, skipping line:")
+                log_warning(line)
+                log_warning(err)
+                continue
+
+            handle_finding(finding, output_type, finding_name)
+
+    if nuclei_process.stderr:
+        log_error(nuclei_process.stderr)
         log_error("Error while running Nuclei, the template may be invalid.")
 
-    if nuclei_process.stdout and len(str(nuclei_process.stdout)) <= 0:
+    if results_count == 0:
         log_info("No results found. Better luck next time!")
 
-    nuclei_findings: list['NucleiFinding'] = []
-    custom_parser_findings: list = []
-
-    if not os.path.isfile(output_file):
-        log_warning('The output file did not exist.')
-        log_status(JobStatus.SUCCESS)
-        exit()
-
-    try:
-        with open(output_file, 'r') as f:
-            for line in f:
-                try:
-                    if custom_parser:
-                        custom_parser_findings.append(custom_parser.parse_finding(loads(line), original_string=line, input=input))
-                    else:
-                        nuclei_findings.append(NucleiFinding(loads(line), original_string=line, input=input))
-                except Exception as err:
-                    if custom_parser:
-                        log_warning("Error while parsing json output with custom parser, skipping line:")
-                    else:
-                        log_warning("Error while parsing json output, skipping line:")
-                    log_warning(line)
-                    log_warning(err)
-    except Exception as err:
-        log_error("Error while reading the Nuclei output file")
-        log_error(err)
-        log_status(JobStatus.FAILED)
-        exit()
-
     if custom_parser:
         try:
             custom_parser.publish_findings(custom_parser_findings)
         except Exception:
             log_error("Error in the publish_findings method of the custom FindingHandler class")
-    else:
-        for finding in nuclei_findings:
-            handle_finding(finding, expected_output_type, output_finding_name)
 
     log_info('End of Nuclei wrapper.')
     
@@ -0,0 +1,86 @@
+import os
+import stat
+import sys
+import tempfile
+import unittest
+
+from nuclei_wrapper import NucleiProcess
+
+# Stands in for nuclei: writes a result, waits for the test to create the "release" file, then writes the "second" marker
+# file, another result and an error. It gives up waiting after a while, so that a broken wrapper fails instead of hanging
+FAKE_NUCLEI = f"""#!{sys.executable}
+import os, sys, time
+directory = os.environ['FAKE_NUCLEI_DIRECTORY']
+print('{{"template-id": "first"}}', flush=True)
+for _ in range(500):
+    if os.path.exists(os.path.join(directory, 'release')):
+        break
+    time.sleep(0.01)
+open(os.path.join(directory, 'second'), 'w').close()
+print('{{"template-id": "second"}}', flush=True)
+print('something went wrong', file=sys.stderr)
+"""
+
+
+class NucleiProcessMethods(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        path = os.path.join(self.directory.name, 'nuclei')
+        with open(path, 'w') as f:
+            f.write(FAKE_NUCLEI)
+        os.chmod(path, os.stat(path).st_mode | stat.S_IEXEC)
+        self.path = os.environ['PATH']
+        os.environ['PATH'] = self.directory.name + os.pathsep + self.path
+        os.environ['FAKE_NUCLEI_DIRECTORY'] = self.directory.name
+        self.second = os.path.join(self.directory.name, 'second')
+
+    def tearDown(self):
+        os.environ['PATH'] = self.path
+        del os.environ['FAKE_NUCLEI_DIRECTORY']
+        self.directory.cleanup()
+
+    def release(self):
+        open(os.path.join(self.directory.name, 'release'), 'w').close()
+
+    def test_iter_yields_results_while_running(self):
+        # Arrange
+        results = iter(NucleiProcess(['-jsonl']))
+
+        # Act
+        first = next(results)
+        written_before = os.path.exists(self.second)
+        self.release()
+        results.close()
+
+        # Assert
+        self.assertEqual(first, '{"template-id": "first"}\n')
+        self.assertFalse(written_before)
+
+    def test_iter_reads_all_results_and_errors(self):
+        # Arrange
+        self.release()
+        process = NucleiProcess(['-jsonl'])
+
+        # Act
+        lines = list(process)
+
+        # Assert
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(process.stderr, 'something went wrong\n')
+        self.assertEqual(process.returncode, 0)
+
+    def test_iter_stopped_early_terminates_nuclei(self):
+        # Arrange
+        process = NucleiProcess(['-jsonl'])
+
+        # Act
+        for _ in process:
+            break
+
+        # Assert
+        self.assertNotEqual(process.returncode, 0)
+        self.assertFalse(os.path.exists(self.second))
+
+
+if __name__ == '__main__':
+    unittest.main()
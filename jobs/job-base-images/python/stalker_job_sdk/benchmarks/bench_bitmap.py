@@ -0,0 +1,100 @@
+"""
+Compares the tracking of the hosts found by a range scan in sets and in bitmaps, in lines per second and peak memory.
+
+Synthetic masscan list output is generated for a /8, with random hosts and a few ports, so that most lines are new hosts
+as in a dense scan. Each tracking runs in a forked child, so that the peak memory of each one is measured separately.
+
+Usage, from the stalker_job_sdk directory:
+python -m benchmarks.bench_bitmap [--lines COUNT]
+"""
+import argparse
+import os
+import random
+import resource
+import time
+from ipaddress import ip_address
+
+from stalker_job_sdk.bitmap import RangeTracker
+from stalker_job_sdk.masscan import parse_list_line
+
+PORTS = (22, 80, 443, 3389, 8080)
+
+
+def lines(count: int):
+    rng = random.Random(0)
+    for _ in range(count):
+        host = rng.getrandbits(24)
+        yield f"open tcp {PORTS[host % 5]} 10.{host >> 16}.{(host >> 8) & 255}.{host & 255} 1700000000"
+
+
+def parse_only(count: int) -> int:
+    """The parsing of the lines alone, without tracking."""
+    for line in lines(count):
+        parse_list_line(line)
+    return 0
+
+
+def host_set(count: int) -> int:
+    """The previous tracking, a set of the hosts, without deduplicating the ports."""
+    hosts = set()
+    for line in lines(count):
+        record = parse_list_line(line)
+        hosts.add(int(ip_address(record.ip)))
+    return len(hosts)
+
+
+def host_and_port_sets(count: int) -> int:
+    hosts = set()
+    ports = set()
+    for line in lines(count):
+        record = parse_list_line(line)
+        ip_int = int(ip_address(record.ip))
+        hosts.add(ip_int)
+        ports.add((ip_int, record.port))
+    return len(hosts)
+
+
+def bitmaps(count: int) -> int:
+    tracker = RangeTracker("10.0.0.0/8")
+    for line in lines(count):
+        record = parse_list_line(line)
+        tracker.add(record.ip, record.port)
+    return len(tracker.hosts)
+
+
+def run(tracking, count: int):
+    read, write = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read)
+        before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        start = time.perf_counter()
+        hosts = tracking(count)
+        elapsed = time.perf_counter() - start
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before
+        os.write(write, f"{elapsed} {peak} {hosts}".encode())
+        os._exit(0)
+
+    os.close(write)
+    with os.fdopen(read) as f:
+        elapsed, peak, hosts = f.read().split()
+    os.waitpid(pid, 0)
+    return float(elapsed), int(peak), int(hosts)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lines", type=int, default=10_000_000)
+    args = parser.parse_args()
+
+    print(f"{args.lines:,} lines of masscan output for 10.0.0.0/8")
+    for tracking in (parse_only, host_set, host_and_port_sets, bitmaps):
+        elapsed, peak, hosts = run(tracking, args.lines)
+        print(
+            f"{tracking.__name__:>18}: {args.lines / elapsed:>10,.0f} lines/s, "
+            f"peak memory +{peak / 1024:>7,.1f}MiB, {hosts:,} hosts"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Compares resolving the same hostnames again and again without cache, with the in-memory cache, and with the cache file
+shared by the jobs of a node, in lookups per second.
+
+A stub nameserver on a loopback port answers every query after a delay, like a remote nameserver. The jobs of a node are
+simulated by forked processes, each one with an empty in-memory cache.
+
+Usage, from the stalker_job_sdk directory:
+python -m benchmarks.bench_dnscache [--hostnames COUNT] [--lookups COUNT] [--jobs COUNT] [--delay SECONDS]
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from stalker_job_sdk.dnscache import DnsCache
+from stalker_job_sdk.resolver import BulkResolver
+from tests.dns_server import StubDnsServer
+
+
+def uncached(nameserver: str, hostnames: list[str]):
+    async def resolve(hostname: str):
+        async with BulkResolver([nameserver]) as resolver:
+            return await resolver.resolve(hostname)
+
+    for hostname in hostnames:
+        asyncio.run(resolve(hostname))
+
+
+def jobs(count: int, lookup):
+    """Runs the lookups of each job in a forked child, one job after the other."""
+    for _ in range(count):
+        pid = os.fork()
+        if pid == 0:
+            lookup()
+            os._exit(0)
+        os.waitpid(pid, 0)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--hostnames", type=int, default=20)
+    parser.add_argument("--lookups", type=int, default=10, help="lookups of each hostname by each job")
+    parser.add_argument("--jobs", type=int, default=10)
+    parser.add_argument("--delay", type=float, default=0.005)
+    args = parser.parse_args()
+
+    names = [f"host-{i}.example.com" for i in range(args.hostnames)]
+    zone = { name: [f"10.0.0.{i % 250 + 1}"] for i, name in enumerate(names) }
+    lookups = names * args.lookups
+    total = len(lookups) * args.jobs
+
+    print(
+        f"{args.jobs} jobs looking up {args.hostnames} hostnames {args.lookups} times each, "
+        f"answers delayed by {args.delay * 1000:.0f}ms"
+    )
+    with StubDnsServer(zone, ttl=300, delay=args.delay) as server, tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "dns.sqlite")
+
+        def memory():
+            cache = DnsCache([server.address])
+            for hostname in lookups:
+                cache.lookup(hostname)
+
+        def memory_and_file():
+            cache = DnsCache([server.address], path=path)
+            for hostname in lookups:
+                cache.lookup(hostname)
+
+        for name, lookup in (
+            ("no cache", lambda: uncached(server.address, lookups)),
+            ("memory", memory),
+            ("memory + file", memory_and_file),
+        ):
+            queries = server.queries
+            start = time.perf_counter()
+            jobs(args.jobs, lookup)
+            elapsed = time.perf_counter() - start
+            print(
+                f"{name:>14}: {elapsed:>6.2f}s, {total / elapsed:>9,.0f} lookups/s, "
+                f"{server.queries - queries:,} queries sent"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Compares iter_all_domains against the previous implementation of get_all_domains, which ran a large regex and
+tldextract on every input and expanded the subdomains by reversing and joining label lists.
+
+Usage, from the stalker_job_sdk directory: python -m benchmarks.bench_domains [count]
+It needs tldextract, which is only installed with the bench dependencies: poetry install --with bench
+"""
+import random
+import re
+import sys
+import time
+import tracemalloc
+
+import tldextract
+
+from stalker_job_sdk.domains import iter_all_domains
+
+
+def legacy_get_all_domains(domainNames: list['str']) -> list['str']:
+    domain_regex = r"(?:(?:[a-z0-9](?:[a-z0-9\x2d]*[a-z0-9])?\.)+[a-z0-9](?:[a-z0-9\x2d]*[a-z0-9])?|\[(?:(?:(2(5[0-5]|[0-4][0-9])|1[0-9][0-9]|[1-9]?[0-9]))\.){3}(?:(2(5[0-5]|[0-4][0-9])|1[0-9][0-9]|[1-9]?[0-9])|[a-z0-9\x2d]*[a-z0-9]:(?:[\x01-\x08\x0b\x0c\x0e-\x1f\x21-\x5a\x53-\x7f]|\\[\x01-\x09\x0b\x0c\x0e-\x7f])+)\])"
+    all_domains = set()
+    for domain in domainNames:
+        match = re.search(domain_regex, domain)
+        if match is None:
+            continue
+
+        full_domain = match.group()
+        tld_obj = tldextract.extract(full_domain)
+        domain_no_tld = tld_obj.domain
+        subdomains_no_tld = tld_obj.subdomain
+        tld = tld_obj.suffix
+
+        all_domains.add(f"{domain_no_tld}.{tld}")
+        if subdomains_no_tld == '':
+            continue
+
+        subdomains_list = subdomains_no_tld.split('.')
+        subdomains_list.reverse()
+        for i in range(len(subdomains_list)):
+            sublist = subdomains_list[:i+1]
+            sublist.reverse()
+            sublist.append(f"{domain_no_tld}.{tld}")
+            all_domains.add(f"{'.'.join(sublist)}")
+
+    return all_domains
+
+
+def certificate_names(count: int):
+    """Generates names similar to a certificate transparency dump: many subdomains of a few thousand domains."""
+    rng = random.Random(42)
+    suffixes = ["com", "net", "org", "co.uk", "com.au", "ca", "io"]
+    words = ["api", "www", "mail", "dev", "staging", "vpn", "cdn", "app", "auth", "static"]
+    for i in range(count):
+        labels = [rng.choice(words) + str(rng.randrange(100)) for _ in range(rng.randrange(4))]
+        labels.append(f"domain{rng.randrange(5000)}")
+        prefix = "*." if rng.random() < 0.2 else ""
+        yield prefix + ".".join(labels) + "." + rng.choice(suffixes)
+
+
+def measure(label: str, expand, count: int):
+    names = list(certificate_names(count))
+
+    start = time.perf_counter()
+    result = expand(names)
+    elapsed = time.perf_counter() - start
+
+    # Memory is measured in a second run, tracing allocations slows the expansion down
+    tracemalloc.start()
+    expand(names)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<22} {count / elapsed:>12,.0f} names/s {peak / 1024 / 1024:>8.1f} MiB peak, {result:,} domains")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    tldextract.extract("warm.up.example.com")
+    print(f"{count:,} certificate names")
+    measure("legacy get_all_domains", lambda names: len(legacy_get_all_domains(names)), count)
+    measure("iter_all_domains", lambda names: sum(1 for _ in iter_all_domains(names)), count)
+
+
+if __name__ == "__main__":
+    main()
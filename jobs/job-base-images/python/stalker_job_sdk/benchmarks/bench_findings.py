@@ -0,0 +1,79 @@
+"""
+Compares the memory usage and the serialization throughput of the SDK's finding model against the previous model,
+where findings were plain objects serialized with json.dumps(data, default=vars).
+
+Usage, from the stalker_job_sdk directory: python -m benchmarks.bench_findings [count]
+"""
+import json
+import sys
+import time
+import tracemalloc
+
+from stalker_job_sdk import PortFinding, TextField, serialization
+
+
+class LegacyTextField:
+    def __init__(self, key: str, label: str, data: str) -> None:
+        self.key = key
+        self.type = "text"
+        self.label = label
+        self.data = data
+
+
+class LegacyPortFinding:
+    def __init__(self, key, ip, port, protocol, name=None, fields=[], type="CustomFinding"):
+        self.key = key
+        self.type = type
+        self.name = name
+        self.fields = fields
+        self.ip = ip
+        self.port = port
+        self.protocol = protocol
+
+
+def legacy_dumps(data):
+    return json.dumps(data, default=vars)
+
+
+def measure(label: str, finding_class, field_class, dumps, count: int):
+    tracemalloc.start()
+    findings = [
+        finding_class(
+            "PortFinding",
+            f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}",
+            i % 65535 + 1,
+            "tcp",
+            "Port scanning finding",
+            [field_class("protocol", "This is a TCP port", "tcp")],
+            "PortFinding",
+        )
+        for i in range(count)
+    ]
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for finding in findings:
+        dumps({ "findings": [finding] })
+    elapsed = time.perf_counter() - start
+
+    print(f"{label:<26} {memory / count:>8.1f} B/finding {count / elapsed:>12,.0f} findings/s")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    print(f"{count:,} port findings")
+    measure("legacy (default=vars)", LegacyPortFinding, LegacyTextField, legacy_dumps, count)
+
+    serialization.dumps(None)
+    orjson = serialization.orjson
+    serialization.orjson = None
+    measure("slots (compiled, json)", PortFinding, TextField, serialization.dumps, count)
+    serialization.orjson = orjson
+
+    if orjson is not None:
+        measure("slots (compiled, orjson)", PortFinding, TextField, serialization.dumps, count)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Compares checking the ports of a host one at a time, as the HttpServerCheck job used to, sending a request over TLS and
+one in plaintext to each port concurrently, and sniffing the protocol of each port with a single connection.
+
+Local HTTP, HTTPS and silent servers are started on loopback ports, among closed ports. The silent servers accept the
+connections but never answer, so that their checks run to the timeout. The time of a check is also measured port by port
+on the HTTP and HTTPS servers alone.
+
+Usage, from the stalker_job_sdk directory:
+python -m benchmarks.bench_httpcheck [--ports COUNT] [--servers COUNT] [--silent COUNT] [--concurrency N] [--timeout SECONDS]
+"""
+import argparse
+import asyncio
+import socket
+import time
+
+import httpx
+
+from stalker_job_sdk.httpcheck import HttpScheme, check_http_ports
+from tests.http_servers import LocalServers
+
+
+def check_sequentially(ip: str, ports: list[int], timeout: float) -> list[tuple[int, str]]:
+    """The previous checks: a GET over TLS, then a plaintext GET, port after port."""
+    found = []
+    with httpx.Client(verify=False, http2=True) as client:
+        for port in ports:
+            for scheme in (HttpScheme.HTTPS, HttpScheme.HTTP):
+                try:
+                    client.get(f"{scheme}://{ip}:{port}", timeout=timeout)
+                    found.append((port, scheme))
+                    break
+                except Exception:
+                    pass
+    return sorted(found)
+
+
+async def _check_with_requests(ip: str, ports: list[int], concurrency: int, timeout: float) -> list[tuple[int, str]]:
+    """A HEAD over TLS and a plaintext HEAD sent together to each port, the HTTPS answer winning."""
+    found = []
+    in_flight = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=2 * concurrency, max_keepalive_connections=0)
+    async with httpx.AsyncClient(verify=False, http2=True, limits=limits) as client:
+
+        async def answered(url: str) -> bool:
+            try:
+                await client.head(url, timeout=timeout)
+                return True
+            except Exception:
+                return False
+
+        async def check(port: int):
+            async with in_flight:
+                https = asyncio.create_task(answered(f"https://{ip}:{port}/"))
+                http = asyncio.create_task(answered(f"http://{ip}:{port}/"))
+                if await https:
+                    found.append((port, HttpScheme.HTTPS))
+                elif await http:
+                    found.append((port, HttpScheme.HTTP))
+                http.cancel()
+
+        await asyncio.gather(*(check(port) for port in ports))
+    return sorted(found)
+
+
+def check_with_requests(ip: str, ports: list[int], concurrency: int, timeout: float) -> list[tuple[int, str]]:
+    return asyncio.run(_check_with_requests(ip, ports, concurrency, timeout))
+
+
+def check_with_sniffing(ip: str, ports: list[int], concurrency: int, timeout: float) -> list[tuple[int, str]]:
+    return [(check.port, check.scheme) for check in check_http_ports(ip, ports, concurrency, timeout)]
+
+
+def closed_ports(count: int) -> list[int]:
+    ports = []
+    for _ in range(count):
+        s = socket.socket()
+        s.bind(("127.0.0.1", 0))
+        ports.append(s.getsockname()[1])
+        s.close()
+    return ports
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ports", type=int, default=1000)
+    parser.add_argument("--servers", type=int, default=50, help="HTTP servers, and as many HTTPS servers")
+    parser.add_argument("--silent", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--timeout", type=float, default=1.0)
+    args = parser.parse_args()
+
+    with LocalServers(args.servers, args.servers, args.silent) as servers:
+        ports = [*servers.http, *servers.https, *servers.silent]
+        ports += closed_ports(args.ports - len(ports))
+        print(
+            f"{len(ports):,} ports: {args.servers} HTTP, {args.servers} HTTPS, {args.silent} silent, "
+            f"timeout of {args.timeout}s"
+        )
+
+        responsive = [*servers.http, *servers.https]
+        for name, check in (
+            ("sequential", lambda p, c: check_sequentially("127.0.0.1", p, args.timeout)),
+            ("requests", lambda p, c: check_with_requests("127.0.0.1", p, c, args.timeout)),
+            ("sniffing", lambda p, c: check_with_sniffing("127.0.0.1", p, c, args.timeout)),
+        ):
+            start = time.perf_counter()
+            check(responsive, 1)
+            per_port = (time.perf_counter() - start) / len(responsive)
+
+            start = time.perf_counter()
+            found = check(ports, args.concurrency)
+            elapsed = time.perf_counter() - start
+            print(
+                f"{name:>10}: {per_port * 1000:>5.2f}ms per HTTP(S) port, all the ports in {elapsed:>6.2f}s "
+                f"({len(ports) / elapsed:>6,.0f} ports/s), {len(found)} HTTP(S) ports"
+            )
+
+
+if __name__ == "__main__":
+    main()
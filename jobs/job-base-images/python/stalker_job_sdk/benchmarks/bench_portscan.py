@@ -0,0 +1,85 @@
+"""
+Compares the threads and asyncio TCP connect engines, in ports per second and peak memory.
+
+By default, a loopback target is prepared with a few open ports, closed ports, which refuse connections right away, and
+filtered ports, which never answer and run to the timeout. Another host can be scanned with --ip.
+
+Usage, from the stalker_job_sdk directory:
+python -m benchmarks.bench_portscan [--ip IP] [--ports COUNT] [--filtered COUNT] [--concurrency N] [--timeout SECONDS]
+"""
+import argparse
+import os
+import resource
+import socket
+import time
+
+from stalker_job_sdk.portscan import ScanEngine, scan_tcp_ports
+
+
+def filtered_listener() -> list[socket.socket]:
+    """
+    Opens a listener whose backlog is full, so that the connections to its port are never answered. Returns the listener
+    followed by the sockets filling its backlog.
+    """
+    listener = socket.create_server(("127.0.0.1", 0), backlog=0)
+    sockets = [listener]
+    for _ in range(3):
+        pending = socket.socket()
+        pending.setblocking(False)
+        pending.connect_ex(listener.getsockname())
+        sockets.append(pending)
+    return sockets
+
+
+def run(engine: str, ip: str, ports: list[int], concurrency: int, timeout: float):
+    """Scans from a forked child, so that the peak memory of each engine is measured separately."""
+    read, write = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read)
+        before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        start = time.perf_counter()
+        open_ports = scan_tcp_ports(ip, ports, concurrency, timeout, engine)
+        elapsed = time.perf_counter() - start
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before
+        os.write(write, f"{elapsed} {peak} {len(open_ports)}".encode())
+        os._exit(0)
+
+    os.close(write)
+    with os.fdopen(read) as f:
+        elapsed, peak, open_count = f.read().split()
+    os.waitpid(pid, 0)
+    return float(elapsed), int(peak), int(open_count)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ip", default=None)
+    parser.add_argument("--ports", type=int, default=65535)
+    parser.add_argument("--filtered", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=1000)
+    parser.add_argument("--timeout", type=float, default=0.5)
+    args = parser.parse_args()
+
+    listeners = []
+    if args.ip is None:
+        ip = "127.0.0.1"
+        listeners += [socket.create_server((ip, 0)) for _ in range(10)]
+        target_ports = { l.getsockname()[1] for l in listeners }
+        for _ in range(args.filtered):
+            sockets = filtered_listener()
+            target_ports.add(sockets[0].getsockname()[1])
+            listeners += sockets
+        ports = sorted(target_ports | set(range(1, args.ports + 1)))
+    else:
+        ip = args.ip
+        ports = list(range(1, args.ports + 1))
+
+    print(f"{len(ports):,} ports of {ip}, concurrency of {args.concurrency}, timeout of {args.timeout}s")
+    for engine in (ScanEngine.THREADS, ScanEngine.ASYNCIO):
+        elapsed, peak, open_count = run(engine, ip, ports, args.concurrency, args.timeout)
+        print(f"{engine:<10} {len(ports) / elapsed:>10,.0f} ports/s {elapsed:>8.2f}s {peak / 1024:>8.1f} MiB peak {open_count:>6} open")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+"""
+Compares resolving hostnames one at a time, as the DomainNameResolving job does with one job per hostname, with the
+bulk resolver, in hostnames per second.
+
+A stub nameserver on a loopback port answers every query after a delay, like a remote nameserver.
+
+Usage, from the stalker_job_sdk directory:
+python -m benchmarks.bench_resolver [--hostnames COUNT] [--delay SECONDS] [--concurrency N]
+"""
+import argparse
+import time
+
+from stalker_job_sdk.resolver import resolve_hostnames
+from tests.dns_server import StubDnsServer
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--hostnames", type=int, default=2000)
+    parser.add_argument("--delay", type=float, default=0.005)
+    parser.add_argument("--concurrency", type=int, default=100)
+    args = parser.parse_args()
+
+    hostnames = [f"host-{i}.example.com" for i in range(args.hostnames)]
+    zone = { hostname: [f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}"] for i, hostname in enumerate(hostnames) }
+
+    print(f"{args.hostnames:,} hostnames, answers delayed by {args.delay * 1000:.0f}ms")
+    with StubDnsServer(zone, delay=args.delay) as server:
+        for concurrency in (1, args.concurrency):
+            start = time.perf_counter()
+            resolutions = resolve_hostnames(hostnames, [server.address], concurrency)
+            elapsed = time.perf_counter() - start
+            resolved = sum(1 for r in resolutions if r.addresses)
+            print(
+                f"concurrency {concurrency:>4}: {elapsed:>6.2f}s, {args.hostnames / elapsed:>8,.0f} hostnames/s, "
+                f"{resolved:,} resolved"
+            )
+
+
+if __name__ == "__main__":
+    main()
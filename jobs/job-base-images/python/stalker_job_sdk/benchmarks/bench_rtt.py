@@ -0,0 +1,119 @@
+"""
+Loopback harness comparing fixed connect timeouts against timeouts derived from the measured round trip times.
+
+Two loopback targets are scanned: a near one, 127.0.0.1, and a distant one, 127.0.0.2, each with open, closed and
+filtered ports. Loopback has no latency, so it is injected by an event loop which reports the outcome of a connect,
+whether it is accepted or refused, only once the latency of its target has passed.
+
+Usage, from the stalker_job_sdk directory:
+python -m benchmarks.bench_rtt [--near-latency MS] [--far-latency MS] [--filtered COUNT] [--ports COUNT]
+"""
+import argparse
+import asyncio
+import socket
+import time
+
+from stalker_job_sdk.portscan import RttEstimator, iter_probes, parse_targets, scan_tcp_async
+
+NEAR = "127.0.0.1"
+FAR = "127.0.0.2"
+
+
+class LatencyEventLoop(asyncio.SelectorEventLoop):
+    """Event loop delaying the connect callbacks of the scanner by the latency of their target."""
+
+    def __init__(self, latencies: dict[str, float]) -> None:
+        super().__init__()
+        self.latencies = latencies
+        self._delayed: dict[int, asyncio.TimerHandle] = {}
+
+    def add_writer(self, fd, callback, *args):
+        probe = next((arg for arg in args if isinstance(arg, tuple)), None)
+        latency = self.latencies.get(probe[0], 0) if probe else 0
+        if not latency:
+            return super().add_writer(fd, callback, *args)
+        self._delayed[fd] = self.call_later(latency, self._add_delayed_writer, fd, callback, args)
+
+    def _add_delayed_writer(self, fd, callback, args):
+        del self._delayed[fd]
+        super().add_writer(fd, callback, *args)
+
+    def remove_writer(self, fd):
+        delayed = self._delayed.pop(fd, None)
+        if delayed is not None:
+            delayed.cancel()
+            return False
+        return super().remove_writer(fd)
+
+
+def filtered_listener(ip: str) -> list[socket.socket]:
+    """Opens a listener whose backlog is full, so that the connections to its port are never answered."""
+    listener = socket.create_server((ip, 0), backlog=0)
+    sockets = [listener]
+    for _ in range(3):
+        pending = socket.socket()
+        pending.setblocking(False)
+        pending.connect_ex(listener.getsockname())
+        sockets.append(pending)
+    return sockets
+
+
+def scan(latencies: dict[str, float], ports: list[int], timeout: float, retries: int, timing: RttEstimator):
+    loop = LatencyEventLoop(latencies)
+    try:
+        start = time.perf_counter()
+        probes = iter_probes(parse_targets(f"{NEAR},{FAR}"), ports)
+        open_ports = loop.run_until_complete(scan_tcp_async(probes, 500, timeout, retries, timing))
+        return time.perf_counter() - start, open_ports
+    finally:
+        loop.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--near-latency", type=float, default=1)
+    parser.add_argument("--far-latency", type=float, default=150)
+    parser.add_argument("--filtered", type=int, default=300)
+    parser.add_argument("--ports", type=int, default=2000)
+    args = parser.parse_args()
+
+    sockets = []
+    expected = set()
+    ports = set(range(1, args.ports + 1))
+    for ip in (NEAR, FAR):
+        for _ in range(5):
+            listener = socket.create_server((ip, 0))
+            sockets.append(listener)
+            expected.add((ip, listener.getsockname()[1]))
+            ports.add(listener.getsockname()[1])
+        for _ in range(args.filtered // 2):
+            filtered = filtered_listener(ip)
+            sockets += filtered
+            ports.add(filtered[0].getsockname()[1])
+
+    # Ports opened by other processes are not counted
+    ports = sorted(ports)
+    latencies = { NEAR: args.near_latency / 1000, FAR: args.far_latency / 1000 }
+    print(f"{len(ports):,} ports of {NEAR} ({args.near_latency}ms) and {FAR} ({args.far_latency}ms), {args.filtered} filtered")
+
+    runs = (
+        ("fixed 1.0s timeout", 1.0, 0, None),
+        ("fixed 0.1s timeout", 0.1, 0, None),
+        ("adaptive, 1 retry", 1.0, 1, RttEstimator(1.0)),
+        ("adaptive, 2 retries", 1.0, 2, RttEstimator(1.0)),
+        ("adaptive from 0.1s", 0.1, 1, RttEstimator(0.1)),
+    )
+    for name, timeout, retries, timing in runs:
+        elapsed, open_ports = scan(latencies, ports, timeout, retries, timing)
+        found = len(expected & set(open_ports))
+        print(f"{name:<22} {elapsed:>7.2f}s {found:>3} of {len(expected)} open ports found")
+        if timing is not None:
+            for line in timing.summary():
+                print(f"    {line}")
+
+    for s in sockets:
+        s.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Compares running tiny jobs with one interpreter per job, as the orchestrator does, against the warm fork server of
+main.py --serve. The job logs a single finding, so the measure is dominated by the startup of the job.
+
+Usage, from the stalker_job_sdk directory: python -m benchmarks.bench_runner [count]
+"""
+import json
+import os
+import subprocess
+import sys
+import time
+
+MAIN = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "main.py")
+
+JOB = """
+import os
+from stalker_job_sdk import DomainFinding, log_finding
+
+hostname = os.environ["HOSTNAME"]
+log_finding(DomainFinding("HostnameIpFinding", hostname, "10.0.0.1", "New ip", [], "HostnameIpFinding"))
+"""
+
+
+def environment() -> dict[str, str]:
+    env = dict(os.environ)
+    env.pop("RedKiteContext", None)
+    env["PYTHONPATH"] = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return env
+
+
+def cold(count: int) -> float:
+    env = environment()
+    start = time.perf_counter()
+    for i in range(count):
+        subprocess.run(
+            [sys.executable, MAIN, JOB],
+            env={ **env, "HOSTNAME": f"host{i}.example.com" },
+            stdout=subprocess.DEVNULL,
+            check=True,
+        )
+    return time.perf_counter() - start
+
+
+def warm(count: int) -> float:
+    jobs = "".join(
+        json.dumps({ "code": JOB, "environment": { "HOSTNAME": f"host{i}.example.com" } }) + "\n"
+        for i in range(count)
+    )
+    start = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, MAIN, "--serve"],
+        env={ **environment(), "RedKiteRunnerConcurrency": "1" },
+        input=jobs,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    elapsed = time.perf_counter() - start
+
+    ended = output.count("Status: Ended")
+    if ended != count:
+        raise Exception(f"{ended} of {count} jobs ended")
+    return elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    print(f"{count:,} jobs, one at a time")
+    for name, run in (("cold start (one interpreter per job)", cold), ("warm fork server", warm)):
+        elapsed = run(count)
+        print(f"{name:<40} {count / elapsed:>8,.1f} jobs/s")
+
+
+if __name__ == '__main__':
+    main()
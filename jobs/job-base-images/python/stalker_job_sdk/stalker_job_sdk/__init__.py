@@ -1,27 +1,201 @@
 from typing import Any, Dict
-import httpx
-import json
 import sys
-import re
-import tldextract
+import atexit
 from abc import ABC
-from ipaddress import ip_address
 from os import getenv
 from functools import lru_cache
+from importlib import import_module
 
+from .serialization import dumps, register_serializable
+
+# Most jobs are short lived, so modules that are heavy to import, like httpx, or only needed by some jobs are imported
+# on first use. These names are still importable from the package.
+_LAZY_ATTRIBUTES = {
+    "FindingBatcher": ".batching",
+    "DnsCache": ".dnscache",
+    "aresolve": ".dnscache",
+    "resolve": ".dnscache",
+    "FindingDeduplicator": ".dedup",
+    "iter_all_domains": ".domains",
+    "BackgroundEmitter": ".emitter",
+    "QueueFullPolicy": ".emitter",
+    "Outbox": ".outbox",
+    "split_domains": ".psl",
+}
+
+
+def __getattr__(name: str):
+    module = _LAZY_ATTRIBUTES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(import_module(module, __name__), name)
 
 
 @lru_cache
 def get_http_client():
+    import httpx
     return httpx.Client(verify=False, http2=True)
 
+
+def _get_orchestrator_url():
+    return getenv('RedKiteOrchestratorUrl') or 'http://orchestrator.stalker.svc.cluster.local.'
+
+
+def _post(path: str, payload: dict):
+    """Sends a request to the orchestrator, through the outbox when it is enabled."""
+    outbox = get_outbox()
+    if outbox is not None:
+        outbox.append(path, payload)
+        return
+
+    client = get_http_client()
+    client.post(f"{_get_orchestrator_url()}{path}", json=payload)
+
+
+def _post_or_raise(path: str, payload: dict):
+    """Sends a request to the orchestrator, raising an exception if it should be retried."""
+    client = get_http_client()
+    timeout = float(getenv('RedKiteRequestTimeout') or 10.0)
+    response = client.post(f"{_get_orchestrator_url()}{path}", json=payload, timeout=timeout)
+    if response.status_code >= 500:
+        raise Exception(f"Orchestrator responded with status {response.status_code}")
+    if response.status_code >= 400:
+        # Retrying a request the orchestrator considers invalid would not help
+        print(f"Orchestrator rejected {path} with status {response.status_code}: {response.text}", file=sys.stderr)
+
+
+@lru_cache
+def get_outbox():
+    """
+    Gets the on-disk outbox through which requests are sent to the orchestrator. Returns None unless it is enabled.
+
+    The outbox is opt-in and can be configured through the following environment variables:
+
+    RedKiteOutboxPath: directory of the outbox journal, setting it enables the outbox
+    RedKiteRequestTimeout: time in seconds before a request to the orchestrator is considered failed (default: 10.0)
+    RedKiteOutboxDrainTimeout: time in seconds the job waits for the outbox to be sent before exiting (default: 300)
+    """
+    directory = getenv('RedKiteOutboxPath')
+    if not directory:
+        return None
+
+    from .outbox import Outbox
+    return Outbox(directory, _post_or_raise)
+
+
+def _drain_outbox():
+    """Waits for the outbox to be sent, up to RedKiteOutboxDrainTimeout seconds."""
+    if not getenv('RedKiteOutboxPath'):
+        return
+
+    outbox = get_outbox()
+    if not outbox.drain(float(getenv('RedKiteOutboxDrainTimeout') or 300)):
+        print(f"{outbox.depth} requests could not be sent to the orchestrator, they will be replayed on restart", file=sys.stderr)
+
+
+def _post_findings(outputs: list[str]):
+    """Sends a batch of output lines to the orchestrator in a single request."""
+    _post("/Jobs/Findings", { "Findings": outputs, "RedKiteContext": getenv('RedKiteContext') })
+
+
+@lru_cache
+def get_finding_batcher():
+    """
+    Gets the batcher used to send findings and logs to the orchestrator. Returns None when batching is disabled.
+
+    The batching thresholds can be configured through the following environment variables:
+
+    RedKiteBatchSize: maximum number of findings and logs per request, 1 disables batching (default: 100)
+    RedKiteBatchMaxBytes: maximum size of a request's findings and logs, in bytes (default: 262144)
+    RedKiteBatchInterval: maximum time in seconds a finding or a log is held before being sent (default: 1.0)
+    """
+    max_count = int(getenv('RedKiteBatchSize') or 100)
+    if max_count <= 1:
+        return None
+
+    from .batching import FindingBatcher
+    batcher = FindingBatcher(
+        _post_findings,
+        max_count=max_count,
+        max_bytes=int(getenv('RedKiteBatchMaxBytes') or 256 * 1024),
+        max_delay=float(getenv('RedKiteBatchInterval') or 1.0),
+    )
+    return batcher
+
+
+@lru_cache
+def get_background_emitter():
+    """
+    Gets the emitter sending findings and logs from a background thread. Returns None unless it is enabled.
+
+    The background emitter is opt-in and can be configured through the following environment variables:
+
+    RedKiteBackgroundSender: set to true to send findings and logs from a background thread (default: false)
+    RedKiteQueueSize: maximum number of findings and logs waiting to be sent (default: 10000)
+    RedKiteQueueFullPolicy: what to do when the queue is full, either block, drop-debug or spill, block when unknown
+        (default: block)
+    """
+    if not to_boolean(getenv('RedKiteBackgroundSender')):
+        return None
+
+    from .emitter import BackgroundEmitter, QueueFullPolicy
+    policy = getenv('RedKiteQueueFullPolicy') or QueueFullPolicy.BLOCK
+    if policy not in (QueueFullPolicy.BLOCK, QueueFullPolicy.DROP_DEBUG, QueueFullPolicy.SPILL):
+        # The emitter is created by the first log, a job must not fail there
+        print(f"Unknown RedKiteQueueFullPolicy {policy}, {QueueFullPolicy.BLOCK} is used instead", file=sys.stderr)
+        policy = QueueFullPolicy.BLOCK
+
+    return BackgroundEmitter(
+        _send_output,
+        max_size=int(getenv('RedKiteQueueSize') or 10000),
+        policy=policy,
+    )
+
+
+def _send_output(output: str):
+    """Sends an output line to the orchestrator, through the batcher when batching is enabled."""
+    batcher = get_finding_batcher()
+    if batcher is not None:
+        batcher.add(output)
+        return
+
+    _post("/Jobs/Finding", { "Finding": output, "RedKiteContext": getenv('RedKiteContext') })
+
+
+def _flush_findings():
+    """Sends the findings and logs still waiting in the background emitter and the batcher, if any."""
+    if not getenv('RedKiteContext'):
+        return
+
+    # Only an emitter or a batcher which was already used holds output, none is created here, especially at exit
+    if get_background_emitter.cache_info().currsize > 0:
+        emitter = get_background_emitter()
+        if emitter is not None:
+            emitter.drain()
+
+    if get_finding_batcher.cache_info().currsize > 0:
+        batcher = get_finding_batcher()
+        if batcher is not None:
+            batcher.flush()
+
+
+# atexit handlers run in reverse order: findings are flushed into the outbox before it is drained
+atexit.register(_drain_outbox)
+atexit.register(_flush_findings)
+
+
+@register_serializable
 class Field(ABC):
+    __slots__ = ("key", "type")
+
     def __init__(self, key: str, type: str):
         self.key = key
         self.type = type
 
 
 class TextField(Field):
+    __slots__ = ("label", "data")
+
     def __init__(self, key: str, label: str, data: str) -> None:
         super().__init__(key, "text")
         self.label = label
@@ -29,41 +203,50 @@ class TextField(Field):
 
 
 class ImageField(Field):
+    __slots__ = ("data",)
+
     def __init__(self, key: str, data: str) -> None:
         super().__init__(key, "image")
         self.data = data
 
 
+@register_serializable
 class Finding(ABC):
+    __slots__ = ("key", "type", "name", "fields")
+
     def __init__(
-        self, key: str, type: str, name: str = None, fields: list[Field] = []
+        self, key: str, type: str, name: str = None, fields: list[Field] = None
     ) -> None:
         self.key = key
         self.type = type
         self.name = name
-        self.fields = fields
+        self.fields = fields if fields is not None else []
 
 
 class IpFinding(Finding):
+    __slots__ = ("ip",)
+
     def __init__(
         self,
         key: str,
         ip: str,
         name: str = None,
-        fields: list[Field] = [],
+        fields: list[Field] = None,
         type: str = "CustomFinding",
     ):
         super().__init__(key, type, name, fields)
         self.ip = ip
 
 class IpRangeFinding(Finding):
+    __slots__ = ("ip", "mask")
+
     def __init__(
         self,
         key: str,
         ip: str,
         mask: str,
         name: str = None,
-        fields: list[Field] = [],
+        fields: list[Field] = None,
         type: str = "CustomFinding",
     ):
         super().__init__(key, type, name, fields)
@@ -71,6 +254,8 @@ class IpRangeFinding(Finding):
         self.mask = mask
 
 class PortFinding(Finding):
+    __slots__ = ("ip", "port", "protocol")
+
     def __init__(
         self,
         key: str,
@@ -78,7 +263,7 @@ class PortFinding(Finding):
         port: int,
         protocol: str,
         name: str = None,
-        fields: list[Field] = [],
+        fields: list[Field] = None,
         type: str = "CustomFinding",
     ):
         super().__init__(key, type, name, fields)
@@ -87,6 +272,8 @@ class PortFinding(Finding):
         self.protocol = protocol
 
 class WebsiteFinding(Finding):
+    __slots__ = ("ip", "port", "domainName", "protocol", "path", "ssl")
+
     def __init__(
         self,
         key: str,
@@ -96,7 +283,7 @@ class WebsiteFinding(Finding):
         path: str,
         ssl: bool = None,
         name: str = None,
-        fields: list[Field] = [],
+        fields: list[Field] = None,
         type: str = "CustomFinding",
     ):
         super().__init__(key, type, name, fields)
@@ -108,13 +295,15 @@ class WebsiteFinding(Finding):
         self.ssl = ssl
 
 class DomainFinding(Finding):
+    __slots__ = ("ip", "domainName")
+
     def __init__(
         self,
         key: str,
         domainName: str,
         ip: str,
         name: str = None,
-        fields: list[Field] = [],
+        fields: list[Field] = None,
         type: str = "CustomFinding",
     ):
         super().__init__(key, type, name, fields)
@@ -122,6 +311,8 @@ class DomainFinding(Finding):
         self.domainName = domainName
 
 class TagFinding(Finding):
+    __slots__ = ("ip", "port", "domainName", "protocol", "path", "tag", "mask")
+
     def __init__(
         self,
         tag: str,
@@ -191,37 +382,11 @@ def get_all_domains(domainNames: list['str']) -> list['str']:
     asd.asd.com
     abc.asd.asd.com
     """
-    domain_regex = r"(?:(?:[a-z0-9](?:[a-z0-9\x2d]*[a-z0-9])?\.)+[a-z0-9](?:[a-z0-9\x2d]*[a-z0-9])?|\[(?:(?:(2(5[0-5]|[0-4][0-9])|1[0-9][0-9]|[1-9]?[0-9]))\.){3}(?:(2(5[0-5]|[0-4][0-9])|1[0-9][0-9]|[1-9]?[0-9])|[a-z0-9\x2d]*[a-z0-9]:(?:[\x01-\x08\x0b\x0c\x0e-\x1f\x21-\x5a\x53-\x7f]|\\[\x01-\x09\x0b\x0c\x0e-\x7f])+)\])"
-    all_domains = set()
-    for domain in domainNames:
-        match = re.search(domain_regex, domain) 
-        if match is None:
-            continue
-
-        full_domain = match.group()
-        tld_obj = tldextract.extract(full_domain)
-        domain_no_tld = tld_obj.domain
-        subdomains_no_tld = tld_obj.subdomain
-        tld = tld_obj.suffix
-
-        
-        all_domains.add(f"{domain_no_tld}.{tld}")
-        if subdomains_no_tld == '':
-            continue
-
-        subdomains_list = subdomains_no_tld.split('.')
-        subdomains_list.reverse()
-        for i in range(len(subdomains_list)):
-            sublist = subdomains_list[:i+1]
-            sublist.reverse()
-            sublist.append(f"{domain_no_tld}.{tld}")
-            
-            all_domains.add(f"{'.'.join(sublist)}")
-
-    return all_domains
-
-
-def emit_all_domains(domainNames: list['str']):
+    from .domains import iter_all_domains
+    return set(iter_all_domains(domainNames))
+
+
+def emit_all_domains(domainNames: list['str'], batch_size: int = 100):
     """
     Emits domain findings for all domains and subdomains of the strings in domainNames. It also manages leading dots and wildcards and trailing dots.
 
@@ -235,23 +400,95 @@ def emit_all_domains(domainNames: list['str']):
     asd.com
     asd.asd.com
     abc.asd.asd.com
+
+    Findings are emitted as the domain names are consumed, up to batch_size findings at a time, so domainNames can be
+    a generator reading a large file.
     """
-    # https://stackoverflow.com/questions/201323/how-can-i-validate-an-email-address-using-a-regular-expression
-    all_domains = get_all_domains(domainNames)
-    for domain in all_domains:
-        log_finding(
+    from .domains import iter_all_domains
+    batch = []
+    for domain in iter_all_domains(domainNames):
+        batch.append(
             DomainFinding(
                 "HostnameFinding", domain, None, "New domain", [], "HostnameFinding"
             )
         )
+        if len(batch) >= batch_size:
+            log_finding(*batch)
+            batch = []
+
+    if batch:
+        log_finding(*batch)
 
 class JobStatus:
     SUCCESS = "Success"
     FAILED = "Failed"
 
+@lru_cache
+def get_finding_deduplicator():
+    """
+    Gets the deduplicator suppressing the findings already logged by the job. Returns None when it is disabled.
+
+    The deduplication can be configured through the following environment variables:
+
+    RedKiteDeduplicate: set to false to log every finding, even duplicates (default: true)
+    RedKiteDedupExactSize: number of findings remembered exactly, the next ones are not deduplicated (default: 100000)
+    RedKiteDedupCapacity: number of findings a Bloom filter is sized for, setting it switches to the Bloom filter once
+        the exact size is reached, which may suppress a new finding (default: none)
+    RedKiteDedupErrorRate: probability for the Bloom filter to suppress a new finding at capacity (default: 0.0001)
+    """
+    if to_boolean(getenv('RedKiteDeduplicate')) is False:
+        return None
+
+    from .dedup import FindingDeduplicator
+    return FindingDeduplicator(
+        max_exact=int(getenv('RedKiteDedupExactSize') or 100_000),
+        capacity=int(getenv('RedKiteDedupCapacity') or 0) or None,
+        error_rate=float(getenv('RedKiteDedupErrorRate') or 0.0001),
+    )
+
+
+@lru_cache
+def get_dns_cache():
+    """
+    Gets the cache of the hostnames resolved by the job through `resolve`. Its counters are logged when the job ends.
+
+    The cache can be configured through the following environment variables:
+
+    RedKiteDnsNameservers: comma separated nameservers, such as 1.1.1.1,127.0.0.1:5353 (default: the ones of /etc/resolv.conf)
+    RedKiteDnsCacheFile: path of a SQLite file caching the resolutions for all the jobs of the node (default: none)
+    RedKiteDnsNegativeTtl: seconds during which a hostname without address is cached (default: 60)
+    RedKiteDnsMaxTtl: longest time a resolution is cached, in seconds, whatever its TTL (default: 3600)
+    RedKiteDnsCacheSize: number of resolutions kept in memory (default: 10000)
+    """
+    from .dnscache import DnsCache
+    nameservers = [n.strip() for n in (getenv('RedKiteDnsNameservers') or "").split(",") if n.strip()]
+    return DnsCache(
+        nameservers=nameservers or None,
+        path=getenv('RedKiteDnsCacheFile') or None,
+        negative_ttl=float(getenv('RedKiteDnsNegativeTtl') or 60),
+        max_ttl=float(getenv('RedKiteDnsMaxTtl') or 3600),
+        max_entries=int(getenv('RedKiteDnsCacheSize') or 10_000),
+    )
+
+
+def _serialize_findings(findings: tuple[Finding]) -> str:
+    """Serializes findings for a @finding output, leaving out the ones already logged. Returns None if none are left."""
+    serialized = [dumps(finding) for finding in findings]
+
+    deduplicator = get_finding_deduplicator()
+    if deduplicator is not None:
+        serialized = [finding for finding in serialized if not deduplicator.is_duplicate(finding)]
+
+    if not serialized:
+        return None
+
+    return '{"findings":[' + ','.join(serialized) + ']}'
+
+
 def log_finding(*findings: list[Finding]):
-    data = {"findings": findings}
-    _log("@finding", json.dumps(data, default=vars))
+    data = _serialize_findings(findings)
+    if data is not None:
+        _log("@finding", data)
 
 
 def log_debug(message: str):
@@ -272,15 +509,18 @@ def log_error(message: str):
 
 def _log(prefix: str, message: str):
     context = getenv('RedKiteContext')
-    orchestratorUrl = getenv('RedKiteOrchestratorUrl') or 'http://orchestrator.stalker.svc.cluster.local.'
     output = f"{prefix} {message}"
     if(not context):
         print(output)
         sys.stdout.flush()
         return
 
-    client = get_http_client()
-    client.post(f"{orchestratorUrl}/Jobs/Finding", json={ "Finding": output, "RedKiteContext": context})
+    emitter = get_background_emitter()
+    if emitter is not None:
+        emitter.put(output)
+        return
+
+    _send_output(output)
 
 def log_status(status: str):
     """Reports the status to the orchestrator. Status can be Success of Failed."""
@@ -288,32 +528,50 @@ def log_status(status: str):
         return
     
     context = getenv('RedKiteContext')
-    orchestratorUrl = getenv('RedKiteOrchestratorUrl') or 'http://orchestrator.stalker.svc.cluster.local.'
     
     if(not context):
         print(f"Status: {status}")
         sys.stdout.flush()
         return
     
-    client = get_http_client()
-    client.post(f"{orchestratorUrl}/Jobs/Status", json={ "Status": status, "RedKiteContext": context})
+    # Findings must reach the orchestrator before the status does
+    _flush_findings()
+    _post("/Jobs/Status", { "Status": status, "RedKiteContext": context })
 
 
 def _log_done():
     """Reports the job has ended."""
     context = getenv('RedKiteContext')
-    orchestratorUrl = getenv('RedKiteOrchestratorUrl') or 'http://orchestrator.stalker.svc.cluster.local.'
-    
+
+    deduplicator = get_finding_deduplicator()
+    if deduplicator is not None and deduplicator.suppressed > 0:
+        log_debug(f"{deduplicator.suppressed} duplicate findings were suppressed")
+
+    # Only jobs which resolved hostnames through `resolve` have a DNS cache
+    if get_dns_cache.cache_info().currsize > 0:
+        log_debug(get_dns_cache().describe())
+
     if(not context):
         print(f"Status: Ended")
         sys.stdout.flush()
         return
     
-    client = get_http_client()
-    client.post(f"{orchestratorUrl}/Jobs/Status", json={ "Status": "Ended", "RedKiteContext": context})
+    emitter = get_background_emitter()
+    if emitter is not None and emitter.dropped > 0:
+        log_warning(f"{emitter.dropped} debug logs were dropped because they were produced faster than they could be sent")
+
+    outbox = get_outbox()
+    if outbox is not None:
+        stats = outbox.stats()
+        log_debug(f"Outbox: {stats['sent']} requests sent, {stats['retries']} retries, {stats['replayed']} replayed, max depth of {stats['max_depth']}")
+
+    _flush_findings()
+    _post("/Jobs/Status", { "Status": "Ended", "RedKiteContext": context })
+    _drain_outbox()
     
 def is_valid_ip(ip: str):
     """Validates an IP address. Returns false if the IP is invalid, true otherwise."""
+    from ipaddress import ip_address
     try:
         ip = ip_address(ip)
     except ValueError:
@@ -0,0 +1,149 @@
+"""
+Asyncio flavour of the job SDK.
+
+The coroutines of this module mirror the logging functions of `stalker_job_sdk`, so that asyncio jobs never block their
+event loop while reporting to the orchestrator. Findings and logs go through the same batcher, background emitter and
+outbox as the ones of the synchronous SDK, from the default executor of the event loop since sending a batch blocks.
+When none of them is enabled, they are sent with a pooled `httpx.AsyncClient`.
+
+Example:
+
+    from stalker_job_sdk import IpFinding, JobStatus
+    from stalker_job_sdk.aio import alog_finding, alog_status
+
+    await alog_finding(IpFinding("IpFinding", "127.0.0.1"))
+    await alog_status(JobStatus.SUCCESS)
+"""
+import asyncio
+import sys
+import weakref
+from os import getenv
+
+import httpx
+
+from . import (Finding, JobStatus, _flush_findings, _get_orchestrator_url, _log, _post, _serialize_findings,
+               get_background_emitter, get_dns_cache, get_finding_batcher, get_finding_deduplicator, get_outbox)
+
+
+class _AsyncTransport:
+    def __init__(self, client: httpx.AsyncClient, max_in_flight: int) -> None:
+        self.client = client
+        self.in_flight = asyncio.Semaphore(max_in_flight)
+
+
+# An httpx.AsyncClient is bound to the event loop that created it, there is one transport per running loop
+_transports: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _AsyncTransport]' = weakref.WeakKeyDictionary()
+
+
+def _get_transport() -> _AsyncTransport:
+    loop = asyncio.get_running_loop()
+    transport = _transports.get(loop)
+    if transport is None:
+        max_in_flight = int(getenv('RedKiteMaxInFlight') or 32)
+        client = httpx.AsyncClient(
+            verify=False,
+            http2=True,
+            limits=httpx.Limits(max_connections=max_in_flight, max_keepalive_connections=max_in_flight),
+        )
+        transport = _AsyncTransport(client, max_in_flight)
+        _transports[loop] = transport
+    return transport
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """
+    Gets the pooled async HTTP client of the running event loop.
+
+    The number of requests sent at the same time to the orchestrator is bounded by the RedKiteMaxInFlight
+    environment variable (default: 32).
+    """
+    return _get_transport().client
+
+
+def _is_buffered() -> bool:
+    """Whether the output lines are buffered by the synchronous SDK rather than sent one request each."""
+    return get_finding_batcher() is not None or get_background_emitter() is not None or get_outbox() is not None
+
+
+async def _apost(path: str, payload: dict):
+    transport = _get_transport()
+    async with transport.in_flight:
+        await transport.client.post(f"{_get_orchestrator_url()}{path}", json=payload)
+
+
+async def alog_finding(*findings: list[Finding]):
+    data = _serialize_findings(findings)
+    if data is not None:
+        await _alog("@finding", data)
+
+
+async def alog_debug(message: str):
+    await _alog("@debug", message)
+
+
+async def alog_info(message: str):
+    await _alog("@info", message)
+
+
+async def alog_warning(message: str):
+    await _alog("@warning", message)
+
+
+async def alog_error(message: str):
+    await _alog("@error", message)
+
+
+async def _alog(prefix: str, message: str):
+    context = getenv('RedKiteContext')
+    output = f"{prefix} {message}"
+    if(not context):
+        print(output)
+        sys.stdout.flush()
+        return
+
+    if _is_buffered():
+        await asyncio.to_thread(_log, prefix, message)
+        return
+
+    await _apost("/Jobs/Finding", { "Finding": output, "RedKiteContext": context })
+
+
+async def _alog_status(status: str):
+    context = getenv('RedKiteContext')
+    if(not context):
+        print(f"Status: {status}")
+        sys.stdout.flush()
+        return
+
+    # Findings must reach the orchestrator before the status does
+    await asyncio.to_thread(_flush_findings)
+    if get_outbox() is not None:
+        # Queued behind the findings waiting in the outbox
+        await asyncio.to_thread(_post, "/Jobs/Status", { "Status": status, "RedKiteContext": context })
+        return
+
+    await _apost("/Jobs/Status", { "Status": status, "RedKiteContext": context })
+
+
+async def alog_status(status: str):
+    """Reports the status to the orchestrator. Status can be Success of Failed."""
+    if status != JobStatus.SUCCESS and status != JobStatus.FAILED:
+        return
+
+    await _alog_status(status)
+
+
+async def _alog_done():
+    """Reports the job has ended and closes the async HTTP client of the running event loop."""
+    deduplicator = get_finding_deduplicator()
+    if deduplicator is not None and deduplicator.suppressed > 0:
+        await alog_debug(f"{deduplicator.suppressed} duplicate findings were suppressed")
+
+    if get_dns_cache.cache_info().currsize > 0:
+        await alog_debug(get_dns_cache().describe())
+
+    await _alog_status("Ended")
+
+    transport = _transports.pop(asyncio.get_running_loop(), None)
+    if transport is not None:
+        await transport.client.aclose()
@@ -0,0 +1,77 @@
+import threading
+from time import monotonic
+from typing import Callable
+
+
+class FindingBatcher:
+    """
+    Buffers job output lines (findings and logs) and hands them to `send` in batches.
+
+    A batch is flushed when it holds `max_count` lines, when it reaches `max_bytes` of encoded output or when
+    its oldest line has waited `max_delay` seconds. Lines are always sent in the order they were added.
+
+    @param send Callable receiving the list of buffered output lines
+    @param max_count Maximum number of lines in a batch
+    @param max_bytes Maximum size of a batch, in bytes of UTF-8 encoded output
+    @param max_delay Maximum time, in seconds, a line can wait in the buffer
+    """
+
+    def __init__(
+        self,
+        send: Callable[[list[str]], None],
+        max_count: int = 100,
+        max_bytes: int = 256 * 1024,
+        max_delay: float = 1.0,
+    ) -> None:
+        self._send = send
+        self.max_count = max_count
+        self.max_bytes = max_bytes
+        self.max_delay = max_delay
+        self._lock = threading.RLock()
+        self._buffer: list[str] = []
+        self._buffer_bytes = 0
+        self._oldest: float = None
+        self._timer: threading.Timer = None
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    def add(self, output: str):
+        """Buffers an output line, flushing the batch if a threshold is reached."""
+        with self._lock:
+            self._buffer.append(output)
+            self._buffer_bytes += len(output.encode("utf-8"))
+
+            if self._oldest is None:
+                self._oldest = monotonic()
+                self._start_timer()
+
+            if (
+                len(self._buffer) >= self.max_count
+                or self._buffer_bytes >= self.max_bytes
+                or monotonic() - self._oldest >= self.max_delay
+            ):
+                self.flush()
+
+    def flush(self):
+        """Sends every buffered line now. Does nothing if the buffer is empty."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+            if not self._buffer:
+                return
+
+            batch = self._buffer
+            self._buffer = []
+            self._buffer_bytes = 0
+            self._oldest = None
+            self._send(batch)
+
+    def _start_timer(self):
+        if self.max_delay is None or self.max_delay <= 0:
+            return
+        self._timer = threading.Timer(self.max_delay, self.flush)
+        self._timer.daemon = True
+        self._timer.start()
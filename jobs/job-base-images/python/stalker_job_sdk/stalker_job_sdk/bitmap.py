@@ -0,0 +1,121 @@
+"""
+Tracks the hosts and the open ports found in an IPv4 range with bitmaps instead of sets.
+
+A bit is kept for each address of the range, and for each (address, port) pair, indexed by the offset of the address
+from the start of the range. The bitmaps are split in pages allocated when one of their bits is first set, so that the
+memory used grows with the part of the range where something was found, up to one bit per address and per port.
+"""
+from ipaddress import ip_network
+from socket import AF_INET, inet_pton
+
+# Bits per page of a bitmap, 8KiB pages
+PAGE_BITS = 1 << 16
+PORT_COUNT = 1 << 16
+
+
+def parse_ipv4(ip: str) -> int:
+    """Parses a dotted IPv4 address, such as "10.0.0.1", to an integer. Raises a ValueError if the address is invalid."""
+    try:
+        return int.from_bytes(inet_pton(AF_INET, ip), "big")
+    except (OSError, TypeError):
+        raise ValueError(f"Invalid IPv4 address: {ip}") from None
+
+
+class Bitmap:
+    """
+    Set of the integers from 0 to size - 1, stored as one bit each.
+
+    @param size Number of integers that can be stored
+    @param page_bits Bits per page, a power of two. The pages are allocated when one of their bits is first set
+    """
+
+    def __init__(self, size: int, page_bits: int = PAGE_BITS) -> None:
+        if page_bits < 8 or page_bits & (page_bits - 1):
+            raise ValueError("The bits per page must be a power of two of at least 8")
+
+        self.size = size
+        self.count = 0
+        self._page_bits = page_bits
+        self._shift = page_bits.bit_length() - 1
+        self._mask = page_bits - 1
+        self._pages: dict[int, bytearray] = {}
+
+    def add(self, index: int) -> bool:
+        """Sets the bit of an integer. Returns True if it was not set yet."""
+        if not 0 <= index < self.size:
+            raise IndexError(f"{index} is out of the bitmap's range")
+
+        page = self._pages.get(index >> self._shift)
+        if page is None:
+            page = self._pages[index >> self._shift] = bytearray(self._page_bits >> 3)
+
+        offset = index & self._mask
+        bit = 1 << (offset & 7)
+        if page[offset >> 3] & bit:
+            return False
+
+        page[offset >> 3] |= bit
+        self.count += 1
+        return True
+
+    def __contains__(self, index: int) -> bool:
+        page = self._pages.get(index >> self._shift) if 0 <= index < self.size else None
+        if page is None:
+            return False
+        offset = index & self._mask
+        return bool(page[offset >> 3] & (1 << (offset & 7)))
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes allocated for the pages."""
+        return len(self._pages) * (self._page_bits >> 3)
+
+
+class RangeTracker:
+    """
+    Remembers the hosts and the open ports already found in an IPv4 range, so that each one is reported once.
+
+    The ports are stored port by port, the bits of a port covering the whole range, so that scanning a few ports of a
+    large range uses a few pages per port found open.
+
+    @param network The scanned range, such as "10.0.0.0/8"
+    """
+
+    def __init__(self, network: str, page_bits: int = PAGE_BITS) -> None:
+        self.network = ip_network(network, strict=False)
+        if self.network.version != 4:
+            raise ValueError(f"Only IPv4 ranges can be tracked: {network}")
+
+        self._base = int(self.network.network_address)
+        self._size = self.network.num_addresses
+        self.hosts = Bitmap(self._size, page_bits)
+        self.ports = Bitmap(self._size * PORT_COUNT, page_bits)
+
+    def _offset(self, ip: str) -> int:
+        offset = parse_ipv4(ip) - self._base
+        if not 0 <= offset < self._size:
+            raise ValueError(f"{ip} is not in {self.network}")
+        return offset
+
+    def add_host(self, ip: str) -> bool:
+        """Remembers a host. Returns True if it was not found yet."""
+        return self.hosts.add(self._offset(ip))
+
+    def add(self, ip: str, port: int) -> tuple[bool, bool]:
+        """
+        Remembers a host and one of its open ports. Returns whether the host, and whether the port of the host, were not
+        found yet. Raises a ValueError if the host is not in the range or if the port is invalid.
+        """
+        if not 0 <= port < PORT_COUNT:
+            raise ValueError(f"Invalid port: {port}")
+
+        offset = self._offset(ip)
+        return self.hosts.add(offset), self.ports.add(port * self._size + offset)
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes allocated for the bitmaps."""
+        return self.hosts.nbytes + self.ports.nbytes
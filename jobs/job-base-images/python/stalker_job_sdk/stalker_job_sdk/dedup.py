@@ -0,0 +1,92 @@
+import hashlib
+import math
+import threading
+
+
+class BloomFilter:
+    """
+    Fixed size set membership filter. It may report an item that was never added as present, with a probability of
+    `error_rate` once `capacity` items were added, but never reports an added item as absent.
+
+    @param capacity Number of items the filter is sized for
+    @param error_rate Expected false positive probability at capacity
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.0001) -> None:
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _indexes(self, digest: bytes):
+        # Double hashing: the k indexes are derived from two 64 bits values of a 128 bits digest
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:16], "little") | 1
+        for i in range(self.hash_count):
+            yield (h1 + i * h2) % self.size
+
+    def __contains__(self, digest: bytes) -> bool:
+        return all(self._bits[index >> 3] & (1 << (index & 7)) for index in self._indexes(digest))
+
+    def add(self, digest: bytes) -> bool:
+        """Adds a 16 bytes digest to the filter. Returns true if it was possibly already present."""
+        present = True
+        for index in self._indexes(digest):
+            byte, bit = index >> 3, 1 << (index & 7)
+            if not self._bits[byte] & bit:
+                present = False
+                self._bits[byte] |= bit
+        return present
+
+
+class FindingDeduplicator:
+    """
+    Remembers the canonical form of the findings of a job to detect exact duplicates.
+
+    Findings are remembered as 16 bytes digests in an exact set. Once the set holds `max_exact` digests, the new findings
+    are no longer remembered, so that a finding is never suppressed by mistake. When a `capacity` is given, the digests
+    are moved to a Bloom filter instead, which uses a fixed amount of memory but may report a new finding as a duplicate
+    with a probability of `error_rate`.
+
+    @param max_exact Maximum number of digests kept in the exact set
+    @param capacity Number of findings the Bloom filter is sized for, None to never use a Bloom filter
+    @param error_rate Expected false positive probability of the Bloom filter at capacity
+    """
+
+    def __init__(self, max_exact: int = 100_000, capacity: int = None, error_rate: float = 0.0001) -> None:
+        self.max_exact = max_exact
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.suppressed = 0
+        self._exact: set[bytes] = set()
+        self._bloom: BloomFilter = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def digest(canonical: str) -> bytes:
+        return hashlib.blake2b(canonical.encode("utf-8"), digest_size=16).digest()
+
+    def is_duplicate(self, canonical: str) -> bool:
+        """Returns true if the finding was already seen, and remembers it otherwise."""
+        digest = self.digest(canonical)
+        with self._lock:
+            if self._bloom is not None:
+                duplicate = self._bloom.add(digest)
+            elif digest in self._exact:
+                duplicate = True
+            else:
+                duplicate = False
+                if len(self._exact) < self.max_exact:
+                    self._exact.add(digest)
+                elif self.capacity:
+                    self._exact.add(digest)
+                    self._move_to_bloom_filter()
+
+            if duplicate:
+                self.suppressed += 1
+            return duplicate
+
+    def _move_to_bloom_filter(self):
+        self._bloom = BloomFilter(max(self.capacity, len(self._exact) * 2), self.error_rate)
+        for digest in self._exact:
+            self._bloom.add(digest)
+        self._exact = set()
@@ -0,0 +1,312 @@
+"""
+Resolves hostnames through a cache honouring the TTL of their DNS records.
+
+The IPv4 addresses of a hostname are kept until the smallest TTL of its answers expires. Hostnames which do not exist, or
+have no address, are kept for a fixed negative TTL. Failed resolutions, such as timeouts, are not kept.
+
+As with the resolver of the system, the hostnames of /etc/hosts are answered from it, and the search domains of
+/etc/resolv.conf are honoured: hostnames without a dot, and hostnames with fewer dots than its `ndots` option which do not
+resolve as they are, are resolved with `getaddrinfo`. These resolutions are never cached, their negative answers depend on
+the search domains and their positive ones come without a TTL.
+
+The cache is held in memory by each process, and can also be written to a SQLite file shared by the job processes of a
+node, so that a hostname resolved by one job is not resolved again by the next ones.
+
+Example:
+
+    from stalker_job_sdk import resolve
+
+    resolve("example.com")  # ["93.184.215.14"]
+"""
+import asyncio
+import functools
+import os
+import socket
+import threading
+import time
+from ipaddress import ip_address
+from typing import Iterable
+
+from .resolver import BulkResolver, Resolution
+
+# Errors of the resolutions which are cached as negative answers
+_NEGATIVE_ERRORS = (None, "NXDOMAIN", "INVALID")
+
+# Expired rows of the cache file are deleted every this many writes
+_PURGE_INTERVAL = 1000
+
+
+def read_hosts(path: str = "/etc/hosts") -> dict[str, list[str]]:
+    """Reads the IPv4 addresses of the hostnames of a hosts file."""
+    hosts: dict[str, list[str]] = {}
+    try:
+        with open(path) as f:
+            for line in f:
+                parts = line.split("#", 1)[0].split()
+                if len(parts) < 2 or ":" in parts[0]:
+                    continue
+                for hostname in parts[1:]:
+                    addresses = hosts.setdefault(hostname.rstrip(".").lower(), [])
+                    if parts[0] not in addresses:
+                        addresses.append(parts[0])
+    except OSError:
+        pass
+    return hosts
+
+
+def read_search_settings(path: str = "/etc/resolv.conf") -> tuple[list[str], int]:
+    """Reads the search domains and the ndots option of a resolv.conf file."""
+    search, ndots = [], 1
+    try:
+        with open(path) as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2 and parts[0] in ("search", "domain"):
+                    search = parts[1:]
+                elif len(parts) >= 2 and parts[0] == "options":
+                    for option in parts[1:]:
+                        if option.startswith("ndots:") and option[6:].isdigit():
+                            ndots = int(option[6:])
+    except OSError:
+        pass
+    return search, ndots
+
+
+class DnsCache:
+    """
+    @param nameservers Nameservers queried on a miss, defaults to the ones of /etc/resolv.conf, whose search domains are
+        then honoured
+    @param path Path of the cache file shared by the processes of a node, None to cache in memory only
+    @param negative_ttl Seconds during which a hostname without address is cached
+    @param max_ttl Longest time a resolution is cached, in seconds, whatever its TTL
+    @param max_entries Number of resolutions kept in memory, the oldest ones are dropped first
+    """
+
+    def __init__(
+        self,
+        nameservers: Iterable[str] = None,
+        path: str = None,
+        negative_ttl: float = 60,
+        max_ttl: float = 3600,
+        max_entries: int = 10_000,
+        timeout: float = 2.0,
+        retries: int = 2,
+        hosts_path: str = "/etc/hosts",
+        resolv_conf_path: str = "/etc/resolv.conf",
+    ) -> None:
+        self.nameservers = list(nameservers) if nameservers else None
+        self.hosts = read_hosts(hosts_path)
+        # Search domains are a setting of the nameservers of resolv.conf
+        self.search, self.ndots = read_search_settings(resolv_conf_path) if self.nameservers is None else ([], 1)
+        self.path = path
+        self.negative_ttl = negative_ttl
+        self.max_ttl = max_ttl
+        self.max_entries = max(1, max_entries)
+        self.timeout = timeout
+        self.retries = retries
+
+        self.hits = 0
+        self.misses = 0
+        self.negative_hits = 0
+        self.file_hits = 0
+
+        self._entries: dict[str, tuple[float, Resolution]] = {}
+        self._lock = threading.Lock()
+        self._in_flight: dict[str, asyncio.Task] = {}
+        self._db = None
+        self._db_pid = None
+        self._writes = 0
+
+    def _connection(self):
+        # A SQLite connection must not be used across a fork, each process opens its own
+        if self._db is None or self._db_pid != os.getpid():
+            import sqlite3
+            db = sqlite3.connect(self.path, timeout=1.0, isolation_level=None, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS resolutions "
+                "(hostname TEXT PRIMARY KEY, expires REAL, addresses TEXT, cnames TEXT, error TEXT)"
+            )
+            self._db, self._db_pid = db, os.getpid()
+        return self._db
+
+    def _read_file(self, hostname: str, now: float) -> tuple[float, Resolution]:
+        import sqlite3
+        try:
+            row = self._connection().execute(
+                "SELECT expires, addresses, cnames, error FROM resolutions WHERE hostname = ? AND expires > ?",
+                (hostname, now),
+            ).fetchone()
+        except sqlite3.Error:
+            # The file cache is best effort, a locked or broken file is a miss
+            return None
+
+        if row is None:
+            return None
+        expires, addresses, cnames, error = row
+        addresses = addresses.split(",") if addresses else []
+        cnames = cnames.split(",") if cnames else []
+        return expires, Resolution(hostname, addresses, cnames, max(0, int(expires - now)), error)
+
+    def _write_file(self, expires: float, resolution: Resolution, now: float):
+        import sqlite3
+        try:
+            db = self._connection()
+            db.execute(
+                "INSERT OR REPLACE INTO resolutions VALUES (?, ?, ?, ?, ?)",
+                (resolution.hostname, expires, ",".join(resolution.addresses), ",".join(resolution.cnames), resolution.error),
+            )
+            self._writes += 1
+            if self._writes % _PURGE_INTERVAL == 0:
+                db.execute("DELETE FROM resolutions WHERE expires <= ?", (now,))
+        except sqlite3.Error:
+            pass
+
+    def _remember(self, hostname: str, expires: float, resolution: Resolution):
+        self._entries.pop(hostname, None)
+        self._entries[hostname] = (expires, resolution)
+        while len(self._entries) > self.max_entries:
+            del self._entries[next(iter(self._entries))]
+
+    def get(self, hostname: str) -> Resolution:
+        """Gets the cached resolution of a hostname, from memory or from the cache file. Returns None on a miss."""
+        hostname = hostname.rstrip(".").lower()
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(hostname)
+            if entry is not None and entry[0] <= now:
+                del self._entries[hostname]
+                entry = None
+
+            if entry is None and self.path:
+                entry = self._read_file(hostname, now)
+                if entry is not None:
+                    self.file_hits += 1
+                    self._remember(hostname, *entry)
+
+            if entry is None:
+                return None
+
+            self.hits += 1
+            if not entry[1].addresses:
+                self.negative_hits += 1
+            return entry[1]
+
+    def put(self, resolution: Resolution):
+        """Caches a resolution for its TTL, or for the negative TTL if it has no address. Failed ones are not cached."""
+        if resolution.addresses:
+            ttl = min(resolution.ttl or 0, self.max_ttl)
+        elif resolution.error in _NEGATIVE_ERRORS:
+            ttl = self.negative_ttl
+        else:
+            return
+        if ttl <= 0:
+            return
+
+        now = time.time()
+        expires = now + ttl
+        with self._lock:
+            self._remember(resolution.hostname, expires, resolution)
+            if self.path:
+                self._write_file(expires, resolution, now)
+
+    def _from_hosts(self, hostname: str) -> Resolution:
+        addresses = self.hosts.get(hostname)
+        return Resolution(hostname, list(addresses), [], None, None) if addresses else None
+
+    async def _resolve_with_system(self, hostname: str) -> Resolution:
+        try:
+            loop = asyncio.get_running_loop()
+            infos = await loop.getaddrinfo(hostname, None, family=socket.AF_INET, type=socket.SOCK_STREAM)
+        except socket.gaierror as err:
+            return Resolution(hostname, [], [], None, "NXDOMAIN" if err.errno == socket.EAI_NONAME else "SERVFAIL")
+        return Resolution(hostname, list(dict.fromkeys(info[4][0] for info in infos)), [], None, None)
+
+    async def _resolve(self, hostname: str) -> Resolution:
+        with self._lock:
+            self.misses += 1
+
+        if "." not in hostname:
+            return await self._resolve_with_system(hostname)
+
+        async with BulkResolver(self.nameservers, self.timeout, self.retries) as resolver:
+            resolution = await resolver.resolve(hostname)
+
+        if not resolution.addresses and self.search and hostname.count(".") < self.ndots:
+            # The hostname may be relative to one of the search domains
+            return await self._resolve_with_system(hostname)
+
+        self.put(resolution)
+        return resolution
+
+    async def alookup(self, hostname: str) -> Resolution:
+        """Gets the resolution of a hostname, resolving it on a miss. Concurrent lookups of a hostname share its query."""
+        hostname = hostname.rstrip(".").lower()
+        resolution = self._from_hosts(hostname) or self.get(hostname)
+        if resolution is not None:
+            return resolution
+
+        task = self._in_flight.get(hostname)
+        if task is None or task.done() or task.get_loop() is not asyncio.get_running_loop():
+            task = self._in_flight[hostname] = asyncio.ensure_future(self._resolve(hostname))
+            task.add_done_callback(functools.partial(self._forget, hostname))
+        return await asyncio.shield(task)
+
+    def _forget(self, hostname: str, task: asyncio.Task):
+        if self._in_flight.get(hostname) is task:
+            del self._in_flight[hostname]
+
+    def lookup(self, hostname: str) -> Resolution:
+        """Gets the resolution of a hostname, resolving it on a miss. Must not be called from a running event loop."""
+        hostname = hostname.rstrip(".").lower()
+        resolution = self._from_hosts(hostname) or self.get(hostname)
+        if resolution is not None:
+            return resolution
+        return asyncio.run(self._resolve(hostname))
+
+    def stats(self) -> dict[str, int]:
+        """Gets the counters of the cache. The hits include the negative hits and the hits read from the cache file."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "negativeHits": self.negative_hits,
+            "fileHits": self.file_hits,
+            "entries": len(self._entries),
+        }
+
+    def describe(self) -> str:
+        """Describes the counters of the cache, as logged when the job ends."""
+        return (
+            f"DNS cache: {self.hits} hits, of which {self.negative_hits} negative and {self.file_hits} from the cache file, "
+            f"{self.misses} misses"
+        )
+
+
+def _literal(hostname: str) -> list[str]:
+    try:
+        return [str(ip_address(hostname.strip("[]")))]
+    except ValueError:
+        return None
+
+
+def resolve(hostname: str) -> list[str]:
+    """
+    Resolves the IPv4 addresses of a hostname through the cache of the job. Returns an empty list if the hostname does
+    not exist, has no address or could not be resolved. IP addresses are returned as is.
+    """
+    literal = _literal(hostname)
+    if literal is not None:
+        return literal
+
+    from . import get_dns_cache
+    return list(get_dns_cache().lookup(hostname).addresses)
+
+
+async def aresolve(hostname: str) -> list[str]:
+    """Asyncio flavour of resolve."""
+    literal = _literal(hostname)
+    if literal is not None:
+        return literal
+
+    from . import get_dns_cache
+    return list((await get_dns_cache().alookup(hostname)).addresses)
@@ -0,0 +1,71 @@
+import re
+from typing import Iterable, Iterator
+
+from .psl import get_public_suffix_trie
+
+# A single character class cannot backtrack, the search is linear in the length of the input
+_HOSTNAME_TOKEN = re.compile(r"[a-z0-9\-.]+")
+
+
+def _tokenize_labels(value: str) -> tuple[str, list[str]]:
+    for match in _HOSTNAME_TOKEN.finditer(value.lower()):
+        hostname = match.group().strip(".")
+        labels = hostname.split(".")
+        if len(labels) < 2:
+            continue
+
+        for label in labels:
+            if not label or len(label) > 63 or label[0] == "-" or label[-1] == "-":
+                break
+        else:
+            return hostname, labels
+
+    return None, None
+
+
+def tokenize_hostname(value: str) -> str:
+    """
+    Extracts the hostname from a string such as "*.example.com", "example.com." or "DNS:www.Example.com".
+    Returns None if no valid hostname was found.
+    """
+    return _tokenize_labels(value)[0]
+
+
+def iter_all_domains(domainNames: Iterable[str]) -> Iterator[str]:
+    """
+    Yields all the possible domains and subdomains from domain names, each one once.
+
+    For instance, input such as: ["*.asdf.example.com", "qwerty.co.uk.", "abc.asd.asd.com"]
+
+    Would yield the following domains in no particular order:
+
+    example.com
+    asdf.example.com
+    qwerty.co.uk
+    asd.com
+    asd.asd.com
+    abc.asd.asd.com
+
+    The domain names are consumed lazily, so the input can be a generator reading a large file.
+    """
+    trie = get_public_suffix_trie()
+    seen = set()
+    for value in domainNames:
+        hostname, labels = _tokenize_labels(value)
+        if hostname is None or hostname in seen:
+            continue
+
+        suffix_labels = trie.suffix_label_count(labels)
+        if suffix_labels == 0 or suffix_labels >= len(labels):
+            continue
+
+        # Walking from the full hostname to the registrable domain, the first domain already seen means that
+        # every remaining parent domain was yielded already
+        offset = 0
+        for label in labels[:len(labels) - suffix_labels]:
+            domain = hostname[offset:]
+            if domain in seen:
+                break
+            seen.add(domain)
+            yield domain
+            offset += len(label) + 1
@@ -0,0 +1,121 @@
+import json
+import queue
+import sys
+import tempfile
+import threading
+from typing import Callable
+
+
+class QueueFullPolicy:
+    BLOCK = "block"
+    DROP_DEBUG = "drop-debug"
+    SPILL = "spill"
+
+
+_WAKE_UP = object()
+
+
+class BackgroundEmitter:
+    """
+    Sends job output lines (findings and logs) from a dedicated thread, so that the job never waits on the network.
+
+    Lines are queued in a bounded queue. When the queue is full, the `policy` decides what happens:
+
+    block: the caller waits until there is room in the queue
+    drop-debug: debug logs are dropped, other lines wait until there is room in the queue
+    spill: lines are written to a temporary file and sent once the queue is empty
+
+    @param send Callable receiving one output line, called from the sender thread only
+    @param max_size Maximum number of lines waiting in the queue
+    @param policy One of the QueueFullPolicy values
+    """
+
+    def __init__(
+        self,
+        send: Callable[[str], None],
+        max_size: int = 10000,
+        policy: str = QueueFullPolicy.BLOCK,
+    ) -> None:
+        if policy not in (QueueFullPolicy.BLOCK, QueueFullPolicy.DROP_DEBUG, QueueFullPolicy.SPILL):
+            raise ValueError(f"Unknown queue full policy: {policy}")
+
+        self._send = send
+        self.policy = policy
+        self.dropped = 0
+        self._queue = queue.Queue(max_size)
+        self._spill_lock = threading.Lock()
+        self._spill_file = None
+        self._spilled = 0
+        self._thread = threading.Thread(target=self._run, name="stalker-job-sdk-sender", daemon=True)
+        self._thread.start()
+
+    def put(self, output: str):
+        """Queues an output line to be sent by the sender thread."""
+        if self.policy == QueueFullPolicy.SPILL:
+            # The sender thread replays the spill under the same lock, a line is either queued or spilled before it does
+            with self._spill_lock:
+                # Once lines are spilled, newer lines follow them to keep the output in order
+                if self._spilled > 0:
+                    self._spill(output)
+                    return
+                try:
+                    self._queue.put_nowait(output)
+                except queue.Full:
+                    self._spill(output)
+            return
+
+        if self.policy == QueueFullPolicy.DROP_DEBUG and output.startswith("@debug "):
+            try:
+                self._queue.put_nowait(output)
+            except queue.Full:
+                self.dropped += 1
+            return
+
+        self._queue.put(output)
+
+    def drain(self):
+        """Waits until every queued and spilled line has been handed to `send`."""
+        while True:
+            self._queue.join()
+            with self._spill_lock:
+                if self._spilled == 0:
+                    return
+            self._queue.put(_WAKE_UP)
+
+    def _spill(self, output: str):
+        if self._spill_file is None:
+            self._spill_file = tempfile.TemporaryFile("w+", encoding="utf-8")
+        # Output lines may contain line breaks, they are stored as json strings
+        self._spill_file.write(json.dumps(output))
+        self._spill_file.write("\n")
+        self._spilled += 1
+
+    def _replay_spill(self):
+        with self._spill_lock:
+            if self._spilled == 0:
+                return
+            spill_file = self._spill_file
+            self._spill_file = None
+            self._spilled = 0
+
+        with spill_file:
+            spill_file.seek(0)
+            for line in spill_file:
+                self._send_safely(json.loads(line))
+
+    def _send_safely(self, output: str):
+        try:
+            self._send(output)
+        except Exception as err:
+            print(f"Error while sending job output: {err}", file=sys.stderr)
+
+    def _run(self):
+        while True:
+            output = self._queue.get()
+            try:
+                if output is not _WAKE_UP:
+                    self._send_safely(output)
+                if self._queue.empty():
+                    self._replay_spill()
+            finally:
+                self._queue.task_done()
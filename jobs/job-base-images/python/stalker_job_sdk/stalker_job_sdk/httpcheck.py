@@ -0,0 +1,301 @@
+"""
+Finds the ports of a host which run an HTTP or an HTTPS server.
+
+The ports are checked concurrently from a single event loop, a bounded number at a time. Each port is sniffed with a single
+connection: a TLS ClientHello is sent, and the first bytes of the reply tell the protocol of the server.
+
+TLS: the handshake goes on over the same connection and a HEAD request is sent over it, in HTTP/2 when the server picks it
+through ALPN. The port is an HTTPS port if the request is answered.
+HTTP: plaintext servers answer the ClientHello, which is not a valid request, with an error response.
+Anything else: some plaintext servers answer without a status line, wait for the end of the request or close the
+connection. These ports are checked with a plaintext HEAD request over a new connection.
+
+Any response counts, whatever its status. The TLS version, the ALPN protocol and the Server header are read in the same
+pass. HTTP(S) ports can be reported as soon as they are found through an `on_found` callback, called with each HttpCheck
+from a thread of the event loop's default executor, so that a callback which blocks, such as `log_finding`, never holds up
+the checks in flight.
+"""
+import asyncio
+import ssl
+from typing import Callable, Iterable, NamedTuple
+
+# Largest response head read, in bytes
+MAX_HEAD_SIZE = 65536
+
+
+class HttpScheme:
+    HTTPS = "https"
+    HTTP = "http"
+
+
+class SniffedProtocol:
+    TLS = "tls"
+    HTTP = "http"
+    OTHER = "other"
+
+
+class HttpCheck(NamedTuple):
+    port: int
+    scheme: str
+    tls_version: str = None
+    alpn: str = None
+    server: str = None
+
+
+def sniff_protocol(data: bytes) -> str:
+    """Tells the protocol of a server from the first bytes it sent, such as its answer to a ClientHello."""
+    # A TLS record starts with its content type, 20 to 23, followed by the major version 3
+    if len(data) >= 2 and 20 <= data[0] <= 23 and data[1] == 3:
+        return SniffedProtocol.TLS
+    if data.startswith(b"HTTP/"):
+        return SniffedProtocol.HTTP
+    return SniffedProtocol.OTHER
+
+
+def parse_response_head(data: bytes) -> dict[str, str]:
+    """Parses the head of an HTTP/1 response into its headers, with lowercase names. Returns None if it is not HTTP."""
+    if not data.startswith(b"HTTP/"):
+        return None
+
+    headers = {}
+    for line in data.split(b"\r\n\r\n", 1)[0].decode("latin-1").split("\r\n")[1:]:
+        name, separator, value = line.partition(":")
+        if separator:
+            headers[name.strip().lower()] = value.strip()
+    return headers
+
+
+def _head_request(host: str) -> bytes:
+    return f"HEAD / HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n".encode()
+
+
+def _client_context() -> ssl.SSLContext:
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE
+    try:
+        import h2.connection  # noqa: F401
+        context.set_alpn_protocols(["h2", "http/1.1"])
+    except ImportError:
+        context.set_alpn_protocols(["http/1.1"])
+    return context
+
+
+class _Connection:
+    """A TCP connection whose reads all share the deadline of a check."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, deadline: float) -> None:
+        self.reader = reader
+        self.writer = writer
+        self.deadline = deadline
+
+    async def read(self, deadline: float = None) -> bytes:
+        remaining = min(self.deadline, deadline or self.deadline) - asyncio.get_running_loop().time()
+        if remaining <= 0:
+            raise asyncio.TimeoutError()
+        return await asyncio.wait_for(self.reader.read(MAX_HEAD_SIZE), remaining)
+
+    def write(self, data: bytes):
+        self.writer.write(data)
+
+
+class _TlsConnection:
+    """TLS over a connection whose first bytes were already read, through memory buffers."""
+
+    def __init__(self, connection: _Connection, tls: ssl.SSLObject, incoming: ssl.MemoryBIO, outgoing: ssl.MemoryBIO) -> None:
+        self.connection = connection
+        self.tls = tls
+        self.incoming = incoming
+        self.outgoing = outgoing
+
+    def _flush(self):
+        data = self.outgoing.read()
+        if data:
+            self.connection.write(data)
+
+    async def _receive(self):
+        data = await self.connection.read()
+        if data:
+            self.incoming.write(data)
+        else:
+            self.incoming.write_eof()
+
+    async def handshake(self):
+        while True:
+            try:
+                self.tls.do_handshake()
+                self._flush()
+                return
+            except ssl.SSLWantReadError:
+                self._flush()
+                await self._receive()
+
+    async def read(self) -> bytes:
+        while True:
+            try:
+                return self.tls.read(MAX_HEAD_SIZE)
+            except ssl.SSLWantReadError:
+                await self._receive()
+            except (ssl.SSLZeroReturnError, ssl.SSLEOFError):
+                return b""
+
+    def write(self, data: bytes):
+        self.tls.write(data)
+        self._flush()
+
+
+async def _read_head(connection, data: bytes = b"") -> bytes:
+    while b"\r\n\r\n" not in data and len(data) < MAX_HEAD_SIZE:
+        received = await connection.read()
+        if not received:
+            break
+        data += received
+    return data
+
+
+async def _h2_headers(connection: _TlsConnection, host: str) -> dict[str, str]:
+    from h2.config import H2Configuration
+    from h2.connection import H2Connection
+    from h2.events import ConnectionTerminated, ResponseReceived, StreamReset
+
+    h2 = H2Connection(H2Configuration(client_side=True, header_encoding="utf-8"))
+    h2.initiate_connection()
+    h2.send_headers(1, [(":method", "HEAD"), (":scheme", "https"), (":authority", host), (":path", "/")], end_stream=True)
+    connection.write(h2.data_to_send())
+
+    while data := await connection.read():
+        for event in h2.receive_data(data):
+            if isinstance(event, ResponseReceived):
+                return dict(event.headers)
+            if isinstance(event, (ConnectionTerminated, StreamReset)):
+                return None
+        # Such as the acknowledgement of the server's settings
+        connection.write(h2.data_to_send())
+    return None
+
+
+async def _open(ip: str, port: int, deadline: float) -> _Connection:
+    timeout = deadline - asyncio.get_running_loop().time()
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(ip, port), timeout)
+    return _Connection(reader, writer, deadline)
+
+
+async def _sniff(ip: str, port: int, host: str, deadline: float, answer_deadline: float, context: ssl.SSLContext) -> HttpCheck:
+    """
+    Returns None when the server did not answer with TLS nor with an HTTP response, and an HttpCheck without a scheme
+    when it is a TLS server which is not an HTTPS server.
+    """
+    connection = await _open(ip, port, deadline)
+    try:
+        incoming, outgoing = ssl.MemoryBIO(), ssl.MemoryBIO()
+        tls = context.wrap_bio(incoming, outgoing)
+        try:
+            tls.do_handshake()
+        except ssl.SSLWantReadError:
+            # The ClientHello is written, the server's answer is needed
+            connection.write(outgoing.read())
+
+        try:
+            first = await connection.read(answer_deadline)
+        except asyncio.TimeoutError:
+            first = b""
+        if not first:
+            return None
+
+        protocol = sniff_protocol(first)
+        if protocol == SniffedProtocol.HTTP:
+            headers = parse_response_head(await _read_head(connection, first))
+            return HttpCheck(port, HttpScheme.HTTP, server=headers.get("server"))
+
+        if protocol == SniffedProtocol.OTHER:
+            return None
+
+        incoming.write(first)
+        tls_connection = _TlsConnection(connection, tls, incoming, outgoing)
+        await tls_connection.handshake()
+
+        alpn = tls.selected_alpn_protocol()
+        if alpn == "h2":
+            headers = await _h2_headers(tls_connection, host)
+        else:
+            tls_connection.write(_head_request(host))
+            headers = parse_response_head(await _read_head(tls_connection))
+
+        if headers is None:
+            return HttpCheck(port, None)
+        return HttpCheck(port, HttpScheme.HTTPS, tls.version(), alpn, headers.get("server"))
+
+    finally:
+        connection.writer.close()
+
+
+async def _check_plaintext(ip: str, port: int, host: str, deadline: float) -> HttpCheck:
+    connection = await _open(ip, port, deadline)
+    try:
+        connection.write(_head_request(host))
+        headers = parse_response_head(await _read_head(connection))
+        return HttpCheck(port, HttpScheme.HTTP, server=headers.get("server")) if headers is not None else None
+    finally:
+        connection.writer.close()
+
+
+async def check_http_port(ip: str, port: int, timeout: float, context: ssl.SSLContext = None) -> HttpCheck:
+    """
+    Checks whether a port runs an HTTPS or an HTTP server. Returns the HttpCheck of the port, or None.
+
+    @param timeout Timeout of the whole check, in seconds. The answer to the ClientHello is awaited for half of it, leaving
+    the other half to the plaintext request sent when there is none
+    """
+    host = f"[{ip}]" if ":" in ip else ip
+    now = asyncio.get_running_loop().time()
+    deadline = now + timeout
+    try:
+        check = await _sniff(ip, port, host, deadline, now + timeout / 2, context or _client_context())
+        if check is None:
+            check = await _check_plaintext(ip, port, host, deadline)
+        return check if check is not None and check.scheme is not None else None
+
+    except Exception:
+        # Refused connections, failed handshakes, timeouts and broken answers
+        return None
+
+
+async def check_http_ports_async(
+    ip: str,
+    ports: Iterable[int],
+    concurrency: int = 100,
+    timeout: float = 10.0,
+    on_found: Callable[[HttpCheck], None] = None,
+) -> list[HttpCheck]:
+    """
+    Checks the ports of a host concurrently. Returns the HttpCheck of each HTTP(S) port, by port.
+
+    @param concurrency Maximum number of ports checked at the same time
+    @param timeout Timeout of each check, in seconds
+    @param on_found Called with the HttpCheck of each HTTP(S) port as soon as it is found
+    """
+    found = []
+    in_flight = asyncio.Semaphore(max(1, concurrency))
+    context = _client_context()
+
+    async def check(port: int):
+        async with in_flight:
+            result = await check_http_port(ip, port, timeout, context)
+        if result is not None:
+            found.append(result)
+            if on_found:
+                await asyncio.to_thread(on_found, result)
+
+    await asyncio.gather(*(check(port) for port in ports))
+    return sorted(found, key=lambda check: check.port)
+
+
+def check_http_ports(
+    ip: str,
+    ports: Iterable[int],
+    concurrency: int = 100,
+    timeout: float = 10.0,
+    on_found: Callable[[HttpCheck], None] = None,
+) -> list[HttpCheck]:
+    """Runs check_http_ports_async in a new event loop."""
+    return asyncio.run(check_http_ports_async(ip, ports, concurrency, timeout, on_found))
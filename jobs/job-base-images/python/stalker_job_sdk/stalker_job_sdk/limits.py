@@ -0,0 +1,151 @@
+"""
+Derives the concurrency of the scans from the resources of the job's container, for the parameters left to their default.
+
+The CPUs are read from the cgroup CPU quota, or are the CPUs the process may run on when there is no quota. The memory is
+the cgroup memory limit, and the open files the soft RLIMIT_NOFILE. Both cgroup v2 and cgroup v1 are read.
+
+Example:
+
+    from stalker_job_sdk.limits import get_resource_limits, tune_concurrency
+
+    threads = tune_concurrency(per_cpu=100, maximum=1000, memory_per_task=512 * 1024)
+    log_info(f"Threads: {threads} ({get_resource_limits().describe()})")
+"""
+import os
+from functools import lru_cache
+from typing import NamedTuple
+
+CGROUP_ROOT = "/sys/fs/cgroup"
+
+# cgroup v1 reports the absence of a memory limit as a huge number
+_UNLIMITED_MEMORY = 1 << 60
+
+# Open files left for everything but the scan, such as the connections to the orchestrator and the logs
+RESERVED_FILES = 64
+
+# Share of the memory limit which the scan may use, the rest is left to the interpreter and the findings
+MEMORY_SHARE = 0.5
+
+
+class ResourceLimits(NamedTuple):
+    cpus: float
+    memory: int = None
+    open_files: int = None
+
+    def describe(self) -> str:
+        memory = f"{self.memory // (1024 * 1024)} MiB" if self.memory else "unlimited"
+        open_files = self.open_files if self.open_files else "unlimited"
+        return f"cpus: {self.cpus:g}, memory: {memory}, open files: {open_files}"
+
+
+def _read(path: str) -> str:
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def _cgroup_directories(root: str, controller: str = None) -> list[str]:
+    """
+    Directories in which the cgroup files of the process may be, the ones of cgroup v2 when no controller is given.
+    The path of /proc/self/cgroup is relative to the root of the hierarchy, which is the cgroup itself in a namespace.
+    """
+    path = ""
+    for line in (_read("/proc/self/cgroup") or "").splitlines():
+        parts = line.split(":", 2)
+        if len(parts) != 3:
+            continue
+        if (controller is None and parts[0] == "0") or (controller is not None and controller in parts[1].split(",")):
+            path = parts[2].lstrip("/")
+
+    base = os.path.join(root, controller) if controller else root
+    return [os.path.join(base, path), base] if path else [base]
+
+
+def _read_cgroup(root: str, controller: str, name: str) -> str:
+    for directory in _cgroup_directories(root, controller):
+        value = _read(os.path.join(directory, name))
+        if value is not None:
+            return value
+    return None
+
+
+def read_cpu_limit(root: str = CGROUP_ROOT) -> float:
+    """Reads the number of CPUs of the process, its cgroup CPU quota when it has one. Fractions of CPUs are kept."""
+    try:
+        available = len(os.sched_getaffinity(0))
+    except AttributeError:
+        available = os.cpu_count() or 1
+
+    quota = None
+    cpu_max = _read_cgroup(root, None, "cpu.max")
+    if cpu_max is not None:
+        # "max 100000" without a quota, "150000 100000" for 1.5 CPUs
+        parts = cpu_max.split()
+        if len(parts) == 2 and parts[0] != "max" and int(parts[1]) > 0:
+            quota = int(parts[0]) / int(parts[1])
+    else:
+        # -1 without a quota
+        quota_us = _read_cgroup(root, "cpu", "cpu.cfs_quota_us")
+        period_us = _read_cgroup(root, "cpu", "cpu.cfs_period_us")
+        if quota_us and period_us and int(quota_us) > 0 and int(period_us) > 0:
+            quota = int(quota_us) / int(period_us)
+
+    return min(quota, available) if quota else available
+
+
+def read_memory_limit(root: str = CGROUP_ROOT) -> int:
+    """Reads the cgroup memory limit of the process, in bytes. Returns None if it has none."""
+    memory_max = _read_cgroup(root, None, "memory.max")
+    if memory_max is None:
+        memory_max = _read_cgroup(root, "memory", "memory.limit_in_bytes")
+
+    if not memory_max or not memory_max.isdigit() or int(memory_max) >= _UNLIMITED_MEMORY:
+        return None
+    return int(memory_max)
+
+
+def read_open_files_limit() -> int:
+    """Reads the soft limit of the number of files the process may open. Returns None if it has none."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    soft, _ = resource.getrlimit(resource.RLIMIT_NOFILE)
+    return None if soft == resource.RLIM_INFINITY else soft
+
+
+@lru_cache
+def get_resource_limits(root: str = CGROUP_ROOT) -> ResourceLimits:
+    """Reads the CPU, memory and open files limits of the process, once."""
+    return ResourceLimits(read_cpu_limit(root), read_memory_limit(root), read_open_files_limit())
+
+
+def tune_concurrency(
+    per_cpu: float,
+    maximum: int = None,
+    files_per_task: float = 1,
+    memory_per_task: int = 0,
+    limits: ResourceLimits = None,
+) -> int:
+    """
+    Derives a concurrency from the resource limits: the lowest of what the CPUs, the open files and the memory allow.
+
+    @param per_cpu Tasks run at the same time for each CPU
+    @param maximum Highest concurrency returned, whatever the resources
+    @param files_per_task Files, such as sockets, each task keeps open. 0 when the tasks open no files
+    @param memory_per_task Bytes of memory used by each task. 0 when it is negligible
+    @param limits Resource limits to derive the concurrency from, the ones of the process by default
+    """
+    limits = limits or get_resource_limits()
+
+    bounds = [per_cpu * limits.cpus]
+    if files_per_task and limits.open_files:
+        bounds.append((limits.open_files - RESERVED_FILES) / files_per_task)
+    if memory_per_task and limits.memory:
+        bounds.append(limits.memory * MEMORY_SHARE / memory_per_task)
+    if maximum:
+        bounds.append(maximum)
+
+    return max(1, int(min(bounds)))
@@ -0,0 +1,146 @@
+"""
+Runs masscan and reads its results while it scans.
+
+masscan writes its results to its standard output, read through a pipe. Each result is yielded as soon as its line is
+received, so that findings can be reported during the scan, and nothing is written to disk.
+"""
+import json
+import shutil
+import subprocess
+from typing import Callable, Iterable, Iterator, NamedTuple
+
+
+class MasscanFormat:
+    JSON = "json"
+    LIST = "list"
+
+
+_OUTPUT_OPTIONS = {
+    MasscanFormat.JSON: "-oJ",
+    MasscanFormat.LIST: "-oL",
+}
+
+
+class MasscanRecord(NamedTuple):
+    ip: str
+    port: int
+    protocol: str
+    status: str
+    timestamp: int
+
+
+def parse_list_line(line: str) -> MasscanRecord:
+    """
+    Parses a line of masscan's list output, such as "open tcp 80 10.0.0.1 1700000000". Returns None for the comments
+    and the empty lines. Raises a ValueError if the line is invalid.
+    """
+    line = line.strip()
+    if not line or line[0] == "#":
+        return None
+
+    parts = line.split()
+    if len(parts) < 5:
+        raise ValueError(f"Invalid masscan line: {line}")
+    status, protocol, port, ip, timestamp = parts[:5]
+    return MasscanRecord(ip, int(port), protocol, status, int(timestamp))
+
+
+def parse_json_line(line: str) -> list[MasscanRecord]:
+    """
+    Parses a line of masscan's json output. masscan writes a json array with one host object per line, such as
+    {"ip": "10.0.0.1", "timestamp": "1700000000", "ports": [{"port": 80, "proto": "tcp", "status": "open"}]},
+
+    Returns the records of the line, none for the lines opening and closing the array and the status lines.
+    Raises a ValueError if the line is invalid.
+    """
+    line = line.strip().rstrip(",")
+    if not line or line in ("[", "]"):
+        return []
+
+    host = json.loads(line)
+    if "ip" not in host:
+        # Such as {"finished": 1}
+        return []
+
+    timestamp = int(host.get("timestamp") or 0)
+    return [
+        MasscanRecord(host["ip"], int(port["port"]), port.get("proto", "tcp"), port.get("status", "open"), timestamp)
+        for port in host.get("ports", [])
+    ]
+
+
+def _parse_line(line: str, output_format: str) -> list[MasscanRecord]:
+    if output_format == MasscanFormat.JSON:
+        return parse_json_line(line)
+    record = parse_list_line(line)
+    return [record] if record is not None else []
+
+
+def masscan_command(
+    targets: str,
+    ports: str,
+    rate: int,
+    output_format: str = MasscanFormat.JSON,
+    extra_args: Iterable[str] = (),
+) -> list[str]:
+    """Builds the command line of a masscan writing its open ports to its standard output."""
+    command = [
+        "masscan",
+        "--rate", str(rate),
+        _OUTPUT_OPTIONS[output_format], "-",
+        "--open-only",
+        "-p", ports,
+        *extra_args,
+        targets,
+    ]
+
+    # masscan writes its results through a buffered stdio stream, stdbuf makes it write each line when it is complete
+    if shutil.which("stdbuf"):
+        command = ["stdbuf", "-oL", *command]
+    return command
+
+
+def stream_masscan(
+    targets: str,
+    ports: str,
+    rate: int,
+    output_format: str = MasscanFormat.JSON,
+    extra_args: Iterable[str] = (),
+    on_error: Callable[[str], None] = None,
+) -> Iterator[MasscanRecord]:
+    """
+    Runs masscan, yielding its records as they are received. Raises an exception if masscan fails.
+
+    @param targets IPs or ranges to scan, as given to masscan, such as "10.0.0.0/16"
+    @param ports Ports to scan, as given to masscan, such as "22,80,8000-8100"
+    @param rate Packets sent per second
+    @param on_error Called with the lines that could not be parsed, which are skipped
+    """
+    process = subprocess.Popen(
+        masscan_command(targets, ports, rate, output_format, extra_args),
+        stdout=subprocess.PIPE,
+        text=True,
+        bufsize=1,
+    )
+
+    completed = False
+    try:
+        for line in process.stdout:
+            try:
+                records = _parse_line(line, output_format)
+            except (ValueError, KeyError, TypeError):
+                if on_error:
+                    on_error(line)
+                continue
+            yield from records
+        completed = True
+
+    finally:
+        # Stopping early, or failing, must not leave masscan running
+        if not completed and process.poll() is None:
+            process.terminate()
+        process.stdout.close()
+        return_code = process.wait()
+
+    if return_code != 0:
+        raise Exception(f"masscan exited with status {return_code}")
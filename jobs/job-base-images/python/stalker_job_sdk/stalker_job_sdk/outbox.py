@@ -0,0 +1,170 @@
+import fcntl
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import deque
+from typing import Callable
+
+
+class Outbox:
+    """
+    Append-only on-disk journal of the requests to send to the orchestrator.
+
+    Requests are written to the journal first, then sent in order by a dedicated thread. A request failing with an
+    exception is retried with an exponential backoff until it succeeds. Sent requests are acknowledged in a second
+    append-only file, and both files are truncated once every request is acknowledged. When a new Outbox is created
+    on a directory holding unacknowledged requests, for instance after the job's process restarted, they are replayed
+    before any new request.
+
+    A journal is locked by the process using it. The processes sharing a directory, such as the jobs of a fork server,
+    each use the first journal of the directory which is not locked, so that they never write to the same files nor
+    replay the requests of a process which is still running.
+
+    @param directory The directory holding the journals, created if needed
+    @param send Callable receiving the request path and json payload, raising an exception if the request should be retried
+    @param base_backoff Time, in seconds, to wait before the first retry
+    @param max_backoff Maximum time, in seconds, to wait between two retries
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        send: Callable[[str, dict], None],
+        base_backoff: float = 0.5,
+        max_backoff: float = 30.0,
+    ) -> None:
+        os.makedirs(directory, exist_ok=True)
+        prefix = self._lock_journal(directory)
+        self._journal_path = f"{prefix}.jsonl"
+        self._acks_path = f"{prefix}.acks"
+        self._send = send
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+
+        self._condition = threading.Condition()
+        self._pending: deque[tuple[int, str, dict]] = deque()
+        self._next_id = 0
+        self.sent = 0
+        self.retries = 0
+        self.replayed = 0
+        self.max_depth = 0
+
+        self._load()
+        self._journal = open(self._journal_path, "a", encoding="utf-8")
+        self._acks = open(self._acks_path, "a", encoding="utf-8")
+
+        self._thread = threading.Thread(target=self._run, name="stalker-job-sdk-outbox", daemon=True)
+        self._thread.start()
+
+    def _lock_journal(self, directory: str) -> str:
+        """Locks the first journal of the directory which no other process uses. Returns the path prefix of its files."""
+        slot = 0
+        while True:
+            prefix = os.path.join(directory, "outbox" if slot == 0 else f"outbox-{slot}")
+            lock = open(f"{prefix}.lock", "a")
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                lock.close()
+                slot += 1
+                continue
+
+            # The lock is released when the file is closed, at the latest when the process exits
+            self._lock = lock
+            return prefix
+
+    @property
+    def depth(self) -> int:
+        """Number of requests waiting to be sent."""
+        return len(self._pending)
+
+    def stats(self) -> dict:
+        return {
+            "depth": self.depth,
+            "max_depth": self.max_depth,
+            "sent": self.sent,
+            "retries": self.retries,
+            "replayed": self.replayed,
+        }
+
+    def append(self, path: str, payload: dict):
+        """Writes a request to the journal and queues it to be sent."""
+        with self._condition:
+            record = (self._next_id, path, payload)
+            self._next_id += 1
+            self._journal.write(json.dumps({ "id": record[0], "path": path, "payload": payload }))
+            self._journal.write("\n")
+            self._journal.flush()
+
+            self._pending.append(record)
+            self.max_depth = max(self.max_depth, len(self._pending))
+            self._condition.notify_all()
+
+    def drain(self, timeout: float = None) -> bool:
+        """Waits until every request is sent. Returns false if requests are still pending after `timeout` seconds."""
+        with self._condition:
+            return self._condition.wait_for(lambda: not self._pending, timeout)
+
+    def _load(self):
+        acknowledged = set()
+        if os.path.isfile(self._acks_path):
+            with open(self._acks_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip().isdigit():
+                        acknowledged.add(int(line))
+
+        if not os.path.isfile(self._journal_path):
+            return
+
+        with open(self._journal_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # The last line may be incomplete if the process was killed while writing it
+                    continue
+                self._next_id = max(self._next_id, record["id"] + 1)
+                if record["id"] not in acknowledged:
+                    self._pending.append((record["id"], record["path"], record["payload"]))
+
+        self.replayed = len(self._pending)
+        self.max_depth = len(self._pending)
+
+    def _send_with_retries(self, path: str, payload: dict):
+        attempt = 0
+        while True:
+            try:
+                self._send(path, payload)
+                return
+            except Exception as err:
+                attempt += 1
+                self.retries += 1
+                delay = min(self.max_backoff, self.base_backoff * 2 ** (attempt - 1))
+                print(f"Error while sending {path} to the orchestrator (attempt {attempt}), retrying in {delay:.1f}s: {err}", file=sys.stderr)
+                time.sleep(random.uniform(delay / 2, delay))
+
+    def _acknowledge(self, id: int):
+        with self._condition:
+            self._pending.popleft()
+            self.sent += 1
+            if self._pending:
+                self._acks.write(f"{id}\n")
+                self._acks.flush()
+            else:
+                # Everything was sent, the journal can start over
+                self._journal.truncate(0)
+                self._acks.truncate(0)
+                self._next_id = 0
+            self._condition.notify_all()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._pending)
+                id, path, payload = self._pending[0]
+
+            self._send_with_retries(path, payload)
+            self._acknowledge(id)
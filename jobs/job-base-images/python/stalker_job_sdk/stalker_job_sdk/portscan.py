@@ -0,0 +1,381 @@
+"""
+TCP connect scanning engines, used by the port scanning jobs.
+
+threads: OS threads pull probes from a shared iterator, each one connecting with blocking sockets
+asyncio: a single event loop keeps a bounded number of non-blocking connects in flight
+
+A probe is an (ip, port) pair. The probes of several targets are interleaved, so that consecutive connects go to
+different hosts and a slow or filtered host never holds up the others.
+
+Open ports can be reported as soon as they are found through an `on_open` callback, called with the ip and the port.
+The threads engine calls it from its threads, one call at a time. The asyncio engine calls it from the default executor
+of its event loop, so that a callback which blocks, such as `log_finding`, never holds up the connects in flight.
+
+With an RttEstimator, the timeout of each connect is derived from the round trip times measured on the target, and
+timed out probes are retried with a doubled timeout, as TCP does for its retransmissions.
+"""
+import asyncio
+import errno
+import json
+import socket
+import threading
+import time
+from ipaddress import ip_address, ip_network
+from typing import Callable, Iterable, Iterator
+
+
+class ScanEngine:
+    THREADS = "threads"
+    ASYNCIO = "asyncio"
+
+
+def _socket_family(ip: str) -> int:
+    return socket.AF_INET6 if ":" in ip else socket.AF_INET
+
+
+def _is_self_connect(s: socket.socket) -> bool:
+    """Connecting to a local port of the ephemeral range can pick the same port as source, connecting the socket to itself."""
+    return s.getsockname() == s.getpeername()
+
+
+def parse_targets(value: str) -> list:
+    """
+    Parses the targets of a scan: an IP, a CIDR, or several of them as a json array or comma separated.
+    Returns a list of networks, an IP being a network of a single address.
+    """
+    value = value.strip()
+    targets = json.loads(value) if value.startswith("[") else value.split(",")
+    return [ip_network(target.strip(), strict=False) for target in targets if target.strip()]
+
+
+def iter_probes(targets: list, ports: list[int]) -> Iterator[tuple[str, int]]:
+    """
+    Yields the (ip, port) probes of a scan, the port being the outer loop, so that the hosts are probed in turn.
+    The probes are generated lazily, large ranges are never held in memory.
+    """
+    for port in ports:
+        for network in targets:
+            for host in network.hosts():
+                yield str(host), port
+
+
+def _sort_key(probe: tuple[str, int]):
+    ip = ip_address(probe[0])
+    return ip.version, ip, probe[1]
+
+
+class TargetTiming:
+    __slots__ = ("srtt", "rttvar", "samples", "timeouts", "retries")
+
+    def __init__(self) -> None:
+        self.srtt = None
+        self.rttvar = None
+        self.samples = 0
+        self.timeouts = 0
+        self.retries = 0
+
+
+class RttEstimator:
+    """
+    Estimates the round trip time of each target from its completed handshakes, refused connections included, with
+    the smoothed RTT and RTT variance estimators of TCP (RFC 6298). The timeout of a connect is the retransmission
+    timeout of the target, SRTT + max(G, 4 * RTTVAR), doubled for each retry.
+
+    @param initial_timeout Timeout, in seconds, of the connects to a target without any measure yet
+    @param min_timeout Lower bound of the timeouts, in seconds
+    @param max_timeout Upper bound of the timeouts, in seconds
+    @param granularity Smallest margin, in seconds, added to the smoothed RTT, the G of RFC 6298. It keeps targets with a
+    steady RTT from timing out on scheduling delays of the scanner
+    """
+    ALPHA = 1 / 8
+    BETA = 1 / 4
+    K = 4
+
+    def __init__(
+        self,
+        initial_timeout: float,
+        min_timeout: float = 0.1,
+        max_timeout: float = 10.0,
+        granularity: float = 0.01,
+    ) -> None:
+        self.initial_timeout = initial_timeout
+        self.min_timeout = min_timeout
+        self.granularity = granularity
+        self.max_timeout = max(max_timeout, initial_timeout)
+        self._targets: dict[str, TargetTiming] = {}
+        self._lock = threading.Lock()
+
+    def _target(self, ip: str) -> TargetTiming:
+        target = self._targets.get(ip)
+        if target is None:
+            target = self._targets.setdefault(ip, TargetTiming())
+        return target
+
+    def timeout(self, ip: str, attempt: int = 0) -> float:
+        """Gets the timeout, in seconds, of a connect to a target. `attempt` is 0 for the first try, 1 for the first retry..."""
+        target = self._targets.get(ip)
+        if target is None or target.srtt is None:
+            timeout = self.initial_timeout
+        else:
+            timeout = max(self.min_timeout, target.srtt + max(self.granularity, self.K * target.rttvar))
+        return min(self.max_timeout, timeout * (2 ** attempt))
+
+    def sample(self, ip: str, rtt: float):
+        """Records the round trip time, in seconds, of a connect to a target."""
+        with self._lock:
+            target = self._target(ip)
+            if target.srtt is None:
+                target.srtt = rtt
+                target.rttvar = rtt / 2
+            else:
+                target.rttvar = (1 - self.BETA) * target.rttvar + self.BETA * abs(target.srtt - rtt)
+                target.srtt = (1 - self.ALPHA) * target.srtt + self.ALPHA * rtt
+            target.samples += 1
+
+    def timed_out(self, ip: str, retried: bool):
+        """Records a connect to a target which timed out, and whether it is retried."""
+        with self._lock:
+            target = self._target(ip)
+            target.timeouts += 1
+            if retried:
+                target.retries += 1
+
+    def stats(self) -> dict[str, TargetTiming]:
+        return dict(self._targets)
+
+    def summary(self, max_targets: int = 10) -> list[str]:
+        """Describes the timing of the scan, as a total followed by the timing of the first targets."""
+        targets = self.stats()
+        lines = [
+            f"Timing of {len(targets)} targets: {sum(t.samples for t in targets.values())} round trips measured, "
+            f"{sum(t.timeouts for t in targets.values())} timeouts, {sum(t.retries for t in targets.values())} retries"
+        ]
+        for ip, target in sorted(targets.items(), key=lambda item: _sort_key((item[0], 0)))[:max_targets]:
+            srtt = f"{target.srtt * 1000:.1f}ms" if target.srtt is not None else "unknown"
+            rttvar = f"{target.rttvar * 1000:.1f}ms" if target.rttvar is not None else "unknown"
+            lines.append(
+                f"{ip}: srtt {srtt}, rttvar {rttvar}, timeout {self.timeout(ip) * 1000:.1f}ms, "
+                f"{target.samples} round trips, {target.timeouts} timeouts, {target.retries} retries"
+            )
+        return lines
+
+
+class PortScanThread(threading.Thread):
+    def __init__(
+        self,
+        probes: Iterator[tuple[str, int]],
+        lock: threading.Lock,
+        timeout: float,
+        retries: int = 0,
+        timing: RttEstimator = None,
+        on_open: Callable[[str, int], None] = None,
+    ):
+        threading.Thread.__init__(self)
+        self.probes = probes
+        self.lock = lock
+        self.timeout = timeout
+        self.retries = retries
+        self.timing = timing
+        self.on_open = on_open
+        self.open_ports = []
+
+    # This function could be faster if it only did a TCP SYN and waited for TCP
+    # ACK instead of a full TCP handshake. There may be something to do about the
+    # new socket / settimeout / s.close() everytime too
+    # Also, the usage of zmap could be considered: https://github.com/zmap/zmap
+    def is_tcp_port_open(self, ip: str, port: int):
+        for attempt in range(self.retries + 1):
+            s = socket.socket(_socket_family(ip), socket.SOCK_STREAM)
+            s.settimeout(self.timing.timeout(ip, attempt) if self.timing else self.timeout)
+            start = time.monotonic()
+            try:
+                s.connect((ip, port))
+                if self.timing:
+                    self.timing.sample(ip, time.monotonic() - start)
+                return not _is_self_connect(s)
+            except socket.timeout:
+                if self.timing:
+                    self.timing.timed_out(ip, attempt < self.retries)
+            except ConnectionRefusedError:
+                if self.timing:
+                    self.timing.sample(ip, time.monotonic() - start)
+                return False
+            except:
+                return False
+            finally:
+                s.close()
+        return False
+
+    def run(self):
+        # Probes are pulled one at a time, a thread stuck on filtered ports does not hold up the probes left
+        while True:
+            with self.lock:
+                probe = next(self.probes, None)
+            if probe is None:
+                return
+
+            if self.is_tcp_port_open(*probe):
+                self.open_ports.append(probe)
+                if self.on_open:
+                    self.on_open(*probe)
+
+
+def scan_tcp_threads(
+    probes: Iterable[tuple[str, int]],
+    threads: int,
+    timeout: float,
+    retries: int = 0,
+    timing: RttEstimator = None,
+    on_open: Callable[[str, int], None] = None,
+) -> list[tuple[str, int]]:
+    """Probes with blocking connects from threads sharing the probes. Returns the open (ip, port) pairs, sorted."""
+    probes = iter(probes)
+    lock = threading.Lock()
+
+    if on_open is not None:
+        callback = on_open
+        callback_lock = threading.Lock()
+
+        def on_open(ip: str, port: int):
+            with callback_lock:
+                callback(ip, port)
+
+    threads_list = [PortScanThread(probes, lock, timeout, retries, timing, on_open) for _ in range(threads)]
+
+    # Start all the port scan threads
+    for t in threads_list:
+        t.start()
+
+    # Wait for port scan threads to finish
+    for t in threads_list:
+        t.join()
+
+    open_ports = []
+    for t in threads_list:
+        open_ports += t.open_ports
+
+    open_ports.sort(key=_sort_key)
+    return open_ports
+
+
+async def scan_tcp_async(
+    probes: Iterable[tuple[str, int]],
+    max_in_flight: int,
+    timeout: float,
+    retries: int = 0,
+    timing: RttEstimator = None,
+    on_open: Callable[[str, int], None] = None,
+) -> list[tuple[str, int]]:
+    """
+    Probes with non-blocking connects from the running event loop. Returns the open (ip, port) pairs, sorted.
+
+    A connect is only started once one of the `max_in_flight` slots is free, so that the memory used, and the number of
+    file descriptors, does not grow with the number of probes. Connects are driven by selector callbacks rather than
+    tasks, which would cost more than the connect itself on fast networks. A retry keeps the slot of its probe.
+    """
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(max_in_flight)
+    open_ports = []
+    reports = set()
+    in_flight = 0
+    all_done = None
+
+    def finish(probe: tuple[str, int], is_open: bool):
+        nonlocal in_flight
+        if is_open:
+            open_ports.append(probe)
+            if on_open:
+                report = loop.run_in_executor(None, on_open, *probe)
+                reports.add(report)
+                report.add_done_callback(reports.discard)
+        in_flight -= 1
+        semaphore.release()
+        if in_flight == 0 and all_done is not None and not all_done.done():
+            all_done.set_result(None)
+
+    def connected(s: socket.socket, probe: tuple[str, int], start: float, timer: asyncio.TimerHandle):
+        loop.remove_writer(s.fileno())
+        timer.cancel()
+        error = s.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+        if timing and error in (0, errno.ECONNREFUSED):
+            timing.sample(probe[0], loop.time() - start)
+        is_open = error == 0 and not _is_self_connect(s)
+        s.close()
+        finish(probe, is_open)
+
+    def timed_out(s: socket.socket, probe: tuple[str, int], attempt: int):
+        loop.remove_writer(s.fileno())
+        s.close()
+        if timing:
+            timing.timed_out(probe[0], attempt < retries)
+        if attempt < retries:
+            # Raised from a loop callback, an error would be swallowed and the scan would wait for the probe forever
+            try:
+                connect(probe, attempt + 1)
+            except OSError:
+                finish(probe, False)
+        else:
+            finish(probe, False)
+
+    def connect(probe: tuple[str, int], attempt: int):
+        s = socket.socket(_socket_family(probe[0]), socket.SOCK_STREAM)
+        s.setblocking(False)
+        start = loop.time()
+        error = s.connect_ex(probe)
+        if error in (errno.EINPROGRESS, errno.EWOULDBLOCK):
+            timer = loop.call_later(timing.timeout(probe[0], attempt) if timing else timeout, timed_out, s, probe, attempt)
+            loop.add_writer(s.fileno(), connected, s, probe, start, timer)
+            return
+
+        if timing and error in (0, errno.ECONNREFUSED):
+            timing.sample(probe[0], loop.time() - start)
+        is_open = error == 0 and not _is_self_connect(s)
+        s.close()
+        finish(probe, is_open)
+
+    for probe in probes:
+        await semaphore.acquire()
+        in_flight += 1
+        connect(probe, 0)
+
+    if in_flight > 0:
+        all_done = loop.create_future()
+        await all_done
+
+    # The open ports are only returned once they have all been reported
+    if reports:
+        await asyncio.gather(*reports)
+
+    open_ports.sort(key=_sort_key)
+    return open_ports
+
+
+def scan_tcp(
+    probes: Iterable[tuple[str, int]],
+    concurrency: int,
+    timeout: float,
+    engine: str = ScanEngine.THREADS,
+    retries: int = 0,
+    timing: RttEstimator = None,
+    on_open: Callable[[str, int], None] = None,
+) -> list[tuple[str, int]]:
+    """
+    Probes (ip, port) pairs with a full TCP connect. Returns the open (ip, port) pairs, sorted.
+
+    @param concurrency Number of threads for the threads engine, or maximum number of connects in flight for the asyncio engine
+    @param timeout Time in seconds to wait for a connection before considering the port closed, unless `timing` is given
+    @param engine One of the ScanEngine values
+    @param retries Number of times a timed out probe is tried again
+    @param timing Estimator giving the timeout of each connect from the round trip times of its target
+    @param on_open Called with the ip and the port of each open port, as soon as it is found
+    """
+    if engine == ScanEngine.THREADS:
+        return scan_tcp_threads(probes, concurrency, timeout, retries, timing, on_open)
+    if engine == ScanEngine.ASYNCIO:
+        return asyncio.run(scan_tcp_async(probes, concurrency, timeout, retries, timing, on_open))
+    raise ValueError(f"Unknown scan engine: {engine}")
+
+
+def scan_tcp_ports(ip: str, ports: list[int], concurrency: int, timeout: float, engine: str = ScanEngine.THREADS) -> list[int]:
+    """Scans the TCP ports of a single IP address. Returns the open ports, sorted."""
+    return [port for _, port in scan_tcp(((ip, port) for port in ports), concurrency, timeout, engine)]
@@ -0,0 +1,252 @@
+"""
+Offline public suffix list lookups.
+
+A snapshot of the public suffix list is bundled with the SDK. It is compiled into a reversed-label trie stored in a
+flat binary file, which is read as is, or memory mapped, so that processes do not parse the list. The trie is compiled
+when the python images are built:
+
+    python -c "from stalker_job_sdk.psl import main; main()"
+
+Binary format, little endian:
+
+    header: magic (8 bytes), node count (u32), edge count (u32), labels size (u32), version size (u16), version
+    nodes: flags (u8), first edge (u32), edge count (u32)
+    edges: label offset (u32), label size (u16), child node (u32), contiguous for the children of a node
+    labels: utf-8 encoded labels
+"""
+import mmap as _mmap
+import os
+import struct
+import sys
+from functools import lru_cache
+from os import getenv
+from typing import Iterable, NamedTuple
+
+_DATA_DIRECTORY = os.path.join(os.path.dirname(__file__), "data")
+PUBLIC_SUFFIX_LIST_PATH = os.path.join(_DATA_DIRECTORY, "public_suffix_list.dat")
+COMPILED_TRIE_PATH = os.path.join(_DATA_DIRECTORY, "public_suffix_list.trie")
+
+_MAGIC = b"RKPSL\x00\x00\x01"
+_HEADER = struct.Struct("<8sIIIH")
+_NODE = struct.Struct("<BII")
+_EDGE = struct.Struct("<IHI")
+
+_RULE = 1
+_PRIVATE_RULE = 2
+_EXCEPTION = 4
+_PRIVATE_EXCEPTION = 8
+
+
+class SplitDomain(NamedTuple):
+    subdomain: str
+    domain: str
+    suffix: str
+
+    @property
+    def registered_domain(self) -> str:
+        return f"{self.domain}.{self.suffix}" if self.domain and self.suffix else ""
+
+
+def _read_rules(path: str) -> tuple[str, list[tuple[str, bool]]]:
+    version = ""
+    rules = []
+    private = False
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith("// VERSION:"):
+                version = line[len("// VERSION:"):].strip()
+            elif line.startswith("// ===BEGIN PRIVATE DOMAINS==="):
+                private = True
+            if not line or line.startswith("//"):
+                continue
+            rules.append((line.split()[0].lower(), private))
+    return version, rules
+
+
+def _rule_variants(rule: str) -> set[str]:
+    """Gets the unicode and punycode forms of a rule, so that both forms of a hostname can be looked up."""
+    variants = { rule }
+    try:
+        variants.add(".".join(
+            label if label in ("*", "!") or label.isascii() else label.encode("idna").decode("ascii")
+            for label in rule.split(".")
+        ))
+    except UnicodeError:
+        pass
+    return variants
+
+
+def compile_public_suffix_list(source: str = PUBLIC_SUFFIX_LIST_PATH) -> bytes:
+    """Compiles a public suffix list file into the binary trie format."""
+    version, rules = _read_rules(source)
+
+    root: dict = {}
+    flags: dict[int, int] = {}
+    for rule, private in rules:
+        exception = rule.startswith("!")
+        for variant in _rule_variants(rule.lstrip("!")):
+            node = root
+            for label in reversed(variant.split(".")):
+                node = node.setdefault(label, {})
+            flag = _EXCEPTION if exception else _RULE
+            if private:
+                flag <<= 1
+            flags[id(node)] = flags.get(id(node), 0) | flag
+
+    # Breadth first numbering, so that the edges of a node are contiguous
+    nodes = [root]
+    node_records = []
+    edge_records = []
+    labels = bytearray()
+    label_offsets: dict[bytes, int] = {}
+    index = 0
+    while index < len(nodes):
+        node = nodes[index]
+        children = [(label.encode("utf-8"), child) for label, child in node.items()]
+        node_records.append((flags.get(id(node), 0), len(edge_records), len(children)))
+        for label, child in children:
+            if label not in label_offsets:
+                label_offsets[label] = len(labels)
+                labels += label
+            edge_records.append((label_offsets[label], len(label), len(nodes)))
+            nodes.append(child)
+        index += 1
+
+    encoded_version = version.encode("utf-8")
+    output = bytearray(_HEADER.pack(_MAGIC, len(node_records), len(edge_records), len(labels), len(encoded_version)))
+    output += encoded_version
+    for record in node_records:
+        output += _NODE.pack(*record)
+    for record in edge_records:
+        output += _EDGE.pack(*record)
+    output += labels
+    return bytes(output)
+
+
+class PublicSuffixTrie:
+    """
+    Reversed-label trie of the public suffix list, read from its binary format.
+
+    @param buffer The compiled trie, as bytes or as a memory map
+    """
+
+    def __init__(self, buffer) -> None:
+        magic, node_count, edge_count, labels_size, version_size = _HEADER.unpack_from(buffer, 0)
+        if magic != _MAGIC:
+            raise ValueError("Invalid compiled public suffix list")
+
+        offset = _HEADER.size
+        self.version = bytes(buffer[offset:offset + version_size]).decode("utf-8")
+        offset += version_size
+        self._nodes_offset = offset
+        self._edges_offset = offset + node_count * _NODE.size
+        self._labels_offset = self._edges_offset + edge_count * _EDGE.size
+        self._buffer = buffer
+        self._decoded: dict[int, dict[str, int]] = {}
+
+    @classmethod
+    def from_file(cls, path: str = COMPILED_TRIE_PATH, mmap: bool = False) -> 'PublicSuffixTrie':
+        with open(path, "rb") as f:
+            if mmap:
+                return cls(_mmap.mmap(f.fileno(), 0, access=_mmap.ACCESS_READ))
+            return cls(f.read())
+
+    def _children(self, node: int) -> dict[str, int]:
+        """Gets the children of a node by label. Nodes are decoded the first time they are visited."""
+        children = self._decoded.get(node)
+        if children is None:
+            buffer = self._buffer
+            _, first, count = _NODE.unpack_from(buffer, self._nodes_offset + node * _NODE.size)
+            children = {}
+            for label_offset, label_size, child in _EDGE.iter_unpack(
+                buffer[self._edges_offset + first * _EDGE.size:self._edges_offset + (first + count) * _EDGE.size]
+            ):
+                start = self._labels_offset + label_offset
+                children[bytes(buffer[start:start + label_size]).decode("utf-8")] = child
+            self._decoded[node] = children
+        return children
+
+    def _flags(self, node: int) -> int:
+        return self._buffer[self._nodes_offset + node * _NODE.size]
+
+    def suffix_label_count(self, labels: list[str], include_private: bool = False) -> int:
+        """
+        Gets the number of labels of the public suffix of a hostname, given as a list of labels. Returns 0 if the hostname
+        does not end with a known public suffix.
+        """
+        rule = _RULE | _PRIVATE_RULE if include_private else _RULE
+        exception = _EXCEPTION | _PRIVATE_EXCEPTION if include_private else _EXCEPTION
+
+        node = 0
+        suffix_labels = 0
+        for depth in range(1, len(labels) + 1):
+            children = self._children(node)
+            child = children.get(labels[-depth], -1)
+            if child >= 0 and self._flags(child) & exception:
+                return depth - 1
+
+            wildcard = children.get("*", -1)
+            if wildcard >= 0 and self._flags(wildcard) & rule:
+                suffix_labels = depth
+
+            if child < 0:
+                break
+            if self._flags(child) & rule:
+                suffix_labels = depth
+            node = child
+
+        return suffix_labels
+
+    def split(self, hostname: str, include_private: bool = False) -> SplitDomain:
+        """Splits a lowercase hostname into its subdomain, domain and public suffix."""
+        labels = hostname.split(".")
+        suffix_labels = self.suffix_label_count(labels, include_private)
+        if suffix_labels == 0:
+            return SplitDomain(".".join(labels[:-1]), labels[-1], "")
+        if suffix_labels >= len(labels):
+            return SplitDomain("", "", hostname)
+
+        return SplitDomain(
+            ".".join(labels[:-suffix_labels - 1]),
+            labels[-suffix_labels - 1],
+            ".".join(labels[-suffix_labels:]),
+        )
+
+
+@lru_cache
+def get_public_suffix_trie() -> PublicSuffixTrie:
+    """
+    Gets the public suffix trie, reading the compiled trie when it exists and compiling the bundled list otherwise.
+
+    The compiled trie can be configured through the following environment variables:
+
+    RedKitePublicSuffixTrie: path of the compiled trie (default: the one next to the bundled list)
+    RedKitePublicSuffixMmap: set to true to memory map the compiled trie instead of reading it (default: false)
+    """
+    path = getenv('RedKitePublicSuffixTrie') or COMPILED_TRIE_PATH
+    if os.path.isfile(path):
+        use_mmap = (getenv('RedKitePublicSuffixMmap') or "").lower() == "true"
+        return PublicSuffixTrie.from_file(path, mmap=use_mmap)
+
+    return PublicSuffixTrie(compile_public_suffix_list())
+
+
+def split_domains(hostnames: Iterable[str], include_private: bool = False) -> list[SplitDomain]:
+    """
+    Splits hostnames into their subdomain, domain and public suffix, without any network access.
+
+    For instance, ["www.example.co.uk", "example.com"] gives
+    [SplitDomain("www", "example", "co.uk"), SplitDomain("", "example", "com")]
+    """
+    trie = get_public_suffix_trie()
+    return [trie.split(hostname.lower().strip("."), include_private) for hostname in hostnames]
+
+
+def main():
+    source = sys.argv[1] if len(sys.argv) > 1 else PUBLIC_SUFFIX_LIST_PATH
+    destination = sys.argv[2] if len(sys.argv) > 2 else COMPILED_TRIE_PATH
+    compiled = compile_public_suffix_list(source)
+    with open(destination, "wb") as f:
+        f.write(compiled)
+    print(f"Compiled {source} into {destination} ({len(compiled)} bytes, version {PublicSuffixTrie(compiled).version})")
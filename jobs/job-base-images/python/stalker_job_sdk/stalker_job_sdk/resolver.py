@@ -0,0 +1,369 @@
+"""
+Resolves many hostnames concurrently, from a single event loop, with DNS queries sent straight to the nameservers.
+
+Each hostname is resolved with an A query, and an AAAA query sent at the same time when IPv6 addresses are wanted, the
+CNAME chain being read from their answers. Internationalized hostnames are queried in their IDNA (punycode) form. The
+queries are sent over UDP, and sent again over TCP when their answer is truncated. A query which times out, or is
+answered with SERVFAIL or REFUSED, is sent again to the next nameserver.
+
+Resolutions can be reported as soon as they are known through an `on_resolved` callback, called from a thread of the
+event loop's default executor, so that a callback which blocks, such as `log_finding`, never holds up the queries.
+
+The nameservers are given as "ip" or "ip:port", "[ipv6]:port" for IPv6 addresses with a port. The ones of
+/etc/resolv.conf are used when none are given.
+"""
+import asyncio
+import random
+import socket
+import struct
+from typing import Callable, Iterable, NamedTuple
+
+
+class RecordType:
+    A = 1
+    CNAME = 5
+    AAAA = 28
+    OPT = 41
+
+
+class ResponseCode:
+    NOERROR = 0
+    SERVFAIL = 2
+    NXDOMAIN = 3
+    REFUSED = 5
+
+
+_RESPONSE_CODE_NAMES = { 0: "NOERROR", 1: "FORMERR", 2: "SERVFAIL", 3: "NXDOMAIN", 4: "NOTIMP", 5: "REFUSED" }
+_RETRIED_CODES = (ResponseCode.SERVFAIL, ResponseCode.REFUSED)
+
+# Largest UDP answer advertised through EDNS, which avoids fragmentation
+UDP_PAYLOAD_SIZE = 1232
+_MAX_POINTERS = 64
+
+
+class DnsRecord(NamedTuple):
+    name: str
+    type: int
+    ttl: int
+    data: str
+
+
+class DnsResponse(NamedTuple):
+    id: int
+    code: int
+    truncated: bool
+    name: str
+    type: int
+    records: list[DnsRecord]
+
+
+class Resolution(NamedTuple):
+    hostname: str
+    addresses: list[str]
+    cnames: list[str]
+    ttl: int = None
+    error: str = None
+
+
+def encode_name(name: str) -> str:
+    """
+    Encodes a name as it is sent in queries and read from answers: lowercase, without its trailing dot, and its
+    internationalized labels in their IDNA form. Raises a ValueError if it is invalid.
+    """
+    labels = []
+    for label in name.rstrip(".").lower().split("."):
+        try:
+            encoded = label.encode("idna").decode("ascii") if not label.isascii() else label
+        except UnicodeError:
+            raise ValueError(f"Invalid hostname: {name}") from None
+        if not 0 < len(encoded) < 64:
+            raise ValueError(f"Invalid hostname: {name}")
+        labels.append(encoded)
+    return ".".join(labels)
+
+
+def build_query(id: int, name: str, type: int) -> bytes:
+    """Builds a recursive query of a name, with an EDNS record advertising the UDP payload size."""
+    question = b""
+    for label in encode_name(name).split("."):
+        question += bytes((len(label),)) + label.encode("ascii")
+
+    header = struct.pack("!HHHHHH", id, 0x0100, 1, 0, 0, 1)
+    opt = b"\x00" + struct.pack("!HHIH", RecordType.OPT, UDP_PAYLOAD_SIZE, 0, 0)
+    return header + question + b"\x00" + struct.pack("!HH", type, 1) + opt
+
+
+def _read_name(data: bytes, offset: int) -> tuple[str, int]:
+    labels = []
+    end = None
+    pointers = 0
+    while True:
+        length = data[offset]
+        if length & 0xC0 == 0xC0:
+            # A pointer to a name written earlier in the message
+            if end is None:
+                end = offset + 2
+            pointers += 1
+            if pointers > _MAX_POINTERS:
+                raise ValueError("Too many compression pointers")
+            offset = ((length & 0x3F) << 8) | data[offset + 1]
+            continue
+
+        offset += 1
+        if length == 0:
+            break
+        labels.append(data[offset:offset + length].decode("ascii", "replace").lower())
+        offset += length
+
+    return ".".join(labels), end if end is not None else offset
+
+
+def parse_response(data: bytes) -> DnsResponse:
+    """Parses a DNS response, keeping its A, AAAA and CNAME answers. Raises a ValueError if it is invalid."""
+    try:
+        id, flags, question_count, answer_count, _, _ = struct.unpack_from("!HHHHHH", data)
+        if not flags & 0x8000 or question_count != 1:
+            raise ValueError("Not the response to a query")
+
+        name, offset = _read_name(data, 12)
+        type, _ = struct.unpack_from("!HH", data, offset)
+        offset += 4
+
+        records = []
+        for _ in range(answer_count):
+            owner, offset = _read_name(data, offset)
+            record_type, _, ttl, length = struct.unpack_from("!HHIH", data, offset)
+            offset += 10
+            rdata = data[offset:offset + length]
+            if len(rdata) != length:
+                raise ValueError("Truncated record")
+
+            if record_type == RecordType.A and length == 4:
+                records.append(DnsRecord(owner, record_type, ttl, socket.inet_ntop(socket.AF_INET, rdata)))
+            elif record_type == RecordType.AAAA and length == 16:
+                records.append(DnsRecord(owner, record_type, ttl, socket.inet_ntop(socket.AF_INET6, rdata)))
+            elif record_type == RecordType.CNAME:
+                records.append(DnsRecord(owner, record_type, ttl, _read_name(data, offset)[0]))
+            offset += length
+
+    except (IndexError, struct.error) as exception:
+        raise ValueError(f"Invalid DNS response: {exception}") from None
+
+    return DnsResponse(id, flags & 0x000F, bool(flags & 0x0200), name, type, records)
+
+
+def parse_nameserver(value: str) -> tuple[str, int]:
+    """Parses a nameserver given as "ip", "ip:port" or "[ipv6]:port"."""
+    value = value.strip()
+    if value.startswith("["):
+        host, _, port = value[1:].partition("]:")
+        return host.rstrip("]"), int(port or 53)
+    if value.count(":") == 1:
+        host, port = value.split(":")
+        return host, int(port)
+    return value, 53
+
+
+def read_nameservers(path: str = "/etc/resolv.conf") -> list[str]:
+    """Reads the nameservers of a resolv.conf file."""
+    nameservers = []
+    try:
+        with open(path) as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2 and parts[0] == "nameserver":
+                    nameservers.append(parts[1])
+    except OSError:
+        pass
+    return nameservers
+
+
+class _Nameserver(asyncio.DatagramProtocol):
+    def __init__(self, address: tuple[str, int]) -> None:
+        self.address = address
+        self.transport: asyncio.DatagramTransport = None
+        # Queries waiting for their answer, by id, with their question
+        self.pending: dict[int, tuple[str, int, asyncio.Future]] = {}
+
+    def connection_made(self, transport: asyncio.DatagramTransport):
+        self.transport = transport
+
+    def datagram_received(self, data: bytes, addr):
+        try:
+            response = parse_response(data)
+        except ValueError:
+            return
+
+        name, type, future = self.pending.get(response.id, (None, None, None))
+        # Answers to another question, such as late answers to an earlier query with the same id, are dropped
+        if future is not None and not future.done() and (response.name, response.type) == (name, type):
+            future.set_result(response)
+
+    def error_received(self, exc: Exception):
+        # Such as an ICMP port unreachable, the pending queries time out and are sent to the next nameserver
+        pass
+
+
+class BulkResolver:
+    """
+    Sends DNS queries to nameservers from the running event loop.
+
+    @param nameservers Nameservers queried in turn, such as ["1.1.1.1", "127.0.0.1:5353"]. Defaults to /etc/resolv.conf
+    @param timeout Time to wait for the answer to a query, in seconds
+    @param retries Number of times a query is sent again, to the next nameserver, when it fails
+    """
+
+    def __init__(self, nameservers: Iterable[str] = None, timeout: float = 2.0, retries: int = 2) -> None:
+        nameservers = list(nameservers or read_nameservers() or ["127.0.0.1"])
+        self.timeout = timeout
+        self.retries = max(0, retries)
+        self.sent = 0
+        self._nameservers = [_Nameserver(parse_nameserver(n)) for n in nameservers]
+        self._next = 0
+
+    async def __aenter__(self):
+        loop = asyncio.get_running_loop()
+        for nameserver in self._nameservers:
+            await loop.create_datagram_endpoint(lambda n=nameserver: n, remote_addr=nameserver.address)
+        return self
+
+    async def __aexit__(self, *args):
+        self.close()
+
+    def close(self):
+        for nameserver in self._nameservers:
+            if nameserver.transport is not None:
+                nameserver.transport.close()
+
+    async def _query_udp(self, nameserver: _Nameserver, name: str, type: int) -> DnsResponse:
+        id = random.getrandbits(16)
+        while id in nameserver.pending:
+            id = random.getrandbits(16)
+
+        future = asyncio.get_running_loop().create_future()
+        nameserver.pending[id] = (name, type, future)
+        try:
+            nameserver.transport.sendto(build_query(id, name, type))
+            self.sent += 1
+            return await asyncio.wait_for(future, self.timeout)
+        finally:
+            nameserver.pending.pop(id, None)
+
+    async def _query_tcp(self, nameserver: _Nameserver, name: str, type: int) -> DnsResponse:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(*nameserver.address), self.timeout)
+        try:
+            query = build_query(random.getrandbits(16), name, type)
+            writer.write(struct.pack("!H", len(query)) + query)
+            self.sent += 1
+            length, = struct.unpack("!H", await asyncio.wait_for(reader.readexactly(2), self.timeout))
+            return parse_response(await asyncio.wait_for(reader.readexactly(length), self.timeout))
+        finally:
+            writer.close()
+
+    async def query(self, name: str, type: int) -> DnsResponse:
+        """
+        Queries the records of a type of a name. Raises a TimeoutError if no nameserver answered, and a ValueError if the
+        name is invalid.
+        """
+        # The answers name the question in its encoded form, which the pending queries are matched with
+        name = encode_name(name)
+        start = self._next
+        self._next = (self._next + 1) % len(self._nameservers)
+
+        response = None
+        for attempt in range(self.retries + 1):
+            nameserver = self._nameservers[(start + attempt) % len(self._nameservers)]
+            try:
+                response = await self._query_udp(nameserver, name, type)
+                if response.truncated:
+                    response = await self._query_tcp(nameserver, name, type)
+            except (asyncio.TimeoutError, OSError, EOFError, ValueError):
+                continue
+
+            if response.code not in _RETRIED_CODES:
+                return response
+
+        if response is not None:
+            return response
+        raise asyncio.TimeoutError(f"No nameserver answered the query of {name}")
+
+    async def resolve(self, hostname: str, ipv6: bool = False) -> Resolution:
+        """
+        Resolves the IPv4 addresses, and the CNAME chain, of a hostname.
+
+        @param ipv6 Also resolves its IPv6 addresses
+        """
+        hostname = hostname.rstrip(".").lower()
+        try:
+            encode_name(hostname)
+        except ValueError:
+            return Resolution(hostname, [], [], error="INVALID")
+
+        types = (RecordType.A, RecordType.AAAA) if ipv6 else (RecordType.A,)
+        try:
+            responses = await asyncio.gather(*(self.query(hostname, type) for type in types))
+        except asyncio.TimeoutError:
+            return Resolution(hostname, [], [], error="TIMEOUT")
+
+        addresses = []
+        cnames = []
+        ttls = []
+        for response in responses:
+            for record in response.records:
+                ttls.append(record.ttl)
+                if record.type == RecordType.CNAME:
+                    if record.data not in cnames:
+                        cnames.append(record.data)
+                elif record.data not in addresses:
+                    addresses.append(record.data)
+
+        code = responses[0].code
+        error = _RESPONSE_CODE_NAMES.get(code, str(code)) if code != ResponseCode.NOERROR else None
+        return Resolution(hostname, addresses, cnames, min(ttls) if ttls else None, error)
+
+
+async def resolve_hostnames_async(
+    hostnames: Iterable[str],
+    nameservers: Iterable[str] = None,
+    concurrency: int = 100,
+    timeout: float = 2.0,
+    retries: int = 2,
+    on_resolved: Callable[[Resolution], None] = None,
+    ipv6: bool = False,
+) -> list[Resolution]:
+    """
+    Resolves hostnames concurrently. Returns their resolutions, in the order in which they were resolved.
+
+    @param concurrency Maximum number of hostnames resolved at the same time
+    @param on_resolved Called with each resolution as soon as it is known
+    @param ipv6 Also resolves the IPv6 addresses of the hostnames, with a second query for each one
+    """
+    resolutions = []
+    # The workers share an iterator, so that the hostnames are read as they are resolved
+    hostnames = iter(hostnames)
+
+    async with BulkResolver(nameservers, timeout, retries) as resolver:
+
+        async def resolve():
+            for hostname in hostnames:
+                resolution = await resolver.resolve(hostname, ipv6)
+                resolutions.append(resolution)
+                if on_resolved:
+                    await asyncio.to_thread(on_resolved, resolution)
+
+        await asyncio.gather(*(resolve() for _ in range(max(1, concurrency))))
+
+    return resolutions
+
+
+def resolve_hostnames(
+    hostnames: Iterable[str],
+    nameservers: Iterable[str] = None,
+    concurrency: int = 100,
+    timeout: float = 2.0,
+    retries: int = 2,
+    on_resolved: Callable[[Resolution], None] = None,
+    ipv6: bool = False,
+) -> list[Resolution]:
+    """Runs resolve_hostnames_async in a new event loop."""
+    return asyncio.run(resolve_hostnames_async(hostnames, nameservers, concurrency, timeout, retries, on_resolved, ipv6))
@@ -0,0 +1,240 @@
+"""
+Runs python jobs, either one job per interpreter or many jobs from a warm fork server.
+
+A job is python code executed with the SDK available, followed by its ended report. Started with --serve, main.py keeps
+a parent process with the SDK and the modules used by the jobs already imported, and forks an isolated child for each
+job read from its standard input, one json object per line:
+
+    {"code": "<python code>", "context": "<RedKiteContext>", "environment": {"HOSTNAME": "example.com"}}
+
+Each child runs with its own RedKiteContext and environment variables. If a child exits before it reports that its job
+ended, whatever its exit status, the parent reports the job as ended on its behalf, and as failed if the child did not
+exit with 0.
+"""
+import gc
+import json
+import os
+import sys
+import traceback
+from importlib import import_module
+from os import getenv
+from typing import Iterable, TextIO
+
+import stalker_job_sdk
+from stalker_job_sdk import JobStatus, _log_done, _post_or_raise, log_debug, log_error, log_status
+
+# Modules imported by the parent before it forks, so that the jobs do not import them again
+PRELOADED_MODULES = (
+    "httpx",
+    "h2.connection",
+    "asyncio",
+    "json",
+    "ipaddress",
+    "socket",
+    "ssl",
+    "stalker_job_sdk.aio",
+    "stalker_job_sdk.batching",
+    "stalker_job_sdk.dedup",
+    "stalker_job_sdk.dnscache",
+    "stalker_job_sdk.domains",
+    "stalker_job_sdk.emitter",
+    "stalker_job_sdk.httpcheck",
+    "stalker_job_sdk.limits",
+    "stalker_job_sdk.outbox",
+    "stalker_job_sdk.resolver",
+)
+
+# Cached SDK objects which hold connections, threads or files, and must not be shared with a forked child
+_PER_PROCESS_CACHES = (
+    stalker_job_sdk.get_http_client,
+    stalker_job_sdk.get_outbox,
+    stalker_job_sdk.get_finding_batcher,
+    stalker_job_sdk.get_background_emitter,
+    stalker_job_sdk.get_finding_deduplicator,
+    stalker_job_sdk.get_dns_cache,
+)
+
+
+def run_job(command: str):
+    """Runs the code of a job and reports that it ended. Exceptions raised by the job mark it as failed."""
+    log_debug('Job execution started.')
+
+    try:
+        # The names main.py used to define remain available to the job code
+        exec(command, {
+            "__name__": "__main__",
+            "sys": sys,
+            "JobStatus": JobStatus,
+            "log_status": log_status,
+            "log_error": log_error,
+            "log_debug": log_debug,
+            "_log_done": _log_done,
+        })
+
+    except Exception as exception:
+        log_error(exception)
+        log_status(JobStatus.FAILED)
+
+    _log_done()
+    log_debug('Job execution ended.')
+
+
+def preload(modules: Iterable[str] = PRELOADED_MODULES):
+    """Imports the modules shared by the jobs. Modules that are not installed are skipped."""
+    for module in modules:
+        try:
+            import_module(module)
+        except ImportError:
+            pass
+
+    from .serialization import _load_backends
+    _load_backends()
+
+    # The public suffix trie is read-only, children share the pages of the parent's copy
+    from .psl import get_public_suffix_trie
+    get_public_suffix_trie()
+
+
+class ForkServer:
+    """
+    Forks a child process per job from a warm parent process.
+
+    @param max_children Maximum number of jobs running at the same time
+    """
+
+    def __init__(self, max_children: int = 1) -> None:
+        self.max_children = max(1, max_children)
+        self.started = 0
+        self.failed = 0
+        # Context of each child, and the pipe through which it tells that it reported the end of its job
+        self._children: dict[int, tuple[str, int]] = {}
+
+    def submit(self, code: str, context: str = None, environment: dict[str, str] = None) -> int:
+        """Starts a job in a forked child, waiting for a running job to end if too many are running. Returns the child pid."""
+        while len(self._children) >= self.max_children:
+            self._reap()
+
+        # Buffered output would otherwise be written by both processes
+        sys.stdout.flush()
+        sys.stderr.flush()
+
+        ended_read, ended_write = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(ended_read)
+            self._run_child(code, context, environment or {}, ended_write)
+
+        # The pipe only reads as empty once the child has exited if the parent holds no write end
+        os.close(ended_write)
+        self._children[pid] = (context, ended_read)
+        self.started += 1
+        return pid
+
+    def wait(self):
+        """Waits for all the running jobs to end."""
+        while self._children:
+            self._reap()
+
+    def _reap(self):
+        pid, status = os.wait()
+        if pid not in self._children:
+            return
+
+        context, ended_read = self._children.pop(pid)
+        try:
+            ended = os.read(ended_read, 1) != b""
+        finally:
+            os.close(ended_read)
+
+        exit_code = os.waitstatus_to_exitcode(status)
+        if exit_code != 0:
+            self.failed += 1
+        if not ended:
+            _report_unended_job(context, exit_code)
+
+    @staticmethod
+    def _run_child(code: str, context: str, environment: dict[str, str], ended_write: int):
+        exit_code = 1
+        try:
+            for cache in _PER_PROCESS_CACHES:
+                cache.cache_clear()
+
+            os.environ.update(environment)
+            if context:
+                os.environ['RedKiteContext'] = context
+            else:
+                os.environ.pop('RedKiteContext', None)
+
+            run_job(code)
+            os.write(ended_write, b"\n")
+            exit_code = 0
+
+        except SystemExit as exit:
+            # As the interpreter does: no code is a success, and a code which is not a number a failure
+            if exit.code is None:
+                exit_code = 0
+            else:
+                exit_code = exit.code if isinstance(exit.code, int) else 1
+        except BaseException:
+            traceback.print_exc()
+
+        finally:
+            # Exit handlers registered by the SDK, such as the findings flush, must run in the child
+            try:
+                import atexit
+                atexit._run_exitfuncs()
+            finally:
+                sys.stdout.flush()
+                sys.stderr.flush()
+                os._exit(exit_code)
+
+
+def _report_unended_job(context: str, exit_code: int):
+    """Reports a job whose process exited before reporting that it ended, as failed too if its exit code is not 0."""
+    message = f"Job process exited with status {exit_code}"
+    statuses = ["Ended"] if exit_code == 0 else [JobStatus.FAILED, "Ended"]
+    if not context:
+        if exit_code != 0:
+            print(f"@error {message}")
+        for status in statuses:
+            print(f"Status: {status}")
+        sys.stdout.flush()
+        return
+
+    try:
+        for status in statuses:
+            _post_or_raise("/Jobs/Status", { "Status": status, "RedKiteContext": context })
+    except Exception as exception:
+        print(f"{message}, the end of the job could not be reported: {exception}", file=sys.stderr)
+
+
+def serve(jobs: TextIO = None):
+    """
+    Runs the jobs read from a stream, one json object per line, in forked children of this process.
+
+    The fork server can be configured through the following environment variables:
+
+    RedKiteRunnerConcurrency: maximum number of jobs running at the same time (default: the number of CPUs)
+    RedKiteRunnerPreload: comma separated modules imported before forking, in addition to the default ones (default: none)
+    """
+    jobs = jobs or sys.stdin
+    extra_modules = [m.strip() for m in (getenv('RedKiteRunnerPreload') or "").split(",") if m.strip()]
+    preload([*PRELOADED_MODULES, *extra_modules])
+
+    # Objects created while warming up are never freed, keeping them out of the collector avoids copying their pages
+    gc.collect()
+    gc.freeze()
+
+    server = ForkServer(int(getenv('RedKiteRunnerConcurrency') or os.cpu_count() or 1))
+    for line in jobs:
+        if not line.strip():
+            continue
+
+        try:
+            job = json.loads(line)
+            server.submit(job["code"], job.get("context"), job.get("environment"))
+        except (ValueError, KeyError, TypeError) as exception:
+            print(f"Invalid job submission: {exception}", file=sys.stderr)
+
+    server.wait()
+    return server
@@ -0,0 +1,100 @@
+from ipaddress import IPv4Address, IPv4Network, IPv6Address, IPv6Network
+from operator import attrgetter
+from typing import Any, Callable
+
+_NOT_LOADED = object()
+
+# The json backends are imported on first use, orjson is None when it is not installed
+orjson = _NOT_LOADED
+_encoder = None
+
+
+_serializers: dict[type, Callable[[Any], dict]] = {}
+
+# Values which have no attributes to serialize, but have a meaningful string representation
+_STRING_TYPES = (IPv4Address, IPv6Address, IPv4Network, IPv6Network)
+
+
+def _slot_names(cls: type) -> tuple[str, ...]:
+    """Gets the slots of a class and of its parents, parents first, which is the order in which findings set their attributes."""
+    names = []
+    for klass in reversed(cls.__mro__):
+        slots = klass.__dict__.get("__slots__", ())
+        if isinstance(slots, str):
+            slots = (slots,)
+        names.extend(name for name in slots if name not in ("__dict__", "__weakref__") and name not in names)
+    return tuple(names)
+
+
+def compile_serializer(cls: type) -> Callable[[Any], dict]:
+    """
+    Builds a function converting instances of `cls` into a dict of their attributes.
+
+    The slots of the class are read with a single attrgetter call. Attributes stored in a __dict__, which subclasses
+    without __slots__ have, are added after the slots.
+    """
+    names = _slot_names(cls)
+    has_dict = any("__slots__" not in klass.__dict__ for klass in cls.__mro__ if klass is not object)
+
+    if not names:
+        return vars
+
+    getter = attrgetter(*names)
+    if len(names) == 1:
+        single_getter = getter
+        getter = lambda obj: (single_getter(obj),)
+
+    if not has_dict:
+        return lambda obj: dict(zip(names, getter(obj)))
+
+    def serialize(obj) -> dict:
+        data = dict(zip(names, getter(obj)))
+        data.update(obj.__dict__)
+        return data
+
+    return serialize
+
+
+def register_serializable(cls: type) -> type:
+    """Class decorator marking a class, and its subclasses, as serialized through a compiled serializer."""
+    cls.__stalker_serializable__ = True
+    return cls
+
+
+def _default(obj):
+    cls = type(obj)
+    serializer = _serializers.get(cls)
+    if serializer is None:
+        if getattr(cls, "__stalker_serializable__", False):
+            serializer = compile_serializer(cls)
+        elif hasattr(obj, "__dict__"):
+            serializer = vars
+        elif isinstance(obj, _STRING_TYPES):
+            serializer = str
+        else:
+            raise TypeError(f"Object of type {cls.__name__} is not JSON serializable")
+        _serializers[cls] = serializer
+    return serializer(obj)
+
+
+def _load_backends():
+    global orjson, _encoder
+    if orjson is _NOT_LOADED:
+        try:
+            import orjson as module
+        except ImportError:
+            module = None
+        orjson = module
+
+    if _encoder is None:
+        import json
+        _encoder = json.JSONEncoder(default=_default, separators=(",", ":"))
+
+
+def dumps(obj: Any) -> str:
+    """Serializes findings, and any structure containing them, to json. Uses orjson when it is installed."""
+    if orjson is _NOT_LOADED or _encoder is None:
+        _load_backends()
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default).decode("utf-8")
+    return _encoder.encode(obj)
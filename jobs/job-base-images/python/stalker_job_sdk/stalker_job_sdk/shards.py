@@ -0,0 +1,118 @@
+"""
+Splits large IP range scans into shards, each one scanned by its own job, so that a range can be scanned from several
+nodes at the same time.
+
+masscan: every shard scans the whole range with masscan's --shards x/y and the same --seed. masscan walks the same
+randomized order of (ip, port) pairs in every shard, and each shard probes one pair out of y, so the shards are disjoint,
+balanced and cover the whole range together.
+cidr: the range is split in equal subnets, each shard scanning one of them. The number of shards is rounded up to a power
+of two.
+
+Each shard reports its findings as they are found. The same finding reported by several shards, such as when a shard is
+retried, is merged by the backend like any other duplicate finding.
+
+The parameters of each shard are printed as json, in the format of the job parameters of the subscriptions:
+
+    python -c "from stalker_job_sdk.shards import main; main()" 10.0.0.0/12 --shards 16 --rate 10000 --ports 1-1000
+"""
+import argparse
+import json
+import math
+import random
+from ipaddress import ip_network
+
+
+class ShardStrategy:
+    MASSCAN = "masscan"
+    CIDR = "cidr"
+
+
+def _parameters(network, rate: int, port_min: int, port_max: int, ports: list[int], shard: str = None, seed: int = None) -> list[dict]:
+    parameters = [
+        { "name": "targetIp", "value": str(network.network_address) },
+        { "name": "targetMask", "value": network.prefixlen },
+        { "name": "rate", "value": rate },
+        { "name": "portMin", "value": port_min },
+        { "name": "portMax", "value": port_max },
+        { "name": "ports", "value": ports },
+    ]
+    if shard is not None:
+        parameters.append({ "name": "shard", "value": shard })
+        parameters.append({ "name": "seed", "value": seed })
+    return parameters
+
+
+def plan_range_shards(
+    target: str,
+    shards: int,
+    rate: int,
+    port_min: int = 0,
+    port_max: int = 0,
+    ports: list[int] = None,
+    strategy: str = ShardStrategy.MASSCAN,
+    seed: int = None,
+) -> list[list[dict]]:
+    """
+    Plans the jobs scanning an IP range, such as "10.0.0.0/12", in shards. Returns the job parameters of each shard.
+
+    @param rate Packets per second of each shard
+    @param seed Seed of masscan's randomization, shared by all the shards. A random one is picked when not given
+    """
+    if shards < 1:
+        raise ValueError("At least one shard is needed")
+
+    network = ip_network(target, strict=False)
+    ports = ports or []
+
+    if strategy == ShardStrategy.MASSCAN:
+        if shards == 1:
+            return [_parameters(network, rate, port_min, port_max, ports)]
+        seed = seed if seed is not None else random.getrandbits(32)
+        return [
+            _parameters(network, rate, port_min, port_max, ports, f"{i}/{shards}", seed)
+            for i in range(1, shards + 1)
+        ]
+
+    if strategy == ShardStrategy.CIDR:
+        prefixlen_diff = min(math.ceil(math.log2(shards)), network.max_prefixlen - network.prefixlen)
+        return [
+            _parameters(subnet, rate, port_min, port_max, ports)
+            for subnet in network.subnets(prefixlen_diff=prefixlen_diff)
+        ]
+
+    raise ValueError(f"Unknown shard strategy: {strategy}")
+
+
+def masscan_shard_args(shard: str = None, seed: str = None) -> list[str]:
+    """Gets the masscan arguments of a shard, given as "x/y", with the seed shared by all the shards."""
+    args = []
+    if shard:
+        x, y = (int(value) for value in shard.split("/"))
+        if not 1 <= x <= y:
+            raise ValueError(f"Invalid shard: {shard}")
+        args += ["--shards", f"{x}/{y}"]
+    if seed:
+        args += ["--seed", str(int(seed))]
+    return args
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prints the job parameters of the shards of an IP range scan.")
+    parser.add_argument("target", help="IP range, such as 10.0.0.0/12")
+    parser.add_argument("--shards", type=int, required=True)
+    parser.add_argument("--rate", type=int, required=True, help="packets per second of each shard")
+    parser.add_argument("--ports", default="", help="ports, such as 22,80,8000-9000")
+    parser.add_argument("--strategy", choices=[ShardStrategy.MASSCAN, ShardStrategy.CIDR], default=ShardStrategy.MASSCAN)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    ports = []
+    port_min = port_max = 0
+    for part in filter(None, args.ports.split(",")):
+        if "-" in part:
+            port_min, port_max = (int(value) for value in part.split("-"))
+        else:
+            ports.append(int(part))
+
+    plan = plan_range_shards(args.target, args.shards, args.rate, port_min, port_max, ports, args.strategy, args.seed)
+    print(json.dumps(plan, indent=2))
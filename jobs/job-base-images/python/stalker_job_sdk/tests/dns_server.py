@@ -0,0 +1,127 @@
+"""
+A stub DNS server on a loopback port, over UDP and TCP, for the tests and the benchmarks of the resolver.
+
+It answers from a zone of names: a list of addresses, or a CNAME target as a string. Unknown names are answered with
+NXDOMAIN. Some names can be answered truncated over UDP, answered with SERVFAIL, or never answered. The answers can be
+delayed, like the ones of a remote nameserver.
+"""
+import socket
+import struct
+import threading
+import time
+from socketserver import BaseRequestHandler, ThreadingTCPServer, ThreadingUDPServer
+
+from stalker_job_sdk.resolver import RecordType, ResponseCode, _read_name
+
+
+def _encode_name(name: str) -> bytes:
+    return b"".join(bytes((len(label),)) + label.encode() for label in name.split(".")) + b"\x00"
+
+
+class StubDnsServer:
+    """
+    @param zone Records by name, such as {"www.example.com": "example.com", "example.com": ["10.0.0.1", "::1"]}
+    @param ttl TTL of every record
+    @param truncated Names answered with the truncated flag over UDP
+    @param servfail Names answered with SERVFAIL
+    @param dropped Names never answered
+    @param delay Time before each answer, in seconds
+    """
+
+    def __init__(self, zone: dict, ttl: int = 300, truncated=(), servfail=(), dropped=(), delay: float = 0) -> None:
+        self.zone = zone
+        self.ttl = ttl
+        self.delay = delay
+        self.truncated = set(truncated)
+        self.servfail = set(servfail)
+        self.dropped = set(dropped)
+        self.queries = 0
+        self._lock = threading.Lock()
+
+        server = self
+
+        class UdpHandler(BaseRequestHandler):
+            def handle(self):
+                data, s = self.request
+                response = server.answer(data, tcp=False)
+                if response is not None:
+                    s.sendto(response, self.client_address)
+
+        class TcpHandler(BaseRequestHandler):
+            def handle(self):
+                length, = struct.unpack("!H", self.request.recv(2))
+                response = server.answer(self.request.recv(length), tcp=True)
+                if response is not None:
+                    self.request.sendall(struct.pack("!H", len(response)) + response)
+
+        self._udp = ThreadingUDPServer(("127.0.0.1", 0), UdpHandler)
+        self._udp.daemon_threads = True
+        port = self._udp.server_address[1]
+        ThreadingTCPServer.allow_reuse_address = True
+        try:
+            self._tcp = ThreadingTCPServer(("127.0.0.1", port), TcpHandler)
+        except OSError:
+            self._udp.server_close()
+            raise
+        self._tcp.daemon_threads = True
+        self.address = f"127.0.0.1:{port}"
+
+        for s in (self._udp, self._tcp):
+            threading.Thread(target=s.serve_forever, args=(0.05,), daemon=True).start()
+
+    def _records(self, name: str, type: int) -> list[tuple[str, int, bytes]]:
+        records = []
+        for _ in range(8):
+            value = self.zone.get(name)
+            if isinstance(value, str):
+                records.append((name, RecordType.CNAME, _encode_name(value)))
+                name = value
+                continue
+            for address in value or []:
+                family, record_type = (socket.AF_INET6, RecordType.AAAA) if ":" in address else (socket.AF_INET, RecordType.A)
+                if record_type == type:
+                    records.append((name, type, socket.inet_pton(family, address)))
+            break
+        return records
+
+    def answer(self, query: bytes, tcp: bool) -> bytes:
+        with self._lock:
+            self.queries += 1
+
+        id, = struct.unpack_from("!H", query)
+        name, offset = _read_name(query, 12)
+        type, _ = struct.unpack_from("!HH", query, offset)
+        question = query[12:offset + 4]
+
+        if name in self.dropped:
+            return None
+        if self.delay:
+            time.sleep(self.delay)
+
+        flags = 0x8180
+        records = []
+        if name in self.servfail:
+            flags |= ResponseCode.SERVFAIL
+        elif name in self.truncated and not tcp:
+            flags |= 0x0200
+        elif name not in self.zone:
+            flags |= ResponseCode.NXDOMAIN
+        else:
+            records = self._records(name, type)
+
+        answers = b"".join(
+            _encode_name(owner) + struct.pack("!HHIH", record_type, 1, self.ttl, len(rdata)) + rdata
+            for owner, record_type, rdata in records
+        )
+        return struct.pack("!HHHHHH", id, flags, 1, len(records), 0, 0) + question + answers
+
+    def close(self):
+        for s in (self._udp, self._tcp):
+            s.shutdown()
+            s.server_close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
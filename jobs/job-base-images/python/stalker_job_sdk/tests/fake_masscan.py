@@ -0,0 +1,50 @@
+"""
+Stands in for masscan in the tests. Writes the results listed in FAKE_MASSCAN_RESULTS, a json array of
+[ip, port] pairs, to the output given with -oJ or -oL, "-" being the standard output.
+
+When FAKE_MASSCAN_WAIT_FOR is set, the fake waits for that file to exist after its first result, so that the tests can
+check that the first result is received while masscan is still running.
+"""
+import json
+import os
+import sys
+import time
+
+
+def main():
+    args = sys.argv[1:]
+    output_format = "-oJ" if "-oJ" in args else "-oL"
+    output_path = args[args.index(output_format) + 1]
+    output = sys.stdout if output_path == "-" else open(output_path, "w")
+
+    results = json.loads(os.environ.get("FAKE_MASSCAN_RESULTS") or "[]")
+    wait_for = os.environ.get("FAKE_MASSCAN_WAIT_FOR")
+
+    if output_format == "-oJ":
+        output.write("[\n")
+    else:
+        output.write("#masscan\n")
+
+    for i, (ip, port) in enumerate(results):
+        if output_format == "-oJ":
+            host = { "ip": ip, "timestamp": "1700000000", "ports": [{ "port": port, "proto": "tcp", "status": "open", "reason": "syn-ack", "ttl": 64 }] }
+            output.write(json.dumps(host) + ",\n")
+        else:
+            output.write(f"open tcp {port} {ip} 1700000000\n")
+        output.flush()
+
+        if i == 0 and wait_for:
+            deadline = time.monotonic() + 10
+            while not os.path.exists(wait_for) and time.monotonic() < deadline:
+                time.sleep(0.01)
+
+    if output_format == "-oJ":
+        output.write('{"finished": 1}\n]\n')
+    else:
+        output.write("# end\n")
+    output.flush()
+    sys.exit(int(os.environ.get("FAKE_MASSCAN_EXIT_CODE") or 0))
+
+
+if __name__ == '__main__':
+    main()
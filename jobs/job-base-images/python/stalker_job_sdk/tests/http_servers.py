@@ -0,0 +1,123 @@
+"""
+Local HTTP, HTTPS, HTTP/2 and silent servers, each one on its own loopback port, for the tests and the benchmarks of the
+HTTP checks. The HTTPS and HTTP/2 servers use a self-signed certificate generated with openssl.
+"""
+import os
+import shutil
+import socket
+import ssl
+import subprocess
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from socketserver import BaseRequestHandler
+
+HAS_OPENSSL = shutil.which("openssl") is not None
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_HEAD(self):
+        self.send_response(204)
+        self.end_headers()
+
+    def do_GET(self):
+        self.do_HEAD()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _H2Handler(BaseRequestHandler):
+    def handle(self):
+        from h2.config import H2Configuration
+        from h2.connection import H2Connection
+        from h2.events import RequestReceived
+
+        connection = H2Connection(H2Configuration(client_side=False))
+        connection.initiate_connection()
+        self.request.sendall(connection.data_to_send())
+        while data := self.request.recv(65536):
+            for event in connection.receive_data(data):
+                if isinstance(event, RequestReceived):
+                    connection.send_headers(event.stream_id, [(":status", "204"), ("server", "h2-server")], end_stream=True)
+            self.request.sendall(connection.data_to_send())
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Plaintext requests sent to the HTTPS servers fail their handshake
+        pass
+
+
+def _generate_certificate(directory: str) -> tuple[str, str]:
+    cert = os.path.join(directory, "cert.pem")
+    key = os.path.join(directory, "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "ec", "-pkeyopt", "ec_paramgen_curve:prime256v1", "-nodes", "-days", "1",
+         "-subj", "/CN=localhost", "-keyout", key, "-out", cert],
+        check=True,
+        capture_output=True,
+    )
+    return cert, key
+
+
+def _server_context(cert: str, key: str, alpn: list[str] = None) -> ssl.SSLContext:
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert, key)
+    if alpn:
+        context.set_alpn_protocols(alpn)
+    return context
+
+
+class LocalServers:
+    """Starts servers on loopback ports. The ports of each kind are in `http`, `https`, `h2` and `silent`."""
+
+    def __init__(self, http: int = 0, https: int = 0, silent: int = 0, h2: int = 0) -> None:
+        self.http: list[int] = []
+        self.https: list[int] = []
+        self.h2: list[int] = []
+        self.silent: list[int] = []
+        self._servers: list[_Server] = []
+        self._sockets: list[socket.socket] = []
+
+        context = h2_context = None
+        if https or h2:
+            with tempfile.TemporaryDirectory() as directory:
+                cert, key = _generate_certificate(directory)
+                context = _server_context(cert, key)
+                h2_context = _server_context(cert, key, ["h2"])
+
+        for _ in range(http):
+            self.http.append(self._serve())
+        for _ in range(https):
+            self.https.append(self._serve(context))
+        for _ in range(h2):
+            self.h2.append(self._serve(h2_context, _H2Handler))
+        for _ in range(silent):
+            # Connections are accepted by the kernel, but never read nor answered
+            listener = socket.create_server(("127.0.0.1", 0), backlog=128)
+            self._sockets.append(listener)
+            self.silent.append(listener.getsockname()[1])
+
+    def _serve(self, context: ssl.SSLContext = None, handler: type = _Handler) -> int:
+        server = _Server(("127.0.0.1", 0), handler)
+        if context is not None:
+            server.socket = context.wrap_socket(server.socket, server_side=True)
+        threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+        self._servers.append(server)
+        return server.server_address[1]
+
+    def close(self):
+        for server in self._servers:
+            server.shutdown()
+            server.server_close()
+        for s in self._sockets:
+            s.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,94 @@
+import asyncio
+import json
+import os
+import unittest
+from unittest import mock
+
+import httpx
+
+import stalker_job_sdk
+from stalker_job_sdk import IpFinding, JobStatus
+from stalker_job_sdk import aio
+
+
+class TestAsyncSdk(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+        async def handler(request: httpx.Request):
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            await asyncio.sleep(0.01)
+            self.in_flight -= 1
+            self.requests.append((request.url.path, json.loads(request.content)))
+            return httpx.Response(200)
+
+        loop = asyncio.get_running_loop()
+        aio._transports[loop] = aio._AsyncTransport(httpx.AsyncClient(transport=httpx.MockTransport(handler)), 4)
+        self.clear_caches()
+
+    async def asyncTearDown(self):
+        self.clear_caches()
+
+    def clear_caches(self):
+        stalker_job_sdk.get_finding_batcher.cache_clear()
+        stalker_job_sdk.get_background_emitter.cache_clear()
+        stalker_job_sdk.get_outbox.cache_clear()
+        stalker_job_sdk.get_finding_deduplicator.cache_clear()
+
+    @mock.patch.dict(os.environ, { "RedKiteContext": "context", "RedKiteBatchSize": "1" })
+    async def test_alog_finding_bounds_requests_in_flight(self):
+        # Act
+        await asyncio.gather(*(aio.alog_finding(IpFinding("IpFinding", f"10.0.0.{i}")) for i in range(20)))
+
+        # Assert
+        self.assertEqual(len(self.requests), 20)
+        self.assertLessEqual(self.max_in_flight, 4)
+        path, payload = self.requests[0]
+        self.assertEqual(path, "/Jobs/Finding")
+        self.assertTrue(payload["Finding"].startswith("@finding "))
+        self.assertEqual(payload["RedKiteContext"], "context")
+
+    @mock.patch.dict(os.environ, { "RedKiteContext": "context", "RedKiteBatchSize": "1" })
+    async def test_alog_status_and_done(self):
+        # Act
+        await aio.alog_info("hello")
+        await aio.alog_status(JobStatus.SUCCESS)
+        await aio._alog_done()
+
+        # Assert
+        self.assertEqual(
+            self.requests,
+            [
+                ("/Jobs/Finding", { "Finding": "@info hello", "RedKiteContext": "context" }),
+                ("/Jobs/Status", { "Status": "Success", "RedKiteContext": "context" }),
+                ("/Jobs/Status", { "Status": "Ended", "RedKiteContext": "context" }),
+            ]
+        )
+        self.assertNotIn(asyncio.get_running_loop(), aio._transports)
+
+    @mock.patch.dict(os.environ, { "RedKiteContext": "context", "RedKiteBatchSize": "100" })
+    async def test_alog_finding_is_batched(self):
+        # Arrange
+        batches = []
+
+        # Act
+        with mock.patch.object(stalker_job_sdk, "_post", lambda path, payload: batches.append((path, payload))):
+            for i in range(20):
+                await aio.alog_finding(IpFinding("IpFinding", f"10.0.0.{i}"))
+            await aio.alog_info("hello")
+            await aio.alog_status(JobStatus.SUCCESS)
+
+        # Assert
+        self.assertEqual(len(batches), 1)
+        path, payload = batches[0]
+        self.assertEqual(path, "/Jobs/Findings")
+        self.assertEqual(len(payload["Findings"]), 21)
+        self.assertEqual(payload["Findings"][-1], "@info hello")
+        self.assertEqual(self.requests, [("/Jobs/Status", { "Status": "Success", "RedKiteContext": "context" })])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
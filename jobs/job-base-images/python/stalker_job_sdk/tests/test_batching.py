@@ -0,0 +1,62 @@
+import time
+import unittest
+
+from stalker_job_sdk.batching import FindingBatcher
+
+
+class TestFindingBatcher(unittest.TestCase):
+    def setUp(self):
+        self.batches = []
+
+    def test_flush_on_count(self):
+        # Arrange
+        batcher = FindingBatcher(self.batches.append, max_count=3, max_delay=60)
+
+        # Act
+        for i in range(7):
+            batcher.add(f"@info {i}")
+
+        # Assert
+        self.assertEqual(self.batches, [["@info 0", "@info 1", "@info 2"], ["@info 3", "@info 4", "@info 5"]])
+        self.assertEqual(len(batcher), 1)
+        batcher.flush()
+
+    def test_flush_on_bytes(self):
+        # Arrange
+        batcher = FindingBatcher(self.batches.append, max_count=100, max_bytes=20, max_delay=60)
+
+        # Act
+        batcher.add("@info 0123456789")
+        batcher.add("@info 0123456789")
+
+        # Assert
+        self.assertEqual(len(self.batches), 1)
+        self.assertEqual(len(self.batches[0]), 2)
+
+    def test_flush_on_delay(self):
+        # Arrange
+        batcher = FindingBatcher(self.batches.append, max_count=100, max_delay=0.05)
+
+        # Act
+        batcher.add("@info hello")
+        time.sleep(0.3)
+
+        # Assert
+        self.assertEqual(self.batches, [["@info hello"]])
+
+    def test_explicit_flush(self):
+        # Arrange
+        batcher = FindingBatcher(self.batches.append, max_count=100, max_delay=60)
+        batcher.add("@info hello")
+        batcher.add("@debug world")
+
+        # Act
+        batcher.flush()
+        batcher.flush()
+
+        # Assert
+        self.assertEqual(self.batches, [["@info hello", "@debug world"]])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,81 @@
+import unittest
+
+from stalker_job_sdk.bitmap import Bitmap, RangeTracker, parse_ipv4
+
+
+class TestParseIpv4(unittest.TestCase):
+    def test_parse(self):
+        self.assertEqual(parse_ipv4("10.0.1.2"), (10 << 24) + (1 << 8) + 2)
+        self.assertEqual(parse_ipv4("255.255.255.255"), 2 ** 32 - 1)
+
+    def test_invalid_addresses(self):
+        for ip in ("10.0.0", "256.0.0.1", "010.0.0.1", "0x1.0.0.1", " 10.0.0.1", "::1", "", None):
+            with self.subTest(ip=ip):
+                self.assertRaises(ValueError, parse_ipv4, ip)
+
+
+class TestBitmap(unittest.TestCase):
+    def test_add(self):
+        # Arrange
+        bitmap = Bitmap(1000, page_bits=64)
+
+        # Act
+        added = [bitmap.add(i) for i in (0, 63, 64, 999, 63)]
+
+        # Assert
+        self.assertEqual(added, [True, True, True, True, False])
+        self.assertEqual(len(bitmap), 4)
+        self.assertIn(999, bitmap)
+        self.assertNotIn(998, bitmap)
+        self.assertNotIn(1000, bitmap)
+        self.assertEqual(bitmap.nbytes, 3 * 8)
+
+    def test_out_of_range(self):
+        self.assertRaises(IndexError, Bitmap(10).add, 10)
+        self.assertRaises(IndexError, Bitmap(10).add, -1)
+
+    def test_page_bits(self):
+        self.assertRaises(ValueError, Bitmap, 10, 100)
+
+
+class TestRangeTracker(unittest.TestCase):
+    def test_add(self):
+        # Arrange
+        tracker = RangeTracker("10.0.0.0/8")
+
+        # Act
+        added = [
+            tracker.add("10.0.0.1", 80),
+            tracker.add("10.0.0.1", 443),
+            tracker.add("10.0.0.1", 80),
+            tracker.add("10.255.255.255", 80),
+        ]
+
+        # Assert
+        self.assertEqual(added, [(True, True), (False, True), (False, False), (True, True)])
+        self.assertEqual((len(tracker.hosts), len(tracker.ports)), (2, 3))
+
+    def test_memory_grows_with_the_ports_found(self):
+        # Arrange
+        tracker = RangeTracker("10.0.0.0/8")
+
+        # Act
+        for i in range(0, 1 << 24, 997):
+            tracker.add(f"10.{i >> 16}.{(i >> 8) & 255}.{i & 255}", 443)
+
+        # Assert
+        self.assertLessEqual(tracker.nbytes, 2 * (1 << 24) // 8)
+
+    def test_invalid_records(self):
+        # Arrange
+        tracker = RangeTracker("10.0.0.0/24")
+
+        # Assert
+        self.assertRaises(ValueError, tracker.add, "10.0.1.0", 80)
+        self.assertRaises(ValueError, tracker.add, "10.0.0.1", 65536)
+        self.assertRaises(ValueError, tracker.add_host, "invalid")
+        self.assertRaises(ValueError, RangeTracker, "::/64")
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,96 @@
+import io
+import json
+import unittest
+from contextlib import redirect_stdout
+from unittest import mock
+
+import stalker_job_sdk
+from stalker_job_sdk import IpFinding, log_finding
+from stalker_job_sdk.dedup import BloomFilter, FindingDeduplicator
+
+
+class TestFindingDeduplicator(unittest.TestCase):
+    def test_exact_duplicates(self):
+        # Arrange
+        deduplicator = FindingDeduplicator()
+
+        # Act
+        results = [deduplicator.is_duplicate(f) for f in ["a", "b", "a", "c", "b"]]
+
+        # Assert
+        self.assertEqual(results, [False, False, True, False, True])
+        self.assertEqual(deduplicator.suppressed, 2)
+
+    def test_switches_to_bloom_filter(self):
+        # Arrange
+        deduplicator = FindingDeduplicator(max_exact=10, capacity=1000)
+
+        # Act
+        first_pass = [deduplicator.is_duplicate(str(i)) for i in range(500)]
+        second_pass = [deduplicator.is_duplicate(str(i)) for i in range(500)]
+
+        # Assert
+        self.assertEqual(sum(first_pass), 0)
+        self.assertTrue(all(second_pass))
+        self.assertEqual(deduplicator.suppressed, 500)
+
+    def test_stops_remembering_without_bloom_filter(self):
+        # Arrange
+        deduplicator = FindingDeduplicator(max_exact=10)
+
+        # Act
+        first_pass = [deduplicator.is_duplicate(str(i)) for i in range(500)]
+        second_pass = [deduplicator.is_duplicate(str(i)) for i in range(500)]
+
+        # Assert
+        self.assertEqual(sum(first_pass), 0)
+        self.assertEqual(second_pass, [True] * 10 + [False] * 490)
+        self.assertEqual(deduplicator.suppressed, 10)
+
+    def test_bloom_filter_error_rate(self):
+        # Arrange
+        bloom = BloomFilter(10_000, 0.01)
+        for i in range(10_000):
+            bloom.add(FindingDeduplicator.digest(f"added {i}"))
+
+        # Act
+        false_positives = sum(FindingDeduplicator.digest(f"new {i}") in bloom for i in range(10_000))
+
+        # Assert
+        self.assertLess(false_positives, 200)
+
+
+class TestLogFindingDeduplication(unittest.TestCase):
+    def setUp(self):
+        stalker_job_sdk.get_finding_deduplicator.cache_clear()
+
+    def tearDown(self):
+        stalker_job_sdk.get_finding_deduplicator.cache_clear()
+
+    def log(self, *findings) -> list[str]:
+        output = io.StringIO()
+        with redirect_stdout(output):
+            log_finding(*findings)
+        return output.getvalue().splitlines()
+
+    @mock.patch.dict("os.environ", { "RedKiteContext": "" })
+    def test_duplicates_are_not_logged(self):
+        # Act
+        first = self.log(IpFinding("IpFinding", "10.0.0.1"), IpFinding("IpFinding", "10.0.0.2"))
+        second = self.log(IpFinding("IpFinding", "10.0.0.2"), IpFinding("IpFinding", "10.0.0.3"))
+        third = self.log(IpFinding("IpFinding", "10.0.0.3"))
+
+        # Assert
+        self.assertEqual(len(json.loads(first[0][len("@finding "):])["findings"]), 2)
+        self.assertEqual([f["ip"] for f in json.loads(second[0][len("@finding "):])["findings"]], ["10.0.0.3"])
+        self.assertEqual(third, [])
+        self.assertEqual(stalker_job_sdk.get_finding_deduplicator().suppressed, 2)
+
+    @mock.patch.dict("os.environ", { "RedKiteContext": "", "RedKiteDeduplicate": "false" })
+    def test_deduplication_can_be_disabled(self):
+        self.log(IpFinding("IpFinding", "10.0.0.1"))
+        self.assertEqual(len(self.log(IpFinding("IpFinding", "10.0.0.1"))), 1)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
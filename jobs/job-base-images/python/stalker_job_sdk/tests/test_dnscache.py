@@ -0,0 +1,220 @@
+import asyncio
+import io
+import os
+import socket
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import stalker_job_sdk
+from stalker_job_sdk.dnscache import DnsCache, read_hosts, read_search_settings, resolve
+from stalker_job_sdk.resolver import Resolution
+from tests.dns_server import StubDnsServer
+
+ZONE = {
+    "example.com": ["10.0.0.1", "2001:db8::1"],
+    "www.example.com": "example.com",
+    "empty.example.com": [],
+}
+
+
+class TestDnsCache(unittest.TestCase):
+    def test_hits_and_misses(self):
+        with StubDnsServer(ZONE, ttl=300) as server:
+            # Arrange
+            cache = DnsCache([server.address])
+
+            # Act
+            first = cache.lookup("example.com")
+            second = cache.lookup("EXAMPLE.com.")
+            cache.lookup("www.example.com")
+
+            # Assert
+            self.assertEqual(first.addresses, ["10.0.0.1"])
+            self.assertEqual(second, first)
+            self.assertEqual(server.queries, 2)
+            self.assertEqual(cache.stats(), { "hits": 1, "misses": 2, "negativeHits": 0, "fileHits": 0, "entries": 2 })
+
+    def test_ttl_expires(self):
+        with StubDnsServer(ZONE, ttl=30) as server:
+            # Arrange
+            cache = DnsCache([server.address])
+            cache.lookup("example.com")
+
+            # Act
+            with patch("stalker_job_sdk.dnscache.time.time", return_value=cache._entries["example.com"][0]):
+                cache.lookup("example.com")
+
+            # Assert
+            self.assertEqual((cache.hits, cache.misses), (0, 2))
+
+    def test_max_ttl(self):
+        # Arrange
+        cache = DnsCache(max_ttl=10)
+
+        # Act
+        with patch("stalker_job_sdk.dnscache.time.time", return_value=1000.0):
+            cache.put(Resolution("example.com", ["10.0.0.1"], [], ttl=86400))
+
+        # Assert
+        self.assertEqual(cache._entries["example.com"][0], 1010.0)
+
+    def test_negative_caching(self):
+        with StubDnsServer(ZONE) as server:
+            # Arrange
+            cache = DnsCache([server.address], negative_ttl=60)
+
+            # Act
+            for _ in range(2):
+                cache.lookup("missing.example.com")
+                cache.lookup("empty.example.com")
+
+            # Assert
+            self.assertEqual((cache.misses, cache.hits, cache.negative_hits), (2, 2, 2))
+
+    def test_failures_are_not_cached(self):
+        with StubDnsServer(ZONE, dropped=["example.com"]) as server:
+            # Arrange
+            cache = DnsCache([server.address], timeout=0.1, retries=0)
+
+            # Act
+            for _ in range(2):
+                resolution = cache.lookup("example.com")
+
+            # Assert
+            self.assertEqual(resolution.error, "TIMEOUT")
+            self.assertEqual((cache.misses, cache.hits), (2, 0))
+
+    def test_concurrent_lookups_share_their_query(self):
+        with StubDnsServer(ZONE, delay=0.05) as server:
+            # Arrange
+            cache = DnsCache([server.address])
+
+            async def lookups():
+                return await asyncio.gather(*(cache.alookup("example.com") for _ in range(10)))
+
+            # Act
+            resolutions = asyncio.run(lookups())
+
+            # Assert
+            self.assertEqual(len({ tuple(r.addresses) for r in resolutions }), 1)
+            self.assertEqual(server.queries, 1)
+
+    def test_file_is_shared(self):
+        with StubDnsServer(ZONE) as server, tempfile.TemporaryDirectory() as directory:
+            # Arrange
+            path = os.path.join(directory, "dns.sqlite")
+            DnsCache([server.address], path=path).lookup("www.example.com")
+            DnsCache([server.address], path=path).lookup("missing.example.com")
+            other_process = DnsCache([server.address], path=path)
+
+            # Act
+            resolution = other_process.lookup("www.example.com")
+            other_process.lookup("missing.example.com")
+
+            # Assert
+            self.assertEqual((resolution.addresses, resolution.cnames), (["10.0.0.1"], ["example.com"]))
+            self.assertEqual((other_process.misses, other_process.file_hits, other_process.negative_hits), (0, 2, 1))
+
+    def test_hosts_file(self):
+        with StubDnsServer(ZONE) as server, tempfile.TemporaryDirectory() as directory:
+            # Arrange
+            path = os.path.join(directory, "hosts")
+            with open(path, "w") as f:
+                f.write("# comment\n10.1.0.1 myhost myhost.local # inline comment\n::1 localhost6\n10.1.0.2 myhost\n")
+            cache = DnsCache([server.address], hosts_path=path)
+
+            # Act
+            resolution = cache.lookup("MyHost.")
+
+            # Assert
+            self.assertEqual(read_hosts(path), { "myhost": ["10.1.0.1", "10.1.0.2"], "myhost.local": ["10.1.0.1"] })
+            self.assertEqual(resolution.addresses, ["10.1.0.1", "10.1.0.2"])
+            self.assertEqual((server.queries, cache.misses), (0, 0))
+
+    def test_hostnames_without_dot_use_the_system_resolver(self):
+        with StubDnsServer(ZONE) as server:
+            # Arrange
+            cache = DnsCache([server.address])
+            answer = [(socket.AF_INET, socket.SOCK_STREAM, 6, "", ("10.2.0.1", 0))]
+
+            # Act
+            with patch("socket.getaddrinfo", return_value=answer):
+                resolution = cache.lookup("my-service")
+            with patch("socket.getaddrinfo", side_effect=socket.gaierror(socket.EAI_NONAME, "Name or service not known")):
+                missing = [cache.lookup("missing-service") for _ in range(2)]
+
+            # Assert
+            self.assertEqual(resolution.addresses, ["10.2.0.1"])
+            self.assertEqual(missing[-1].error, "NXDOMAIN")
+            self.assertEqual((server.queries, cache.misses, cache.hits), (0, 3, 0))
+            self.assertEqual(cache._entries, {})
+
+    def test_search_domains(self):
+        with StubDnsServer(ZONE) as server:
+            # Arrange
+            cache = DnsCache([server.address])
+            cache.search, cache.ndots = ["svc.cluster.local"], 5
+            answer = [(socket.AF_INET, socket.SOCK_STREAM, 6, "", ("10.3.0.1", 0))]
+
+            # Act
+            with patch("socket.getaddrinfo", return_value=answer):
+                relative = cache.lookup("my-service.my-namespace")
+            absolute = cache.lookup("example.com")
+
+            # Assert
+            self.assertEqual(relative.addresses, ["10.3.0.1"])
+            self.assertEqual(absolute.addresses, ["10.0.0.1"])
+            self.assertEqual(list(cache._entries), ["example.com"])
+
+    def test_read_search_settings(self):
+        with tempfile.TemporaryDirectory() as directory:
+            # Arrange
+            path = os.path.join(directory, "resolv.conf")
+            with open(path, "w") as f:
+                f.write("nameserver 10.96.0.10\nsearch default.svc.cluster.local svc.cluster.local\noptions ndots:5 timeout:1\n")
+
+            # Act
+            settings = read_search_settings(path)
+
+            # Assert
+            self.assertEqual(settings, (["default.svc.cluster.local", "svc.cluster.local"], 5))
+            self.assertEqual(read_search_settings(os.path.join(directory, "missing")), ([], 1))
+
+
+class TestResolve(unittest.TestCase):
+    def test_ip_addresses_are_not_resolved(self):
+        self.assertEqual(resolve("10.0.0.1"), ["10.0.0.1"])
+        self.assertEqual(resolve("[::1]"), ["::1"])
+
+    def test_resolve(self):
+        with StubDnsServer(ZONE) as server, patch.dict(os.environ, { "RedKiteDnsNameservers": server.address }):
+            # Arrange
+            from stalker_job_sdk import get_dns_cache
+            get_dns_cache.cache_clear()
+
+            # Act
+            addresses = resolve("www.example.com")
+
+            # Assert
+            self.assertEqual(addresses, ["10.0.0.1"])
+            get_dns_cache.cache_clear()
+
+    def test_stats_are_logged_when_the_job_ends(self):
+        with StubDnsServer(ZONE) as server, patch.dict(os.environ, { "RedKiteDnsNameservers": server.address, "RedKiteContext": "" }):
+            # Arrange
+            stalker_job_sdk.get_dns_cache.cache_clear()
+            resolve("example.com")
+            resolve("example.com")
+
+            # Act
+            with patch("sys.stdout", new_callable=io.StringIO) as stdout:
+                stalker_job_sdk._log_done()
+
+            # Assert
+            self.assertIn("@debug DNS cache: 1 hits, of which 0 negative and 0 from the cache file, 1 misses", stdout.getvalue())
+            stalker_job_sdk.get_dns_cache.cache_clear()
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,44 @@
+import unittest
+
+from stalker_job_sdk.domains import iter_all_domains, tokenize_hostname
+
+
+class TestDomains(unittest.TestCase):
+    def test_tokenize_hostname(self):
+        self.assertEqual(tokenize_hostname("*.star.hello.com"), "star.hello.com")
+        self.assertEqual(tokenize_hostname("dot.qwerty.com."), "dot.qwerty.com")
+        self.assertEqual(tokenize_hostname("DNS:WWW.Example.com"), "www.example.com")
+        self.assertIsNone(tokenize_hostname("localhost"))
+        self.assertIsNone(tokenize_hostname("-invalid-.example.com"))
+        self.assertIsNone(tokenize_hostname("empty..example.com"))
+
+    def test_iter_all_domains_yields_each_domain_once(self):
+        # Arrange
+        domains = ["a.b.example.com", "b.example.com", "c.b.example.com", "*.b.example.com", "example.com"]
+
+        # Act
+        all_domains = list(iter_all_domains(domains))
+
+        # Assert
+        self.assertEqual(sorted(all_domains), sorted(["a.b.example.com", "b.example.com", "c.b.example.com", "example.com"]))
+        self.assertEqual(len(all_domains), len(set(all_domains)))
+
+    def test_iter_all_domains_is_lazy(self):
+        # Arrange
+        consumed = []
+
+        def domains():
+            for domain in ["example.com", "www.example.com", "example.org"]:
+                consumed.append(domain)
+                yield domain
+
+        # Act
+        first = next(iter_all_domains(domains()))
+
+        # Assert
+        self.assertEqual(first, "example.com")
+        self.assertEqual(consumed, ["example.com"])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,142 @@
+import io
+import threading
+import unittest
+from unittest import mock
+
+import stalker_job_sdk
+from stalker_job_sdk.emitter import BackgroundEmitter, QueueFullPolicy
+
+
+class SlowSender:
+    """Records sent lines, waiting for `release` before sending anything."""
+
+    def __init__(self):
+        self.sent = []
+        self.release = threading.Event()
+
+    def __call__(self, output: str):
+        self.release.wait()
+        self.sent.append(output)
+
+
+class TestBackgroundEmitter(unittest.TestCase):
+    def test_drain_sends_everything_in_order(self):
+        # Arrange
+        sender = SlowSender()
+        sender.release.set()
+        emitter = BackgroundEmitter(sender, max_size=10)
+        outputs = [f"@info {i}" for i in range(100)]
+
+        # Act
+        for output in outputs:
+            emitter.put(output)
+        emitter.drain()
+
+        # Assert
+        self.assertEqual(sender.sent, outputs)
+
+    def test_drop_debug_policy(self):
+        # Arrange
+        sender = SlowSender()
+        emitter = BackgroundEmitter(sender, max_size=2, policy=QueueFullPolicy.DROP_DEBUG)
+
+        # Act
+        for i in range(10):
+            emitter.put(f"@debug {i}")
+        sender.release.set()
+        emitter.drain()
+
+        # Assert
+        self.assertGreater(emitter.dropped, 0)
+        self.assertEqual(len(sender.sent) + emitter.dropped, 10)
+
+    def test_spill_policy_keeps_order(self):
+        # Arrange
+        sender = SlowSender()
+        emitter = BackgroundEmitter(sender, max_size=2, policy=QueueFullPolicy.SPILL)
+        outputs = [f"@finding {{\"findings\": [{i}]}}\nmultiline" for i in range(50)]
+
+        # Act
+        for output in outputs:
+            emitter.put(output)
+        sender.release.set()
+        emitter.drain()
+
+        # Assert
+        self.assertEqual(sender.sent, outputs)
+
+    def test_sender_errors_do_not_stop_the_thread(self):
+        # Arrange
+        sent = []
+
+        def send(output: str):
+            if output == "@info fail":
+                raise Exception("Orchestrator unavailable")
+            sent.append(output)
+
+        emitter = BackgroundEmitter(send)
+
+        # Act
+        emitter.put("@info fail")
+        emitter.put("@info ok")
+        emitter.drain()
+
+        # Assert
+        self.assertEqual(sent, ["@info ok"])
+
+    def test_spill_policy_with_concurrent_producers(self):
+        # Arrange
+        sent = []
+        emitter = BackgroundEmitter(sent.append, max_size=5, policy=QueueFullPolicy.SPILL)
+
+        def produce(producer: int):
+            for i in range(500):
+                emitter.put(f"@info {producer} {i}")
+
+        producers = [threading.Thread(target=produce, args=(producer,)) for producer in range(4)]
+
+        # Act
+        for thread in producers:
+            thread.start()
+        for thread in producers:
+            thread.join()
+        emitter.drain()
+
+        # Assert
+        self.assertEqual(len(sent), 2000)
+        for producer in range(4):
+            lines = [line for line in sent if line.startswith(f"@info {producer} ")]
+            self.assertEqual(lines, [f"@info {producer} {i}" for i in range(500)])
+
+    def test_unknown_policy(self):
+        self.assertRaises(ValueError, BackgroundEmitter, print, 10, "unknown")
+
+
+class TestGetBackgroundEmitter(unittest.TestCase):
+    def setUp(self):
+        stalker_job_sdk.get_background_emitter.cache_clear()
+
+    def tearDown(self):
+        stalker_job_sdk.get_background_emitter.cache_clear()
+
+    @mock.patch.dict("os.environ", { "RedKiteBackgroundSender": "true", "RedKiteQueueFullPolicy": "unknown" })
+    def test_unknown_policy_falls_back_to_block(self):
+        # Act
+        with mock.patch("sys.stderr", new_callable=io.StringIO) as stderr:
+            emitter = stalker_job_sdk.get_background_emitter()
+
+        # Assert
+        self.assertEqual(emitter.policy, QueueFullPolicy.BLOCK)
+        self.assertIn("RedKiteQueueFullPolicy", stderr.getvalue())
+
+    @mock.patch.dict("os.environ", { "RedKiteContext": "context", "RedKiteBackgroundSender": "true" })
+    def test_flush_does_not_create_the_emitter(self):
+        # Act
+        stalker_job_sdk._flush_findings()
+
+        # Assert
+        self.assertEqual(stalker_job_sdk.get_background_emitter.cache_info().currsize, 0)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
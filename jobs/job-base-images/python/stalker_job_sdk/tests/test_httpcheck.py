@@ -0,0 +1,92 @@
+import socket
+import threading
+import time
+import unittest
+
+from stalker_job_sdk.httpcheck import (HttpScheme, SniffedProtocol, check_http_ports, parse_response_head,
+                                       sniff_protocol)
+from tests.http_servers import HAS_OPENSSL, LocalServers
+
+
+def closed_port() -> int:
+    s = socket.socket()
+    s.bind(("127.0.0.1", 0))
+    port = s.getsockname()[1]
+    s.close()
+    return port
+
+
+class TestSniffProtocol(unittest.TestCase):
+    def test_sniff(self):
+        self.assertEqual(sniff_protocol(b"\x16\x03\x03\x00\x7a\x02"), SniffedProtocol.TLS)
+        self.assertEqual(sniff_protocol(b"\x15\x03\x01\x00\x02\x02\x46"), SniffedProtocol.TLS)
+        self.assertEqual(sniff_protocol(b"HTTP/1.1 400 Bad Request\r\n"), SniffedProtocol.HTTP)
+        self.assertEqual(sniff_protocol(b"SSH-2.0-OpenSSH_9.6\r\n"), SniffedProtocol.OTHER)
+        self.assertEqual(sniff_protocol(b"\x16"), SniffedProtocol.OTHER)
+
+    def test_parse_response_head(self):
+        # Act
+        headers = parse_response_head(b"HTTP/1.1 400 Bad Request\r\nServer: nginx\r\nContent-Length: 0\r\n\r\nbody: no")
+
+        # Assert
+        self.assertEqual(headers, { "server": "nginx", "content-length": "0" })
+        self.assertIsNone(parse_response_head(b"<html>"))
+
+
+class TestCheckHttpPorts(unittest.TestCase):
+    def test_http_ports(self):
+        with LocalServers(http=3) as servers:
+            # Arrange
+            found = []
+
+            # Act
+            result = check_http_ports("127.0.0.1", [*servers.http, closed_port()], on_found=found.append)
+
+            # Assert
+            self.assertEqual([(c.port, c.scheme) for c in result], sorted((port, HttpScheme.HTTP) for port in servers.http))
+            self.assertTrue(all(c.server.startswith("BaseHTTP") and c.tls_version is None for c in result))
+            self.assertCountEqual(found, result)
+
+    def test_found_ports_are_reported_outside_the_event_loop(self):
+        with LocalServers(http=2) as servers:
+            # Arrange
+            threads = []
+
+            # Act
+            check_http_ports("127.0.0.1", servers.http, on_found=lambda check: threads.append(threading.get_ident()))
+
+            # Assert
+            self.assertEqual(len(threads), 2)
+            self.assertNotIn(threading.get_ident(), threads)
+
+    @unittest.skipUnless(HAS_OPENSSL, "openssl is needed to generate a certificate")
+    def test_https_ports(self):
+        with LocalServers(http=2, https=2, h2=2) as servers:
+            # Act
+            result = { c.port: c for c in check_http_ports("127.0.0.1", [*servers.http, *servers.https, *servers.h2]) }
+
+            # Assert
+            self.assertEqual(len(result), 6)
+            for port in servers.http:
+                self.assertEqual(result[port].scheme, HttpScheme.HTTP)
+            for port in servers.https:
+                self.assertEqual((result[port].scheme, result[port].alpn), (HttpScheme.HTTPS, None))
+                self.assertTrue(result[port].tls_version.startswith("TLS"))
+            for port in servers.h2:
+                self.assertEqual((result[port].scheme, result[port].alpn), (HttpScheme.HTTPS, "h2"))
+                self.assertEqual(result[port].server, "h2-server")
+
+    def test_silent_ports_are_checked_concurrently(self):
+        with LocalServers(http=1, silent=5) as servers:
+            # Act
+            start = time.perf_counter()
+            result = check_http_ports("127.0.0.1", [*servers.silent, *servers.http], concurrency=10, timeout=0.5)
+            elapsed = time.perf_counter() - start
+
+            # Assert
+            self.assertEqual([(c.port, c.scheme) for c in result], [(servers.http[0], HttpScheme.HTTP)])
+            self.assertLess(elapsed, 2.0)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,60 @@
+import os
+import subprocess
+import sys
+import unittest
+
+# Budget for the cumulative import time of the package, in milliseconds. Can be raised on slow machines.
+IMPORT_BUDGET_MS = float(os.getenv("RedKiteImportBudgetMs") or 50)
+RUNS = 5
+
+PACKAGE_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_python(code: str, *options: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *options, "-c", code],
+        cwd=PACKAGE_DIRECTORY,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+class TestImportTime(unittest.TestCase):
+    def test_heavy_modules_are_not_imported(self):
+        # Act
+        result = run_python(
+            "import sys, stalker_job_sdk\n"
+            "print(','.join(m for m in ('httpx', 'h2', 'tldextract', 'orjson', 'json') if m in sys.modules))"
+        )
+
+        # Assert
+        self.assertEqual(result.stdout.strip(), "")
+
+    def test_lazy_attributes_are_importable(self):
+        # Act
+        result = run_python("from stalker_job_sdk import FindingBatcher, Outbox, split_domains; print(Outbox.__name__)")
+
+        # Assert
+        self.assertEqual(result.stdout.strip(), "Outbox")
+
+    def test_import_time_budget(self):
+        # Arrange
+        timings = []
+
+        # Act
+        for _ in range(RUNS):
+            result = run_python("import stalker_job_sdk", "-X", "importtime")
+            for line in result.stderr.splitlines():
+                # Lines look like "import time:       120 |        340 | stalker_job_sdk"
+                _, cumulative_us, name = line.split("|")
+                if name.strip() == "stalker_job_sdk":
+                    timings.append(int(cumulative_us) / 1000)
+
+        # Assert
+        self.assertEqual(len(timings), RUNS)
+        self.assertLess(min(timings), IMPORT_BUDGET_MS, f"Importing stalker_job_sdk took {min(timings):.1f}ms")
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,124 @@
+import os
+import tempfile
+import unittest
+
+from stalker_job_sdk.limits import (RESERVED_FILES, ResourceLimits,
+                                    read_cpu_limit, read_memory_limit,
+                                    tune_concurrency)
+
+
+class TestReadLimits(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = self.directory.name
+        self.available = len(os.sched_getaffinity(0))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, path: str, value: str):
+        path = os.path.join(self.root, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(value + "\n")
+
+    def test_cgroup_v2(self):
+        # Arrange
+        self.write("cpu.max", "50000 100000")
+        self.write("memory.max", str(512 * 1024 * 1024))
+
+        # Act
+        cpus = read_cpu_limit(self.root)
+        memory = read_memory_limit(self.root)
+
+        # Assert
+        self.assertEqual(cpus, 0.5)
+        self.assertEqual(memory, 512 * 1024 * 1024)
+
+    def test_cgroup_v2_unlimited(self):
+        # Arrange
+        self.write("cpu.max", "max 100000")
+        self.write("memory.max", "max")
+
+        # Act
+        cpus = read_cpu_limit(self.root)
+        memory = read_memory_limit(self.root)
+
+        # Assert
+        self.assertEqual(cpus, self.available)
+        self.assertIsNone(memory)
+
+    def test_cgroup_v1(self):
+        # Arrange
+        self.write("cpu/cpu.cfs_quota_us", "25000")
+        self.write("cpu/cpu.cfs_period_us", "100000")
+        self.write("memory/memory.limit_in_bytes", str(256 * 1024 * 1024))
+
+        # Act
+        cpus = read_cpu_limit(self.root)
+        memory = read_memory_limit(self.root)
+
+        # Assert
+        self.assertEqual(cpus, 0.25)
+        self.assertEqual(memory, 256 * 1024 * 1024)
+
+    def test_cgroup_v1_unlimited(self):
+        # Arrange
+        self.write("cpu/cpu.cfs_quota_us", "-1")
+        self.write("cpu/cpu.cfs_period_us", "100000")
+        self.write("memory/memory.limit_in_bytes", "9223372036854771712")
+
+        # Act
+        cpus = read_cpu_limit(self.root)
+        memory = read_memory_limit(self.root)
+
+        # Assert
+        self.assertEqual(cpus, self.available)
+        self.assertIsNone(memory)
+
+    def test_quota_above_the_available_cpus(self):
+        # Arrange
+        self.write("cpu.max", f"{(self.available + 4) * 100000} 100000")
+
+        # Act
+        cpus = read_cpu_limit(self.root)
+
+        # Assert
+        self.assertEqual(cpus, self.available)
+
+    def test_no_cgroup(self):
+        # Act
+        cpus = read_cpu_limit(self.root)
+        memory = read_memory_limit(self.root)
+
+        # Assert
+        self.assertEqual(cpus, self.available)
+        self.assertIsNone(memory)
+
+
+class TestTuneConcurrency(unittest.TestCase):
+    def test_bound_by_cpus(self):
+        limits = ResourceLimits(2, 4 * 1024 ** 3, 100_000)
+        self.assertEqual(tune_concurrency(100, limits=limits), 200)
+
+    def test_bound_by_open_files(self):
+        limits = ResourceLimits(8, None, 1024)
+        self.assertEqual(tune_concurrency(1000, limits=limits), 1024 - RESERVED_FILES)
+        self.assertEqual(tune_concurrency(1000, files_per_task=4, limits=limits), (1024 - RESERVED_FILES) // 4)
+        self.assertEqual(tune_concurrency(1000, files_per_task=0, limits=limits), 8000)
+
+    def test_bound_by_memory(self):
+        limits = ResourceLimits(8, 64 * 1024 * 1024, None)
+        self.assertEqual(tune_concurrency(1000, memory_per_task=1024 * 1024, limits=limits), 32)
+
+    def test_bound_by_maximum_and_minimum(self):
+        self.assertEqual(tune_concurrency(1000, maximum=500, limits=ResourceLimits(4)), 500)
+        self.assertEqual(tune_concurrency(100, limits=ResourceLimits(0.001)), 1)
+
+    def test_describe(self):
+        self.assertEqual(ResourceLimits(0.5, 512 * 1024 * 1024, 1024).describe(), "cpus: 0.5, memory: 512 MiB, open files: 1024")
+        self.assertEqual(ResourceLimits(2).describe(), "cpus: 2, memory: unlimited, open files: unlimited")
+
+
+if __name__ == "__main__":
+    unittest.main()
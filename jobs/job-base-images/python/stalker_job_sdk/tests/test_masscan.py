@@ -0,0 +1,85 @@
+import json
+import os
+import stat
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+from stalker_job_sdk.masscan import (MasscanFormat, MasscanRecord,
+                                     parse_json_line, parse_list_line,
+                                     stream_masscan)
+
+FAKE_MASSCAN = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_masscan.py")
+
+
+class TestParsers(unittest.TestCase):
+    def test_parse_list_line(self):
+        self.assertEqual(parse_list_line("open tcp 80 10.0.0.1 1700000000\n"), MasscanRecord("10.0.0.1", 80, "tcp", "open", 1700000000))
+        self.assertIsNone(parse_list_line("#masscan\n"))
+        self.assertIsNone(parse_list_line("\n"))
+        self.assertRaises(ValueError, parse_list_line, "open tcp\n")
+
+    def test_parse_json_line(self):
+        line = '{   "ip": "10.0.0.1",   "timestamp": "1700000000", "ports": [ {"port": 443, "proto": "tcp", "status": "open", "reason": "syn-ack", "ttl": 64} ] },\n'
+        self.assertEqual(parse_json_line(line), [MasscanRecord("10.0.0.1", 443, "tcp", "open", 1700000000)])
+        self.assertEqual(parse_json_line("[\n"), [])
+        self.assertEqual(parse_json_line('{"finished": 1}\n'), [])
+        self.assertEqual(parse_json_line("]\n"), [])
+        self.assertRaises(ValueError, parse_json_line, '{"ip": \n')
+
+
+class TestStreamMasscan(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        masscan = os.path.join(self.directory.name, "masscan")
+        with open(masscan, "w") as f:
+            f.write(f"#!/bin/sh\nexec {sys.executable} {FAKE_MASSCAN} \"$@\"\n")
+        os.chmod(masscan, os.stat(masscan).st_mode | stat.S_IEXEC)
+        self.path = f"{self.directory.name}{os.pathsep}{os.environ['PATH']}"
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def stream(self, results: list, output_format: str = MasscanFormat.JSON, **env) -> list[MasscanRecord]:
+        with mock.patch.dict("os.environ", { "PATH": self.path, "FAKE_MASSCAN_RESULTS": json.dumps(results), **env }):
+            return list(stream_masscan("10.0.0.0/24", "80,443", 1000, output_format))
+
+    def test_json_output(self):
+        # Act
+        records = self.stream([["10.0.0.1", 80], ["10.0.0.2", 443]])
+
+        # Assert
+        self.assertEqual([(r.ip, r.port) for r in records], [("10.0.0.1", 80), ("10.0.0.2", 443)])
+
+    def test_list_output(self):
+        # Act
+        records = self.stream([["10.0.0.1", 80], ["10.0.0.2", 443]], MasscanFormat.LIST)
+
+        # Assert
+        self.assertEqual([(r.ip, r.port) for r in records], [("10.0.0.1", 80), ("10.0.0.2", 443)])
+
+    def test_records_are_received_while_masscan_runs(self):
+        # Arrange
+        signal = os.path.join(self.directory.name, "continue")
+        env = { "PATH": self.path, "FAKE_MASSCAN_RESULTS": json.dumps([["10.0.0.1", 80], ["10.0.0.2", 443]]), "FAKE_MASSCAN_WAIT_FOR": signal }
+
+        with mock.patch.dict("os.environ", env):
+            records = stream_masscan("10.0.0.0/24", "80,443", 1000)
+
+            # Act
+            first = next(records)
+            # The fake masscan only writes its second result once this file exists
+            open(signal, "w").close()
+            rest = list(records)
+
+        # Assert
+        self.assertEqual((first.ip, first.port), ("10.0.0.1", 80))
+        self.assertEqual([(r.ip, r.port) for r in rest], [("10.0.0.2", 443)])
+
+    def test_masscan_failure(self):
+        self.assertRaises(Exception, self.stream, [], FAKE_MASSCAN_EXIT_CODE="1")
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,98 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from stalker_job_sdk.outbox import Outbox
+
+
+class TestOutbox(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.sent = []
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def send(self, path: str, payload: dict):
+        self.sent.append((path, payload))
+
+    def test_sends_in_order_and_truncates_journal(self):
+        # Arrange
+        outbox = Outbox(self.directory.name, self.send)
+
+        # Act
+        for i in range(20):
+            outbox.append("/Jobs/Finding", { "Finding": f"@info {i}" })
+        drained = outbox.drain(5)
+
+        # Assert
+        self.assertTrue(drained)
+        self.assertEqual([p["Finding"] for _, p in self.sent], [f"@info {i}" for i in range(20)])
+        self.assertEqual(outbox.stats()["sent"], 20)
+        self.assertEqual(os.path.getsize(os.path.join(self.directory.name, "outbox.jsonl")), 0)
+
+    def test_retries_failed_requests(self):
+        # Arrange
+        failures = [Exception("timeout"), Exception("503")]
+
+        def flaky_send(path: str, payload: dict):
+            if failures:
+                raise failures.pop()
+            self.send(path, payload)
+
+        outbox = Outbox(self.directory.name, flaky_send, base_backoff=0.01)
+
+        # Act
+        outbox.append("/Jobs/Status", { "Status": "Success" })
+        drained = outbox.drain(5)
+
+        # Assert
+        self.assertTrue(drained)
+        self.assertEqual(self.sent, [("/Jobs/Status", { "Status": "Success" })])
+        self.assertEqual(outbox.retries, 2)
+
+    def test_replays_unsent_requests(self):
+        # Arrange
+        pid = os.fork()
+        if pid == 0:
+            # A job process which stops before its requests are sent
+            first = Outbox(self.directory.name, lambda path, payload: time.sleep(60))
+            first.append("/Jobs/Finding", { "Finding": "@info first" })
+            first.append("/Jobs/Finding", { "Finding": "@info second" })
+            os._exit(0)
+        os.waitpid(pid, 0)
+
+        # Act
+        second = Outbox(self.directory.name, self.send)
+        second.append("/Jobs/Finding", { "Finding": "@info third" })
+        drained = second.drain(5)
+
+        # Assert
+        self.assertTrue(drained)
+        self.assertEqual(second.replayed, 2)
+        self.assertEqual([p["Finding"] for _, p in self.sent], ["@info first", "@info second", "@info third"])
+
+    def test_running_outboxes_use_their_own_journal(self):
+        # Arrange
+        blocked = threading.Event()
+        first = Outbox(self.directory.name, lambda path, payload: blocked.wait())
+        first.append("/Jobs/Finding", { "Finding": "@info first" })
+
+        # Act
+        second = Outbox(self.directory.name, self.send)
+        second.append("/Jobs/Finding", { "Finding": "@info second" })
+        drained = second.drain(5)
+        blocked.set()
+
+        # Assert
+        self.assertTrue(drained)
+        self.assertEqual(second.replayed, 0)
+        self.assertEqual([p["Finding"] for _, p in self.sent], ["@info second"])
+        self.assertTrue(first.drain(5))
+        self.assertTrue(os.path.isfile(os.path.join(self.directory.name, "outbox-1.jsonl")))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,217 @@
+import asyncio
+import errno
+import socket
+import threading
+import unittest
+from unittest import mock
+
+from ipaddress import ip_network
+
+from stalker_job_sdk.portscan import (RttEstimator, ScanEngine, iter_probes,
+                                      parse_targets, scan_tcp, scan_tcp_async,
+                                      scan_tcp_ports)
+
+
+class TestScanTcpPorts(unittest.TestCase):
+    def setUp(self):
+        self.listeners = [socket.create_server(("127.0.0.1", 0)) for _ in range(3)]
+        self.open_ports = sorted(l.getsockname()[1] for l in self.listeners)
+
+        closed = socket.create_server(("127.0.0.1", 0))
+        self.closed_port = closed.getsockname()[1]
+        closed.close()
+
+    def tearDown(self):
+        for listener in self.listeners:
+            listener.close()
+
+    def scan(self, engine: str) -> list[int]:
+        return scan_tcp_ports("127.0.0.1", [*self.open_ports, self.closed_port], 2, 1.0, engine)
+
+    def test_threads_engine(self):
+        self.assertEqual(self.scan(ScanEngine.THREADS), self.open_ports)
+
+    def test_asyncio_engine(self):
+        self.assertEqual(self.scan(ScanEngine.ASYNCIO), self.open_ports)
+
+    def assert_streamed(self, engine: str):
+        # Arrange
+        streamed = []
+
+        # Act
+        open_ports = scan_tcp(
+            [("127.0.0.1", port) for port in [*self.open_ports, self.closed_port]],
+            2,
+            1.0,
+            engine,
+            on_open=lambda ip, port: streamed.append((ip, port)),
+        )
+
+        # Assert
+        self.assertEqual(sorted(streamed), open_ports)
+        self.assertEqual(len(streamed), len(self.open_ports))
+
+    def test_threads_engine_streams_open_ports(self):
+        self.assert_streamed(ScanEngine.THREADS)
+
+    def test_asyncio_engine_streams_open_ports(self):
+        self.assert_streamed(ScanEngine.ASYNCIO)
+
+    def test_asyncio_engine_reports_outside_the_event_loop(self):
+        # Arrange
+        threads = []
+
+        # Act
+        scan_tcp(
+            [("127.0.0.1", port) for port in self.open_ports],
+            2,
+            1.0,
+            ScanEngine.ASYNCIO,
+            on_open=lambda ip, port: threads.append(threading.get_ident()),
+        )
+
+        # Assert
+        self.assertEqual(len(threads), len(self.open_ports))
+        self.assertNotIn(threading.get_ident(), threads)
+
+    def test_asyncio_engine_without_ports(self):
+        self.assertEqual(scan_tcp_ports("127.0.0.1", [], 10, 1.0, ScanEngine.ASYNCIO), [])
+
+    def test_unknown_engine(self):
+        self.assertRaises(ValueError, self.scan, "syn")
+
+    def test_multiple_targets(self):
+        # Arrange
+        listener = socket.create_server(("127.0.0.2", self.open_ports[0]))
+        probes = iter_probes(parse_targets("127.0.0.1,127.0.0.2"), [*self.open_ports, self.closed_port])
+
+        # Act
+        open_ports = scan_tcp(probes, 3, 1.0, ScanEngine.ASYNCIO)
+        listener.close()
+
+        # Assert
+        self.assertEqual(
+            open_ports,
+            [*[("127.0.0.1", port) for port in self.open_ports], ("127.0.0.2", self.open_ports[0])]
+        )
+
+
+class TestProbes(unittest.TestCase):
+    def test_parse_targets(self):
+        self.assertEqual(parse_targets("10.0.0.1"), [ip_network("10.0.0.1/32")])
+        self.assertEqual(parse_targets("10.0.0.1, 10.0.1.5/30"), [ip_network("10.0.0.1/32"), ip_network("10.0.1.4/30")])
+        self.assertEqual(parse_targets('["10.0.0.1", "::1"]'), [ip_network("10.0.0.1/32"), ip_network("::1/128")])
+
+    def test_probes_are_interleaved(self):
+        # Act
+        probes = list(iter_probes(parse_targets("10.0.0.1,10.0.1.0/30"), [80, 443]))
+
+        # Assert
+        self.assertEqual(
+            probes,
+            [
+                ("10.0.0.1", 80), ("10.0.1.1", 80), ("10.0.1.2", 80),
+                ("10.0.0.1", 443), ("10.0.1.1", 443), ("10.0.1.2", 443),
+            ]
+        )
+
+
+class TestRttEstimator(unittest.TestCase):
+    def test_initial_timeout(self):
+        self.assertEqual(RttEstimator(2.0).timeout("10.0.0.1"), 2.0)
+
+    def test_timeout_follows_round_trip_times(self):
+        # Arrange
+        timing = RttEstimator(2.0, min_timeout=0.01)
+
+        # Act
+        for _ in range(50):
+            timing.sample("10.0.0.1", 0.050)
+
+        # Assert
+        self.assertAlmostEqual(timing.stats()["10.0.0.1"].srtt, 0.050)
+        self.assertAlmostEqual(timing.timeout("10.0.0.1"), 0.060, places=3)
+        self.assertAlmostEqual(timing.timeout("10.0.0.1", attempt=2), 0.240, places=3)
+        self.assertEqual(timing.timeout("10.0.0.2"), 2.0)
+
+    def test_variance_widens_the_timeout(self):
+        # Arrange
+        timing = RttEstimator(2.0, min_timeout=0.01)
+
+        # Act
+        for rtt in [0.010, 0.200] * 20:
+            timing.sample("10.0.0.1", rtt)
+
+        # Assert
+        self.assertGreater(timing.timeout("10.0.0.1"), 0.300)
+
+    def test_timeout_bounds(self):
+        # Arrange
+        timing = RttEstimator(1.0, min_timeout=0.1, max_timeout=3.0)
+        timing.sample("10.0.0.1", 0.001)
+
+        # Assert
+        self.assertEqual(timing.timeout("10.0.0.1"), 0.1)
+        self.assertEqual(timing.timeout("10.0.0.1", attempt=10), 3.0)
+
+
+class TestRetries(unittest.TestCase):
+    def setUp(self):
+        # A listener with a full backlog never answers, as a filtered port
+        self.listener = socket.create_server(("127.0.0.1", 0), backlog=0)
+        self.pending = []
+        for _ in range(3):
+            pending = socket.socket()
+            pending.setblocking(False)
+            pending.connect_ex(self.listener.getsockname())
+            self.pending.append(pending)
+        self.filtered_port = self.listener.getsockname()[1]
+
+    def tearDown(self):
+        for s in [self.listener, *self.pending]:
+            s.close()
+
+    def assert_retried(self, engine: str):
+        # Arrange
+        timing = RttEstimator(0.05, min_timeout=0.05)
+
+        # Act
+        open_ports = scan_tcp([("127.0.0.1", self.filtered_port)], 1, 0.05, engine, retries=2, timing=timing)
+
+        # Assert
+        self.assertEqual(open_ports, [])
+        self.assertEqual(timing.stats()["127.0.0.1"].timeouts, 3)
+        self.assertEqual(timing.stats()["127.0.0.1"].retries, 2)
+
+    def test_threads_engine_retries(self):
+        self.assert_retried(ScanEngine.THREADS)
+
+    def test_asyncio_engine_retries(self):
+        self.assert_retried(ScanEngine.ASYNCIO)
+
+    def test_asyncio_engine_retry_without_socket(self):
+        # Arrange
+        real_socket = socket.socket
+        sockets = []
+
+        def socket_then_emfile(*args, **kwargs):
+            if sockets:
+                raise OSError(errno.EMFILE, "Too many open files")
+            sockets.append(real_socket(*args, **kwargs))
+            return sockets[-1]
+
+        async def scan():
+            # The event loop is created before, its own sockets are not affected
+            with mock.patch("socket.socket", socket_then_emfile):
+                return await scan_tcp_async([("127.0.0.1", self.filtered_port)], 1, 0.05, retries=1)
+
+        # Act
+        open_ports = asyncio.run(asyncio.wait_for(scan(), 5))
+
+        # Assert
+        self.assertEqual(open_ports, [])
+        self.assertEqual(len(sockets), 1)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,87 @@
+import os
+import tempfile
+import unittest
+
+from stalker_job_sdk.psl import (PublicSuffixTrie, SplitDomain,
+                                 compile_public_suffix_list, split_domains)
+
+PUBLIC_SUFFIX_LIST = """
+// VERSION: test
+// ===BEGIN ICANN DOMAINS===
+com
+uk
+co.uk
+*.kawasaki.jp
+!city.kawasaki.jp
+jp
+no
+bø.no
+io
+// ===END ICANN DOMAINS===
+// ===BEGIN PRIVATE DOMAINS===
+github.io
+// ===END PRIVATE DOMAINS===
+"""
+
+
+class TestPublicSuffixTrie(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        source = os.path.join(cls.directory.name, "public_suffix_list.dat")
+        with open(source, "w", encoding="utf-8") as f:
+            f.write(PUBLIC_SUFFIX_LIST)
+
+        cls.compiled_path = os.path.join(cls.directory.name, "public_suffix_list.trie")
+        with open(cls.compiled_path, "wb") as f:
+            f.write(compile_public_suffix_list(source))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    def assert_splits(self, trie: PublicSuffixTrie):
+        self.assertEqual(trie.version, "test")
+        self.assertEqual(trie.split("www.example.co.uk"), SplitDomain("www", "example", "co.uk"))
+        self.assertEqual(trie.split("example.com"), SplitDomain("", "example", "com"))
+        self.assertEqual(trie.split("co.uk"), SplitDomain("", "", "co.uk"))
+        self.assertEqual(trie.split("a.b.kawasaki.jp"), SplitDomain("", "a", "b.kawasaki.jp"))
+        self.assertEqual(trie.split("www.city.kawasaki.jp"), SplitDomain("www", "city", "kawasaki.jp"))
+        self.assertEqual(trie.split("example.bø.no"), SplitDomain("", "example", "bø.no"))
+        self.assertEqual(trie.split("example.xn--b-5ga.no"), SplitDomain("", "example", "xn--b-5ga.no"))
+        self.assertEqual(trie.split("foo.internal"), SplitDomain("foo", "internal", ""))
+
+    def test_split(self):
+        self.assert_splits(PublicSuffixTrie.from_file(self.compiled_path))
+
+    def test_split_with_mmap(self):
+        self.assert_splits(PublicSuffixTrie.from_file(self.compiled_path, mmap=True))
+
+    def test_private_domains(self):
+        trie = PublicSuffixTrie.from_file(self.compiled_path)
+        self.assertEqual(trie.split("me.github.io"), SplitDomain("me", "github", "io"))
+        self.assertEqual(trie.split("me.github.io", include_private=True), SplitDomain("", "me", "github.io"))
+
+    def test_invalid_file(self):
+        self.assertRaises(ValueError, PublicSuffixTrie, b"not a compiled trie of the public suffix list")
+
+
+class TestSplitDomains(unittest.TestCase):
+    def test_split_domains_with_bundled_list(self):
+        # Act
+        splits = split_domains(["www.example.co.uk", "Example.com.", "a.b.c.example.com.au"])
+
+        # Assert
+        self.assertEqual(
+            splits,
+            [
+                SplitDomain("www", "example", "co.uk"),
+                SplitDomain("", "example", "com"),
+                SplitDomain("a.b.c", "example", "com.au"),
+            ]
+        )
+        self.assertEqual(splits[2].registered_domain, "example.com.au")
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
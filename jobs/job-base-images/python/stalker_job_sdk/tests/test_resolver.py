@@ -0,0 +1,156 @@
+import os
+import struct
+import tempfile
+import threading
+import unittest
+
+from stalker_job_sdk.resolver import (RecordType, build_query, encode_name, parse_nameserver, parse_response,
+                                      read_nameservers, resolve_hostnames)
+from tests.dns_server import StubDnsServer
+
+ZONE = {
+    "example.com": ["10.0.0.1", "2001:db8::1"],
+    "www.example.com": "cdn.example.net",
+    "cdn.example.net": ["10.0.0.2"],
+    "big.example.com": ["10.0.1.1", "10.0.1.2"],
+    "flaky.example.com": ["10.0.2.1"],
+    "xn--bcher-kva.example": ["10.0.3.1"],
+}
+
+
+class TestMessages(unittest.TestCase):
+    def test_build_query(self):
+        # Act
+        query = build_query(0x1234, "www.example.com.", RecordType.AAAA)
+
+        # Assert
+        self.assertEqual(query[:2], b"\x12\x34")
+        self.assertIn(b"\x03www\x07example\x03com\x00\x00\x1c\x00\x01", query)
+        self.assertRaises(ValueError, build_query, 1, "a..b", RecordType.A)
+        self.assertRaises(ValueError, build_query, 1, "a" * 64 + ".com", RecordType.A)
+
+    def test_encode_name(self):
+        self.assertEqual(encode_name("WWW.Example.com."), "www.example.com")
+        self.assertEqual(encode_name("Bücher.example"), "xn--bcher-kva.example")
+        self.assertIn(b"\x0dxn--bcher-kva\x07example\x00", build_query(1, "bücher.example", RecordType.A))
+        self.assertRaises(ValueError, encode_name, "a..b")
+
+    def test_parse_compressed_response(self):
+        # Arrange
+        question = b"\x03www\x07example\x03com\x00\x00\x01\x00\x01"
+        cname = b"\xc0\x0c" + struct.pack("!HHIH", RecordType.CNAME, 1, 60, 2) + b"\xc0\x10"
+        a = b"\xc0\x10" + struct.pack("!HHIH", RecordType.A, 1, 30, 4) + bytes((10, 0, 0, 1))
+        data = struct.pack("!HHHHHH", 7, 0x8180, 1, 2, 0, 0) + question + cname + a
+
+        # Act
+        response = parse_response(data)
+
+        # Assert
+        self.assertEqual((response.id, response.code, response.name, response.type), (7, 0, "www.example.com", 1))
+        self.assertEqual(
+            [tuple(r) for r in response.records],
+            [("www.example.com", RecordType.CNAME, 60, "example.com"), ("example.com", RecordType.A, 30, "10.0.0.1")],
+        )
+
+    def test_invalid_responses(self):
+        # Arrange
+        looping = struct.pack("!HHHHHH", 7, 0x8180, 1, 0, 0, 0) + b"\xc0\x0c"
+
+        # Assert
+        self.assertRaises(ValueError, parse_response, looping)
+        self.assertRaises(ValueError, parse_response, b"\x00\x07\x81")
+        self.assertRaises(ValueError, parse_response, build_query(1, "example.com", RecordType.A))
+
+    def test_parse_nameserver(self):
+        self.assertEqual(parse_nameserver("1.1.1.1"), ("1.1.1.1", 53))
+        self.assertEqual(parse_nameserver("127.0.0.1:5353"), ("127.0.0.1", 5353))
+        self.assertEqual(parse_nameserver("2606:4700::1111"), ("2606:4700::1111", 53))
+        self.assertEqual(parse_nameserver("[::1]:5353"), ("::1", 5353))
+
+    def test_read_nameservers(self):
+        with tempfile.TemporaryDirectory() as directory:
+            # Arrange
+            path = os.path.join(directory, "resolv.conf")
+            with open(path, "w") as f:
+                f.write("# comment\nsearch example.com\nnameserver 10.0.0.53\nnameserver ::1\n")
+
+            # Assert
+            self.assertEqual(read_nameservers(path), ["10.0.0.53", "::1"])
+            self.assertEqual(read_nameservers(os.path.join(directory, "missing")), [])
+
+
+class TestResolveHostnames(unittest.TestCase):
+    def test_resolve(self):
+        with StubDnsServer(ZONE, ttl=120, truncated=["big.example.com"]) as server:
+            # Arrange
+            found = []
+
+            # Act
+            resolutions = resolve_hostnames(
+                ["example.com", "WWW.example.com.", "big.example.com", "missing.example.com", "a..b"],
+                [server.address],
+                on_resolved=found.append,
+            )
+
+            # Assert
+            by_hostname = { r.hostname: r for r in resolutions }
+            self.assertEqual(by_hostname["example.com"].addresses, ["10.0.0.1"])
+            self.assertEqual(by_hostname["example.com"].ttl, 120)
+            self.assertEqual(by_hostname["www.example.com"].addresses, ["10.0.0.2"])
+            self.assertEqual(by_hostname["www.example.com"].cnames, ["cdn.example.net"])
+            self.assertEqual(by_hostname["big.example.com"].addresses, ["10.0.1.1", "10.0.1.2"])
+            self.assertEqual(by_hostname["missing.example.com"].error, "NXDOMAIN")
+            self.assertEqual(by_hostname["a..b"].error, "INVALID")
+            self.assertCountEqual(found, resolutions)
+
+    def test_resolutions_are_reported_outside_the_event_loop(self):
+        with StubDnsServer(ZONE) as server:
+            # Arrange
+            threads = []
+
+            # Act
+            resolve_hostnames(
+                ["example.com", "big.example.com"],
+                [server.address],
+                on_resolved=lambda resolution: threads.append(threading.get_ident()),
+            )
+
+            # Assert
+            self.assertEqual(len(threads), 2)
+            self.assertNotIn(threading.get_ident(), threads)
+
+    def test_resolve_ipv6(self):
+        with StubDnsServer(ZONE) as server:
+            # Act
+            resolutions = resolve_hostnames(["example.com"], [server.address], ipv6=True)
+
+            # Assert
+            self.assertEqual(resolutions[0].addresses, ["10.0.0.1", "2001:db8::1"])
+
+    def test_resolve_internationalized_hostname(self):
+        with StubDnsServer(ZONE) as server:
+            # Act
+            resolutions = resolve_hostnames(["bücher.example"], [server.address], timeout=0.5, retries=0)
+
+            # Assert
+            self.assertEqual((resolutions[0].hostname, resolutions[0].addresses), ("bücher.example", ["10.0.3.1"]))
+
+    def test_failed_queries_are_sent_to_the_next_nameserver(self):
+        with StubDnsServer(ZONE, servfail=["flaky.example.com"]) as failing, StubDnsServer(ZONE) as working:
+            # Act
+            resolutions = resolve_hostnames(["flaky.example.com"], [failing.address, working.address], retries=1)
+
+            # Assert
+            self.assertEqual(resolutions[0].addresses, ["10.0.2.1"])
+
+    def test_timeout(self):
+        with StubDnsServer(ZONE, dropped=["example.com"]) as server:
+            # Act
+            resolutions = resolve_hostnames(["example.com", "cdn.example.net"], [server.address], timeout=0.2, retries=1)
+
+            # Assert
+            self.assertEqual([(r.hostname, r.error) for r in resolutions], [("cdn.example.net", None), ("example.com", "TIMEOUT")])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,97 @@
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+PACKAGE_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAIN = os.path.join(os.path.dirname(PACKAGE_DIRECTORY), "main.py")
+
+
+def serve(*jobs: dict) -> list[str]:
+    env = dict(os.environ)
+    env.pop("RedKiteContext", None)
+    env["PYTHONPATH"] = PACKAGE_DIRECTORY
+    env["RedKiteRunnerConcurrency"] = "1"
+    result = subprocess.run(
+        [sys.executable, MAIN, "--serve"],
+        input="".join(json.dumps(job) + "\n" for job in jobs),
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+    return result.stdout.splitlines()
+
+
+class TestForkServer(unittest.TestCase):
+    def test_jobs_run_with_their_environment(self):
+        # Arrange
+        code = "import os\nprint('host', os.environ['HOSTNAME'])"
+
+        # Act
+        output = serve(
+            { "code": code, "environment": { "HOSTNAME": "a.example.com" } },
+            { "code": code, "environment": { "HOSTNAME": "b.example.com" } },
+        )
+
+        # Assert
+        self.assertEqual([line for line in output if line.startswith("host ")], ["host a.example.com", "host b.example.com"])
+        self.assertEqual(output.count("Status: Ended"), 2)
+
+    def test_jobs_are_isolated(self):
+        # Act
+        output = serve(
+            { "code": "import os\nos.environ['LEAKED'] = 'true'" },
+            { "code": "import os\nprint('leaked', os.environ.get('LEAKED'))" },
+        )
+
+        # Assert
+        self.assertIn("leaked None", output)
+
+    def test_failing_job(self):
+        # Act
+        output = serve({ "code": "raise Exception('boom')" })
+
+        # Assert
+        self.assertIn("Status: Failed", output)
+        self.assertEqual(output.count("Status: Ended"), 1)
+
+    def test_crashed_job_is_reported_by_the_server(self):
+        # Act
+        output = serve(
+            { "code": "import os\nos._exit(3)" },
+            { "code": "print('still running')" },
+        )
+
+        # Assert
+        self.assertIn("@error Job process exited with status 3", output)
+        self.assertIn("Status: Failed", output)
+        self.assertIn("still running", output)
+        self.assertEqual(output.count("Status: Ended"), 2)
+
+    def test_job_exiting_without_ending_is_reported_by_the_server(self):
+        # Act
+        output = serve(
+            { "code": "import os\nos._exit(0)" },
+            { "code": "import sys\nsys.exit(0)" },
+            { "code": "import sys\nsys.exit()" },
+        )
+
+        # Assert
+        self.assertNotIn("Status: Failed", output)
+        self.assertEqual(output.count("Status: Ended"), 3)
+
+    def test_job_exiting_with_a_message_is_reported_as_failed(self):
+        # Act
+        output = serve({ "code": "import sys\nsys.exit('boom')" })
+
+        # Assert
+        self.assertIn("@error Job process exited with status 1", output)
+        self.assertIn("Status: Failed", output)
+        self.assertEqual(output.count("Status: Ended"), 1)
+
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
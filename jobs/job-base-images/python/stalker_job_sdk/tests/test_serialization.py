@@ -0,0 +1,86 @@
+import json
+import unittest
+from unittest import mock
+from ipaddress import ip_address
+
+from stalker_job_sdk import (DomainFinding, IpFinding, PortFinding, TagFinding,
+                             TextField, WebsiteFinding)
+from stalker_job_sdk import serialization
+
+
+class TestSerialization(unittest.TestCase):
+    def test_finding_attributes_are_serialized_in_order(self):
+        # Arrange
+        finding = PortFinding("PortFinding", "10.0.0.1", 443, "tcp", "Port", [TextField("protocol", "TCP port", "tcp")], "PortFinding")
+
+        # Act
+        serialized = serialization.dumps({ "findings": [finding] })
+
+        # Assert
+        self.assertEqual(
+            list(json.loads(serialized)["findings"][0].items()),
+            [
+                ("key", "PortFinding"),
+                ("type", "PortFinding"),
+                ("name", "Port"),
+                ("fields", [{ "key": "protocol", "type": "text", "label": "TCP port", "data": "tcp" }]),
+                ("ip", "10.0.0.1"),
+                ("port", 443),
+                ("protocol", "tcp"),
+            ]
+        )
+
+    def test_standard_json_backend(self):
+        # Arrange
+        findings = [
+            WebsiteFinding("WebsiteFinding", "10.0.0.1", 80, "example.com", "/", False),
+            TagFinding("tag", domainName="example.com"),
+        ]
+        orjson = serialization.orjson
+
+        # Act
+        try:
+            serialization.orjson = None
+            standard = serialization.dumps(findings)
+        finally:
+            serialization.orjson = orjson
+
+        # Assert
+        self.assertEqual(json.loads(standard), json.loads(serialization.dumps(findings)))
+
+    def test_subclasses_without_slots(self):
+        # Arrange
+        class CustomFinding(DomainFinding):
+            def __init__(self, domain: str, source: str):
+                super().__init__("CustomFinding", domain, None)
+                self.source = source
+
+        # Act
+        serialized = json.loads(serialization.dumps(CustomFinding("example.com", "crt.sh")))
+
+        # Assert
+        self.assertEqual(serialized["domainName"], "example.com")
+        self.assertEqual(serialized["source"], "crt.sh")
+
+    def test_values_without_attributes_are_serialized_as_strings(self):
+        serialized = json.loads(serialization.dumps(IpFinding("IpFinding", ip_address("10.0.0.1"))))
+        self.assertEqual(serialized["ip"], "10.0.0.1")
+
+    def test_unknown_values_are_not_serialized(self):
+        for value in [{ "10.0.0.1" }, b"10.0.0.1", object()]:
+            with self.assertRaises(TypeError):
+                serialization.dumps(IpFinding("IpFinding", value))
+
+    def test_unknown_values_are_not_serialized_by_the_standard_json_backend(self):
+        with mock.patch.object(serialization, "orjson", None):
+            self.assertRaises(TypeError, serialization.dumps, IpFinding("IpFinding", { "10.0.0.1" }))
+
+    def test_default_fields_are_not_shared(self):
+        a = IpFinding("IpFinding", "10.0.0.1")
+        b = IpFinding("IpFinding", "10.0.0.2")
+        a.fields.append(TextField("a", "a", "a"))
+        self.assertEqual(b.fields, [])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,54 @@
+import unittest
+from ipaddress import ip_network
+
+from stalker_job_sdk.shards import (ShardStrategy, masscan_shard_args,
+                                    plan_range_shards)
+
+
+def values(parameters: list[dict]) -> dict:
+    return { p["name"]: p["value"] for p in parameters }
+
+
+class TestPlanRangeShards(unittest.TestCase):
+    def test_masscan_shards(self):
+        # Act
+        plan = [values(p) for p in plan_range_shards("10.0.0.0/12", 4, 10000, 1, 1000, [8443])]
+
+        # Assert
+        self.assertEqual([p["shard"] for p in plan], ["1/4", "2/4", "3/4", "4/4"])
+        self.assertEqual(len({ p["seed"] for p in plan }), 1)
+        for p in plan:
+            self.assertEqual((p["targetIp"], p["targetMask"], p["rate"]), ("10.0.0.0", 12, 10000))
+            self.assertEqual((p["portMin"], p["portMax"], p["ports"]), (1, 1000, [8443]))
+
+    def test_single_shard(self):
+        self.assertNotIn("shard", values(plan_range_shards("10.0.0.0/24", 1, 100)[0]))
+
+    def test_cidr_shards(self):
+        # Act
+        plan = [values(p) for p in plan_range_shards("10.1.2.3/12", 3, 1000, strategy=ShardStrategy.CIDR)]
+
+        # Assert
+        subnets = [ip_network(f"{p['targetIp']}/{p['targetMask']}") for p in plan]
+        self.assertEqual(len(subnets), 4)
+        self.assertEqual(sum(s.num_addresses for s in subnets), ip_network("10.0.0.0/12").num_addresses)
+        self.assertTrue(all(s.subnet_of(ip_network("10.0.0.0/12")) for s in subnets))
+        self.assertFalse(any(a.overlaps(b) for i, a in enumerate(subnets) for b in subnets[i + 1:]))
+
+    def test_cidr_shards_of_a_small_range(self):
+        self.assertEqual(len(plan_range_shards("10.0.0.1/32", 8, 1000, strategy=ShardStrategy.CIDR)), 1)
+
+    def test_invalid_plans(self):
+        self.assertRaises(ValueError, plan_range_shards, "10.0.0.0/8", 0, 1000)
+        self.assertRaises(ValueError, plan_range_shards, "10.0.0.0/8", 2, 1000, strategy="random")
+
+
+class TestMasscanShardArgs(unittest.TestCase):
+    def test_args(self):
+        self.assertEqual(masscan_shard_args("2/8", "1234"), ["--shards", "2/8", "--seed", "1234"])
+        self.assertEqual(masscan_shard_args(None, None), [])
+        self.assertRaises(ValueError, masscan_shard_args, "9/8", "1")
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
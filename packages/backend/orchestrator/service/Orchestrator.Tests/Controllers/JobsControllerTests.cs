@@ -0,0 +1,115 @@
+using System.Security.Cryptography;
+using System.Text;
+using FluentAssertions;
+using Microsoft.AspNetCore.Mvc;
+using Orchestrator.Controllers;
+using Orchestrator.Controllers.dto;
+using Orchestrator.Events;
+using Orchestrator.Jobs.JobTemplates;
+using Orchestrator.Queue;
+
+namespace Orchestrator.Tests.Controllers;
+
+public class JobsControllerTests
+{
+    private class RecordingProducer<T> : IMessagesProducer<T> where T : class
+    {
+        public List<T> Messages { get; } = new();
+
+        public Task Produce(T message)
+        {
+            Messages.Add(message);
+            return Task.CompletedTask;
+        }
+    }
+
+    private readonly RecordingProducer<JobEventMessage> EventsProducer = new();
+    private readonly RecordingProducer<JobLogMessage> LogsProducer = new();
+    private readonly JobsController Controller;
+
+    static JobsControllerTests()
+    {
+        // The job contexts are signed with the keys of the orchestrator, read from its environment
+        Environment.SetEnvironmentVariable("SECRET_HMAC_KEY", "jobs-controller-tests");
+        using var rsa = RSA.Create(2048);
+        Environment.SetEnvironmentVariable("SECRET_PRIVATE_RSA_KEY", Convert.ToBase64String(Encoding.UTF8.GetBytes(rsa.ExportRSAPrivateKeyPem())));
+    }
+
+    public JobsControllerTests()
+    {
+        Controller = new JobsController(EventsProducer, LogsProducer, new FindingsParser());
+    }
+
+    private static string SignedContext()
+    {
+        return new JobContext("job-id", "project-id").ToJsonSignedString();
+    }
+
+    [Fact]
+    public async Task Findings_MixedValidAndInvalidLines_ProducesTheValidLinesAndCountsTheRejectedOnes()
+    {
+        // Arrange
+        var dto = new JobFindingsDto
+        {
+            RedKiteContext = SignedContext(),
+            Findings = new[]
+            {
+                "@finding {\"findings\": [{\"type\": \"HostnameFinding\", \"domainName\": \"example.com\"}]}",
+                "not an event",
+                "@info Scanning example.com",
+                "@unknown event",
+                "@finding {\"findings\": [{\"type\": \"HostnameFinding\", \"domainName\": \"example.org\"}]}",
+            },
+        };
+
+        // Act
+        var result = await Controller.Findings(dto);
+
+        // Assert
+        var ok = result.Should().BeOfType<OkObjectResult>().Subject;
+        ok.Value.Should().BeOfType<JobFindingsResultDto>().Which.Rejected.Should().Be(2);
+        EventsProducer.Messages.Select(m => m.FindingsJson).Should().Equal(
+            "{\"findings\": [{\"type\": \"HostnameFinding\", \"domainName\": \"example.com\"}]}",
+            "{\"findings\": [{\"type\": \"HostnameFinding\", \"domainName\": \"example.org\"}]}"
+        );
+        EventsProducer.Messages.Should().OnlyContain(m => m.JobId == "job-id" && m.ProjectId == "project-id");
+        LogsProducer.Messages.Select(m => m.Log).Should().Equal("Scanning example.com");
+    }
+
+    [Fact]
+    public async Task Findings_OnlyInvalidLines_ProducesNothing()
+    {
+        // Arrange
+        var dto = new JobFindingsDto
+        {
+            RedKiteContext = SignedContext(),
+            Findings = new[] { "not an event", "@finding" },
+        };
+
+        // Act
+        var result = await Controller.Findings(dto);
+
+        // Assert
+        result.Should().BeOfType<OkObjectResult>().Which.Value.Should().BeOfType<JobFindingsResultDto>().Which.Rejected.Should().Be(2);
+        EventsProducer.Messages.Should().BeEmpty();
+        LogsProducer.Messages.Should().BeEmpty();
+    }
+
+    [Fact]
+    public async Task Findings_InvalidContext_ProducesNothing()
+    {
+        // Arrange
+        var dto = new JobFindingsDto
+        {
+            RedKiteContext = "{\"Id\": \"job-id\", \"ProjectId\": \"project-id\", \"Signature\": \"AAAA\"}",
+            Findings = new[] { "@finding {\"findings\": []}" },
+        };
+
+        // Act
+        var result = await Controller.Findings(dto);
+
+        // Assert
+        result.Should().BeOfType<BadRequestObjectResult>();
+        EventsProducer.Messages.Should().BeEmpty();
+    }
+}
@@ -9,6 +9,7 @@ namespace Orchestrator.Controllers
     public class JobsController : Controller
     {
         private JobEventsProducer EventsProducer { get; set; }
+        private IMessagesProducer<JobEventMessage> FindingsProducer { get; set; }
         private IMessagesProducer<JobLogMessage> LogsProducer { get; set; }
         private IFindingsParser Parser { get; set; }
 
@@ -24,6 +25,7 @@ namespace Orchestrator.Controllers
         public JobsController(IMessagesProducer<JobEventMessage> eventsProducer, IMessagesProducer<JobLogMessage> jobLogsProducer, IFindingsParser parser)
         {
             EventsProducer = eventsProducer as JobEventsProducer;
+            FindingsProducer = eventsProducer;
             LogsProducer = jobLogsProducer;
             Parser = parser;
         }
@@ -45,7 +47,7 @@ namespace Orchestrator.Controllers
 
             if (evt is FindingsEventModel)
             {
-                await EventsProducer.Produce(new JobEventMessage
+                await FindingsProducer.Produce(new JobEventMessage
                 {
                     JobId = context.Id,
                     ProjectId = context.ProjectId,
@@ -75,6 +77,60 @@ namespace Orchestrator.Controllers
             return Ok();
         }
 
+        // POST /Jobs/Findings
+        [HttpPost]
+        public async Task<ActionResult> Findings([FromBody] JobFindingsDto dto)
+        {
+            if (dto.Findings == null) return BadRequest("Invalid findings");
+
+            JobContext context;
+            try
+            {
+                context = new JobContext(dto.RedKiteContext);
+            }
+            catch (Exception)
+            {
+                return BadRequest("Invalid job context");
+            }
+
+            // Every finding is parsed before any is produced, so that an invalid finding does not make the job retry a
+            // batch which was partly produced. Invalid findings are skipped and counted.
+            var events = new List<EventModel>();
+            var rejectedFindings = 0;
+            foreach (var finding in dto.Findings)
+            {
+                EventModel? evt = null;
+                try
+                {
+                    evt = Parser.Parse(finding);
+                }
+                catch (Exception)
+                {
+                }
+
+                if (evt == null)
+                {
+                    rejectedFindings++;
+                    continue;
+                }
+                events.Add(evt);
+            }
+
+            try
+            {
+                foreach (var evt in events)
+                {
+                    await HandleEvent(evt, context);
+                }
+            }
+            catch (Exception)
+            {
+                return BadRequest("Error while handling findings.");
+            }
+
+            return Ok(new JobFindingsResultDto { Rejected = rejectedFindings });
+        }
+
         // POST /Jobs/Status
         [HttpPost]
         public async Task<ActionResult> Status([FromBody] StatusUpdateDto dto)
@@ -15,4 +15,14 @@ namespace Orchestrator.Controllers.dto
     {
         public string Finding { get; set; }
     }
+
+    public class JobFindingsDto : JobUpdateDto
+    {
+        public string[] Findings { get; set; }
+    }
+
+    public class JobFindingsResultDto
+    {
+        public int Rejected { get; set; }
+    }
 }
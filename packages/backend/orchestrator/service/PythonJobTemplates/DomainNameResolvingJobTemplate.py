@@ -1,15 +1,56 @@
+import json
 import os
 import socket
 
-from stalker_job_sdk import DomainFinding, log_finding
+from stalker_job_sdk import DomainFinding, log_finding, log_info
 
-hostname = os.environ["HOSTNAME"]
-data = socket.gethostbyname_ex(hostname)
-ipx = data[2]
+HOSTNAMES = os.environ.get(
+    "HOSTNAMES"
+)  # optional, hostnames resolved in bulk, as a json array or comma separated, instead of HOSTNAME
+NAMESERVERS = os.environ.get(
+    "NAMESERVERS"
+)  # optional, nameservers of the bulk resolution, as a json array or comma separated, ex: 1.1.1.1,8.8.8.8:53
+CONCURRENCY: int = int(
+    os.environ.get("CONCURRENCY") or 100
+)  # maximum number of hostnames resolved at the same time in bulk
 
-for ip in ipx:
+
+def log_hostname_ip(hostname: str, ip: str):
     log_finding(
         DomainFinding(
             "HostnameIpFinding", hostname, ip, "New ip", [], "HostnameIpFinding"
         )
     )
+
+
+def parse_list(value: str) -> list[str]:
+    value = value.strip()
+    if value.startswith("["):
+        return [str(v).strip() for v in json.loads(value) if str(v).strip()]
+    return [v.strip() for v in value.split(",") if v.strip()]
+
+
+if HOSTNAMES:
+    from stalker_job_sdk.resolver import Resolution, resolve_hostnames
+
+    hostnames = parse_list(HOSTNAMES)
+    nameservers = parse_list(NAMESERVERS) if NAMESERVERS else None
+    concurrency = CONCURRENCY if 0 < CONCURRENCY <= 10000 else 100
+
+    def log_resolution(resolution: Resolution):
+        for ip in resolution.addresses:
+            log_hostname_ip(resolution.hostname, ip)
+
+    # The A records of the hostnames are queried concurrently, their findings are reported as they are answered. Only
+    # IPv4 addresses are queried, the hosts being stored by their IPv4 address
+    resolutions = resolve_hostnames(hostnames, nameservers, concurrency, on_resolved=log_resolution)
+    resolved = sum(1 for r in resolutions if r.addresses)
+    log_info(f"Resolved {resolved} of {len(hostnames)} hostnames")
+
+else:
+    hostname = os.environ["HOSTNAME"]
+    data = socket.gethostbyname_ex(hostname)
+    ipx = data[2]
+
+    for ip in ipx:
+        log_hostname_ip(hostname, ip)
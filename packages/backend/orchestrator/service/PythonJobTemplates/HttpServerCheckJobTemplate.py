@@ -2,11 +2,17 @@ import json
 import os
 import random
 
-import httpx
-from stalker_job_sdk import PortFinding, log_error, log_finding
+from stalker_job_sdk import PortFinding, TextField, log_finding, log_info
+from stalker_job_sdk.httpcheck import HttpCheck, HttpScheme, check_http_ports
 
 TARGET_IP: str = os.environ["TARGET_IP"]  # IP to scan
 PORTS = os.environ["PORTS"]  # expects a json array of numbers, ex: [ 80, 443, 3389 ].
+CONCURRENCY: int = int(
+    os.environ.get("CONCURRENCY") or 100
+)  # maximum number of ports checked at the same time
+TIMEOUT: float = float(
+    os.environ.get("TIMEOUT") or 10.0
+)  # time in seconds to check each port
 
 ports_list: list = json.loads(PORTS) if PORTS and PORTS != "" else []
 ports_set: set = set(ports_list)
@@ -14,34 +20,26 @@ ports_set: set = set(ports_list)
 ports_list = list(ports_set)
 random.shuffle(ports_list)  # randomizing port scan order
 
-sublists = []
-total_ports = len(ports_list)
-
-with httpx.Client(verify=False, http2=True) as client:
-    # Try HTTPS
-    for port in ports_set:
-        try:
-            r = client.get(f"https://{TARGET_IP}:{port}", timeout=10.0)
-            log_finding(
-                PortFinding(
-                    "HttpServerCheck", TARGET_IP, port, "tcp", "This port runs an HTTPS server"
-                )
-            )
-
-            exit()
-
-        except Exception as e:
-            print(e)
-
-        # Test HTTP
-        try:
-            r = client.get(f"http://{TARGET_IP}:{port}", timeout=10.0)
-            log_finding(
-                PortFinding(
-                    "HttpServerCheck", TARGET_IP, port, "tcp", "This port runs an HTTP server"
-                )
-            )
-            exit()
-
-        except Exception as e:
-            log_error(e)
+concurrency = CONCURRENCY if 0 < CONCURRENCY <= 1000 else 100
+
+
+def log_http_port(check: HttpCheck):
+    server = "HTTPS" if check.scheme == HttpScheme.HTTPS else "HTTP"
+    fields = []
+    if check.tls_version:
+        fields.append(TextField("tlsVersion", "TLS version", check.tls_version))
+    if check.alpn:
+        fields.append(TextField("alpn", "Application protocol negotiated with ALPN", check.alpn))
+    if check.server:
+        fields.append(TextField("server", "Server header", check.server))
+
+    log_finding(
+        PortFinding(
+            "HttpServerCheck", TARGET_IP, check.port, "tcp", f"This port runs an {server} server", fields
+        )
+    )
+
+
+# Every port is sniffed with a single connection, and each HTTP(S) port is reported once found
+http_ports = check_http_ports(TARGET_IP, ports_list, concurrency, TIMEOUT, log_http_port)
+log_info(f"Found {len(http_ports)} HTTP(S) ports out of {len(ports_list)} on {TARGET_IP}")
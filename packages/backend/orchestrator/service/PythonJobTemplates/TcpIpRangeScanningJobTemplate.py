@@ -1,16 +1,20 @@
-from ipaddress import ip_address
 from json import loads
 from os import environ
-from subprocess import CompletedProcess, run
 
 from stalker_job_sdk import (IpFinding, PortFinding, TextField, log_error,
                              log_finding, log_info, log_warning)
+from stalker_job_sdk.bitmap import RangeTracker
+from stalker_job_sdk.limits import get_resource_limits, tune_concurrency
+from stalker_job_sdk.masscan import stream_masscan
+from stalker_job_sdk.shards import masscan_shard_args
 
 
 def main():
     TARGET_IP: str = environ["TARGET_IP"]  # Start of ip range
     TARGET_MASK: int = int(environ["TARGET_MASK"])  # mask (ex: /24)
-    RATE: int = int(environ["RATE"])  # number of threads to do the requests
+    RATE: int = int(
+        environ.get("RATE") or 0
+    )  # packets per second, derived from the pod's CPU limit when omitted
     PORT_MIN: int = int(environ["PORT_MIN"])  # expects a number (0 < p1 < 65535)
     PORT_MAX: int = int(
         environ["PORT_MAX"]
@@ -19,10 +23,15 @@ def main():
     PORTS = environ[
         "PORTS"
     ]  # expects a json array of numbers, ex: [ 80, 443, 3389 ]. Array can be empty
+    SHARD = environ.get(
+        "SHARD"
+    )  # optional, "x/y" to scan the x-th of y shards of the range, ex: 2/8
+    SEED = environ.get(
+        "SEED"
+    )  # optional, seed of the randomized scan order, which must be the same for all the shards of a range
 
     ports_list: list = loads(PORTS) if PORTS and PORTS != "" else []
     ports_set: set = set(ports_list)
-    output_file = 'out.txt'
     ports_str = ','.join(str(n) for n in ports_set)
 
     if PORT_MIN and PORT_MAX and PORT_MAX > PORT_MIN:
@@ -33,61 +42,62 @@ def main():
         log_error('No ports provided, exiting')
         exit()
 
-    log_info(f'Start of the IP range scanning {TARGET_IP}/{str(TARGET_MASK)} (rate: {RATE}, ports: {ports_str}). It may take a while.')
-
-    masscan_process: CompletedProcess = run(
-            [
-                'masscan',
-                '--rate', str(RATE), 
-                '-oL', output_file,
-                '--open-only',
-                '-p', ports_str,
-                f'{TARGET_IP}/{str(TARGET_MASK)}'
-            ],
-            text=True
-        )
-
-    hosts = set()
-    with open(output_file, 'r') as f:
-        for line in f:
-            try:
-                if not line or line[0] == "#":
-                    continue
-                finding = line.split(' ')
-                port = int(finding[2])
-                
-                ip_str = finding[3]
-                ip_int = int(ip_address(ip_str))
-
-                if ip_int not in hosts:
-                    hosts.add(ip_int)
-                    print(ip_str)
-                    # log host
-                    log_finding(
-                        IpFinding(
-                            "IpFinding",
-                            ip_str,
-                            "Ip range scanning finding",
-                            [],
-                            "IpFinding",
-                        )
-                    )
+    if RATE <= 0:
+        # masscan opens no file per packet and its memory does not grow with its rate, only its CPU use does
+        RATE = tune_concurrency(10000, 100000, files_per_task=0)
+        log_info(f'Rate: {RATE} packets/second ({get_resource_limits().describe()})')
+
+    shard_args = masscan_shard_args(SHARD, SEED)
+    shard_str = f', shard: {SHARD}' if SHARD else ''
+    log_info(f'Start of the IP range scanning {TARGET_IP}/{str(TARGET_MASK)} (rate: {RATE}, ports: {ports_str}{shard_str}). It may take a while.')
+
+    # masscan's results are read from a pipe while it scans, the findings are reported as soon as they are found
+    records = stream_masscan(
+        f'{TARGET_IP}/{str(TARGET_MASK)}',
+        ports_str,
+        RATE,
+        extra_args=shard_args,
+        on_error=lambda line: log_warning(f'Error while parsing line: {line}. Continuing'),
+    )
+
+    # Bitmaps of the range remember the hosts and the ports already reported, masscan reporting some of them twice
+    tracker = RangeTracker(f'{TARGET_IP}/{str(TARGET_MASK)}')
+    for record in records:
+        try:
+            ip_str = record.ip
+            new_host, new_port = tracker.add(ip_str, record.port)
 
-                # log port
+            if new_host:
+                print(ip_str)
+                # log host
                 log_finding(
-                    PortFinding(
-                        "PortFinding",
+                    IpFinding(
+                        "IpFinding",
                         ip_str,
-                        port,
-                        "tcp",
                         "Ip range scanning finding",
-                        [TextField("protocol", "TCP port", "tcp")],
-                        "PortFinding",
+                        [],
+                        "IpFinding",
                     )
                 )
 
-            except Exception:
-                log_warning(f'Error while parsing line: {line}. Continuing')
+            if not new_port:
+                continue
+
+            # log port
+            log_finding(
+                PortFinding(
+                    "PortFinding",
+                    ip_str,
+                    record.port,
+                    "tcp",
+                    "Ip range scanning finding",
+                    [TextField("protocol", "TCP port", "tcp")],
+                    "PortFinding",
+                )
+            )
+
+        except Exception:
+            log_warning(f'Error while parsing record: {record}. Continuing')
 
     log_info(f'End of the IP range scanning {TARGET_IP}/{str(TARGET_MASK)}')
             
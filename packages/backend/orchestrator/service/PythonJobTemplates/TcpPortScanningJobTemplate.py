@@ -1,44 +1,20 @@
 import json
-import math
 import os
 import random
-import socket
-import threading
-
-from stalker_job_sdk import PortFinding, TextField, log_finding
-
-
-class PortScanThread(threading.Thread):
-    def __init__(self, ports: list):
-        threading.Thread.__init__(self)
-        self.ports_to_scan = ports
-        self.open_ports = []
-
-    # This function could be faster if it only did a TCP SYN and waited for TCP
-    # ACK instead of a full TCP handshake. There may be something to do about the
-    # new socket / settimeout / s.close() everytime too
-    # Also, the usage of zmap could be considered: https://github.com/zmap/zmap
-    def is_tcp_port_open(self, port: int):
-        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        s.settimeout(SOCKET_TIMEOUT)
-        try:
-            s.connect((TARGET_IP, port))
-            s.close()
-            return True
-        except:
-            return False
-
-    def run(self):
-        for p in self.ports_to_scan:
-            if self.is_tcp_port_open(p):
-                self.open_ports.append(p)
-
-
-TARGET_IP: str = os.environ["TARGET_IP"]  # IP to scan
-THREADS: int = int(os.environ["THREADS"])  # number of threads to do the requests
+
+from stalker_job_sdk import PortFinding, TextField, log_finding, log_info
+from stalker_job_sdk.limits import get_resource_limits, tune_concurrency
+from stalker_job_sdk.portscan import RttEstimator, ScanEngine, iter_probes, parse_targets, scan_tcp
+
+TARGET_IP: str = os.environ[
+    "TARGET_IP"
+]  # IP to scan, or several IPs and CIDRs as a json array or comma separated, ex: 10.0.0.1,10.0.1.0/28
+THREADS: int = int(
+    os.environ.get("THREADS") or 0
+)  # number of threads to do the requests, derived from the pod's CPU, memory and open files limits when omitted
 SOCKET_TIMEOUT: float = float(
     os.environ["SOCKET_TIMEOUT"]
-)  # time in seconds to wait for socket
+)  # time in seconds to wait for socket, the initial timeout of a target when the timeouts are adaptive
 PORT_MIN: int = int(os.environ["PORT_MIN"])  # expects a number (0 < p1 < 65535)
 PORT_MAX: int = int(
     os.environ["PORT_MAX"]
@@ -47,6 +23,21 @@ PORT_MAX: int = int(
 PORTS = os.environ[
     "PORTS"
 ]  # expects a json array of numbers, ex: [ 80, 443, 3389 ]. Array can be empty
+ENGINE: str = (
+    os.environ.get("ENGINE") or ScanEngine.THREADS
+)  # "threads" or "asyncio", the asyncio engine keeps up to THREADS connects in flight from a single thread
+ADAPTIVE_TIMEOUT: bool = (
+    os.environ.get("ADAPTIVE_TIMEOUT") or "false"
+).lower() == "true"  # derive the timeouts from the round trip times measured on each target
+RETRIES: int = int(
+    os.environ.get("RETRIES") or 0
+)  # number of times a timed out port is tried again, with a doubled timeout
+STREAM_FINDINGS: bool = (
+    os.environ.get("STREAM_FINDINGS") or "true"
+).lower() == "true"  # report each open port as soon as it is found, rather than all of them once the scan is over
+OPEN_PORTS_SUMMARY: bool = (
+    os.environ.get("OPEN_PORTS_SUMMARY") or "false"
+).lower() == "true"  # log the sorted list of the open ports once the scan is over
 
 ports_list: list = json.loads(PORTS) if PORTS and PORTS != "" else []
 ports_set: set = set(ports_list)
@@ -59,54 +50,29 @@ ports_list = list(ports_set)
 random.shuffle(ports_list)  # randomizing port scan order
 
 
-threads = THREADS if THREADS and THREADS > 0 and THREADS <= 1000 else 100
-
-sublists = []
-total_ports = len(ports_list)
-ports_per_thread = math.floor(total_ports / threads)
-
-if ports_per_thread < 1:
-    ports_per_thread = 1
-
-for thread_i in range(0, threads):
-    min_port = thread_i * ports_per_thread
-    max_port = min_port + ports_per_thread
-
-    if max_port < total_ports:
-        sublists.append(ports_list[min_port:max_port])
-    else:
-        sublists.append(ports_list[min_port:])
-        break  # required to handle a case like 10 ports with 20 threads
+# A connect in flight costs a socket, and a thread's stack for the threads engine
+if ENGINE == ScanEngine.ASYNCIO:
+    max_concurrency, per_cpu, memory_per_connect = 10000, 1000, 16 * 1024
+else:
+    max_concurrency, per_cpu, memory_per_connect = 1000, 100, 256 * 1024
 
-allocated_ports = ports_per_thread * threads
-if allocated_ports < total_ports:
-    for i in range(0, total_ports - allocated_ports):
-        sublists[i % threads].append(ports_list[allocated_ports + i])
+if THREADS and 0 < THREADS <= max_concurrency:
+    concurrency = THREADS
+else:
+    concurrency = tune_concurrency(per_cpu, max_concurrency, files_per_task=1, memory_per_task=memory_per_connect)
+    log_info(f"Concurrency: {concurrency} ({get_resource_limits().describe()})")
 
-threads_list = []
+# The hosts are probed in turn for each port, so that the scan is spread over all the targets
+probes = iter_probes(parse_targets(TARGET_IP), ports_list)
+timing = RttEstimator(SOCKET_TIMEOUT) if ADAPTIVE_TIMEOUT else None
+retries = RETRIES if 0 <= RETRIES <= 10 else 0
 
-# Start all the port scan threads
-for l in sublists:
-    t = PortScanThread(l)
-    t.start()
-    threads_list.append(t)
 
-# Wait for port scan threads to finish
-for t in threads_list:
-    t.join()
-
-open_ports_output = []
-for t in threads_list:
-    if t.open_ports:
-        open_ports_output += t.open_ports
-
-open_ports_output.sort()
-
-for port in open_ports_output:
+def log_open_port(ip: str, port: int):
     log_finding(
         PortFinding(
             "PortFinding",
-            TARGET_IP,
+            ip,
             port,
             "tcp",
             "Port scanning finding",
@@ -114,3 +80,30 @@ for port in open_ports_output:
             "PortFinding",
         )
     )
+
+
+open_ports_output = scan_tcp(
+    probes,
+    concurrency,
+    SOCKET_TIMEOUT,
+    ENGINE,
+    retries,
+    timing,
+    log_open_port if STREAM_FINDINGS else None,
+)
+
+if timing is not None:
+    for line in timing.summary():
+        log_info(line)
+
+if not STREAM_FINDINGS:
+    for ip, port in open_ports_output:
+        log_open_port(ip, port)
+
+if OPEN_PORTS_SUMMARY:
+    ports_by_ip = {}
+    for ip, port in open_ports_output:
+        ports_by_ip.setdefault(ip, []).append(str(port))
+    log_info(f"{len(open_ports_output)} open ports")
+    for ip, ports in ports_by_ip.items():
+        log_info(f"{ip}: {', '.join(ports)}")